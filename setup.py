@@ -8,7 +8,7 @@ setup(name='ubuntu-tweak',
       author='TualatriX',  
       author_email='tualatrix@gmail.com',
       url='http://ubuntu-tweak.com',
-      scripts=['ubuntu-tweak'],
+      scripts=['ubuntu-tweak', 'ubuntu-tweak-janitor'],
       packages=find_packages(exclude=['tests']),
       data_files=[
           ('../etc/dbus-1/system.d/', ['data/ubuntu-tweak-daemon.conf']),
@@ -0,0 +1,122 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import apt
+import apt_pkg
+
+from ubuntutweak.utils.aptcache import AptCacheManager, query_installed_packages, parse_kernel_package
+
+def create_rootdir(root):
+    '''Create the folders of an empty apt rootdir, so the tests don't use the
+    apt cache of the host'''
+    for folder in ('etc/apt', 'var/lib/dpkg', 'var/lib/apt/lists/partial',
+                   'var/cache/apt/archives/partial'):
+        os.makedirs(os.path.join(root, folder))
+
+    open(os.path.join(root, 'var/lib/dpkg/status'), 'w').close()
+    open(os.path.join(root, 'var/lib/apt/extended_states'), 'w').close()
+
+
+class TestAptCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        create_rootdir(self.root)
+        self.status = os.path.join(self.root, 'var/lib/dpkg/status')
+
+        self.manager = AptCacheManager(rootdir=self.root)
+
+    def test_reopen(self):
+        self.assertFalse(self.manager.is_ready())
+        cache = self.manager.get_cache()
+        generation = self.manager.get_generation()
+
+        self.assertTrue(self.manager.is_ready())
+        self.assertTrue(cache is self.manager.get_cache())
+        self.assertEqual(generation, self.manager.get_generation())
+
+        lists = os.path.join(self.root, 'var/lib/apt/lists')
+        os.utime(lists, (time.time() + 10, time.time() + 10))
+        self.assertFalse(self.manager.is_ready())
+        self.assertTrue(cache is self.manager.get_cache())
+        self.assertEqual(generation + 1, self.manager.get_generation())
+
+        new_status = self.status + '.new'
+        open(new_status, 'w').write('')
+        os.rename(new_status, self.status)
+        self.manager.get_cache()
+        self.assertEqual(generation + 2, self.manager.get_generation())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+
+class TestQueryInstalledPackages(unittest.TestCase):
+    PACKAGE_NUMBER = 10000
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.arch = apt_pkg.config.find('APT::Architecture')
+        create_rootdir(self.root)
+
+        status = open(os.path.join(self.root, 'var/lib/dpkg/status'), 'w')
+        states = open(os.path.join(self.root, 'var/lib/apt/extended_states'), 'w')
+
+        for i in range(self.PACKAGE_NUMBER):
+            if i % 100 == 0:
+                name = 'linux-image-3.2.0-%d-generic' % (i / 100)
+            elif i % 10 == 0:
+                name = 'libdemo%d' % i
+                states.write('Package: %s\nArchitecture: %s\nAuto-Installed: 1\n\n' % (name, self.arch))
+            else:
+                name = 'demo%d' % i
+
+            status.write('Package: %s\n'
+                         'Status: install ok installed\n'
+                         'Installed-Size: %d\n'
+                         'Architecture: %s\n'
+                         'Version: 1.0-%d\n' % (name, i, self.arch, i))
+            # The first half of the libraries are still needed
+            if i % 10 == 1 and i < self.PACKAGE_NUMBER / 2:
+                status.write('Depends: libdemo%d\n' % (i - 1))
+            status.write('Description: demo package %d\n\n' % i)
+
+        status.close()
+        states.close()
+
+    def test_parse_kernel_package(self):
+        self.assertEqual(('linux-image', '3.2.0-36'), parse_kernel_package('linux-image-3.2.0-36-generic'))
+        self.assertEqual(('linux-image-extra', '3.6.0-030600'), parse_kernel_package('linux-image-extra-3.6.0-030600rc3'))
+        self.assertEqual(None, parse_kernel_package('linux-image-generic'))
+        self.assertEqual(None, parse_kernel_package('libdemo'))
+
+    def test_benchmark(self):
+        cache = apt.Cache(rootdir=self.root)
+
+        begin = time.time()
+        old_result = []
+        for pkg in cache:
+            if pkg.is_installed:
+                old_result.append((pkg.name, pkg.is_auto_removable, pkg.installed.installed_size))
+        old_time = time.time() - begin
+
+        begin = time.time()
+        new_result = [(pkg.name, pkg.is_auto_removable, pkg.installed_size)
+                      for pkg in query_installed_packages(cache)]
+        new_time = time.time() - begin
+
+        self.assertEqual(self.PACKAGE_NUMBER, len(new_result))
+        self.assertEqual(sorted(old_result), sorted(new_result))
+
+        # The timing depends on the machine, it is only compared on demand
+        if os.environ.get('UT_BENCHMARK'):
+            self.assertTrue(new_time < old_time,
+                            'query_installed_packages took %.3fs, iterating apt.Cache took %.3fs' % (new_time, old_time))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils.background import Background, Throttle
+from ubuntutweak.utils.deletion import Deleter
+from ubuntutweak.utils.diskusage import DiskUsage
+
+class TestBackground(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        for i in range(4):
+            folder = os.path.join(self.root, 'dir%d' % i)
+            os.makedirs(folder)
+            f = open(os.path.join(folder, 'file'), 'w')
+            f.write('x' * 100000)
+            f.close()
+
+    def test_throttle(self):
+        throttle = Throttle(1000000)
+        start = time.time()
+        for i in range(3):
+            throttle.consume(500000)
+        # One second is the burst, the other half second must be waited
+        self.assertTrue(0.4 < time.time() - start < 1)
+
+        start = time.time()
+        Throttle().consume(10 ** 12)
+        self.assertTrue(time.time() - start < 0.1)
+
+    def test_background(self):
+        metrics = []
+        background = Background(delete_budget=200000)
+        size = DiskUsage(background=background, metrics_callback=metrics.append).get_size(self.root)
+
+        start = time.time()
+        result = Deleter(background=background, metrics_callback=metrics.append).delete([self.root])
+        self.assertEqual(size, result[0][0])
+        self.assertFalse(os.path.exists(self.root))
+
+        self.assertEqual(['scan', 'delete'], [throughput.name for throughput in metrics])
+        self.assertEqual([size, size], [throughput.size for throughput in metrics])
+        self.assertEqual(9, metrics[1].count)
+        # 200000 bytes are the burst, the others take a second at least
+        self.assertTrue(time.time() - start > (size - 200000) / 200000.0 - 0.1)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from ubuntutweak.backends import daemon
+from ubuntutweak.backends.daemon import Daemon
+
+
+class DemoDaemon(Daemon):
+    '''The Daemon without the bus, its signals are recorded'''
+
+    def __init__(self, archives):
+        self.APT_ARCHIVES = archives
+        self.signals = []
+
+    def apt_cache_file_deleted(self, file_name, result):
+        self.signals.append(('apt_cache_file_deleted', file_name, result))
+
+    def purge_output(self, purge_id, line):
+        self.signals.append(('purge_output', purge_id, line))
+
+    def package_purged(self, purge_id, pkg):
+        self.signals.append(('package_purged', purge_id, pkg))
+
+    def purge_finished(self, purge_id, returncode):
+        self.signals.append(('purge_finished', purge_id, returncode))
+
+
+class FakeProcess(object):
+    '''The dpkg run, its output is written to the write_fd'''
+
+    def __init__(self, cmd, stdout=None, stderr=None, env=None):
+        self.cmd = cmd
+        self.stderr = stderr
+        self.env = env
+        read_fd, self.write_fd = os.pipe()
+        self.stdout = os.fdopen(read_fd)
+
+    def wait(self):
+        return 1
+
+
+class FakeGObject(object):
+    IO_IN = 1
+    IO_HUP = 16
+
+    def __init__(self):
+        self.watches = []
+
+    def io_add_watch(self, fd, condition, callback):
+        self.watches.append((fd, callback))
+
+
+class TestDeleteAptCacheFiles(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.archives = os.path.join(self.root, 'archives')
+        os.makedirs(os.path.join(self.archives, 'partial'))
+        self.daemon = DemoDaemon(self.archives)
+
+        for name in ('a_1.0_all.deb', 'b_1.0_all.deb', 'lock', 'partial/c_1.0_all.deb'):
+            open(os.path.join(self.archives, name), 'w').close()
+        # The files which are out of the archives
+        open(os.path.join(self.root, 'secret.deb'), 'w').close()
+        open(os.path.join(self.root, 'secret'), 'w').close()
+
+    def test_accepted(self):
+        # A missing one is already deleted
+        failed = self.daemon.delete_apt_cache_files(['a_1.0_all.deb', 'b_1.0_all.deb', 'd_1.0_all.deb'])
+
+        self.assertEqual(0, failed)
+        self.assertEqual([('apt_cache_file_deleted', 'a_1.0_all.deb', True),
+                          ('apt_cache_file_deleted', 'b_1.0_all.deb', True),
+                          ('apt_cache_file_deleted', 'd_1.0_all.deb', True)],
+                         self.daemon.signals)
+        self.assertEqual(['lock', 'partial'], sorted(os.listdir(self.archives)))
+
+    def test_rejected(self):
+        names = ['../secret.deb',
+                 '../secret',
+                 os.path.join(self.root, 'secret.deb'),
+                 'partial/c_1.0_all.deb',
+                 'lock',
+                 'partial',
+                 '.deb',
+                 '..',
+                 '']
+
+        failed = self.daemon.delete_apt_cache_files(names)
+
+        self.assertEqual(len(names), failed)
+        self.assertEqual([('apt_cache_file_deleted', name, False) for name in names],
+                         self.daemon.signals)
+        self.assertEqual(['a_1.0_all.deb', 'b_1.0_all.deb', 'lock', 'partial'],
+                         sorted(os.listdir(self.archives)))
+        self.assertTrue(os.path.exists(os.path.join(self.archives, 'partial', 'c_1.0_all.deb')))
+        self.assertEqual(['archives', 'secret', 'secret.deb'], sorted(os.listdir(self.root)))
+
+    def test_single(self):
+        self.assertTrue(self.daemon.delete_apt_cache_file('a_1.0_all.deb'))
+        self.assertFalse(self.daemon.delete_apt_cache_file('../secret.deb'))
+        self.assertFalse(os.path.exists(os.path.join(self.archives, 'a_1.0_all.deb')))
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'secret.deb')))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+class TestPurgeConfigPackages(unittest.TestCase):
+    def setUp(self):
+        self.daemon = DemoDaemon('/nonexistent')
+        self.processes = []
+        self.gobject = FakeGObject()
+
+        def popen(*args, **kwargs):
+            self.processes.append(FakeProcess(*args, **kwargs))
+            return self.processes[-1]
+
+        self.popen, daemon.subprocess.Popen = daemon.subprocess.Popen, popen
+        self.old_gobject, daemon.GObject = daemon.GObject, self.gobject
+
+    def test_command(self):
+        self.assertTrue(self.daemon.purge_config_packages('id1', ['foo', 'bar:amd64']))
+
+        process = self.processes[0]
+        self.assertEqual(['sudo', 'dpkg', '--purge', 'foo', 'bar:amd64'], process.cmd)
+        self.assertEqual(subprocess.STDOUT, process.stderr)
+        # The output is parsed, so it mustn't be translated
+        self.assertEqual('C', process.env['LC_ALL'])
+        self.assertEqual(os.environ.get('PATH'), process.env.get('PATH'))
+
+        # Only one purge runs at a time
+        self.assertFalse(self.daemon.purge_config_packages('id2', ['baz']))
+        self.assertEqual(1, len(self.processes))
+
+    def test_rejected(self):
+        self.assertFalse(self.daemon.purge_config_packages('id1', []))
+        self.assertFalse(self.daemon.purge_config_packages('id1', ['foo', '--force-all']))
+        self.assertFalse(self.processes)
+
+    def test_output(self):
+        self.daemon.purge_config_packages('id1', ['foo', 'bar'])
+        process = self.processes[0]
+        fd, callback = self.gobject.watches[0]
+
+        os.write(process.write_fd, '(Reading database ... 5 files)\n'
+                                   'Purging configuration files for foo (1.0) ...\n'
+                                   'Purging configuration files for ba')
+        self.assertTrue(callback(fd, FakeGObject.IO_IN))
+        os.write(process.write_fd, 'r:amd64 (2.0) ...\ndpkg: warning')
+        self.assertTrue(callback(fd, FakeGObject.IO_IN))
+        os.close(process.write_fd)
+        process.write_fd = None
+        # The last line without the newline is sent when dpkg exits
+        while callback(fd, FakeGObject.IO_HUP):
+            pass
+
+        self.assertEqual([('purge_output', 'id1', '(Reading database ... 5 files)'),
+                          ('purge_output', 'id1', 'Purging configuration files for foo (1.0) ...'),
+                          ('package_purged', 'id1', 'foo'),
+                          ('purge_output', 'id1', 'Purging configuration files for bar:amd64 (2.0) ...'),
+                          ('package_purged', 'id1', 'bar:amd64'),
+                          ('purge_output', 'id1', 'dpkg: warning'),
+                          ('purge_finished', 'id1', 1)],
+                         self.daemon.signals)
+
+        # The next purge can be started
+        self.assertTrue(self.daemon.purge_config_packages('id2', ['baz']))
+
+    def tearDown(self):
+        daemon.subprocess.Popen = self.popen
+        daemon.GObject = self.old_gobject
+        for process in self.processes:
+            process.stdout.close()
+            if process.write_fd is not None:
+                os.close(process.write_fd)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils.deletion import Deleter
+from ubuntutweak.utils.diskusage import DiskUsage
+
+class TestDeleter(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.outside = tempfile.mkdtemp()
+        open(os.path.join(self.outside, 'keep'), 'w').write('keep')
+
+        for i in range(5):
+            folder = os.path.join(self.root, 'cache', 'dir%d' % i, 'sub')
+            os.makedirs(folder)
+            for j in range(20):
+                open(os.path.join(folder, 'file%d' % j), 'w').write('x' * (i * 100 + j))
+
+        os.link(os.path.join(self.root, 'cache', 'dir1', 'sub', 'file1'),
+                os.path.join(self.root, 'cache', 'dir2', 'hardlink'))
+        os.symlink(self.outside, os.path.join(self.root, 'cache', 'symlink'))
+        open(os.path.join(self.root, 'single'), 'w').write('x' * 100)
+
+    def test_delete(self):
+        paths = [os.path.join(self.root, 'cache'),
+                 os.path.join(self.root, 'single'),
+                 os.path.join(self.root, 'not-exists')]
+        sizes = DiskUsage().get_sizes(paths)
+        progress = []
+        finished = {}
+        fds = os.listdir('/proc/self/fd')
+
+        deleter = Deleter(progress_callback=progress.append,
+                          finished_callback=lambda index, size, errors: finished.setdefault(index, (size, errors)))
+        result = deleter.delete(paths)
+
+        self.assertEqual([(size, []) for size in sizes], result)
+        self.assertEqual(dict(enumerate(result)), finished)
+        self.assertEqual(sum(sizes), progress[-1])
+        self.assertEqual([], os.listdir(self.root))
+        self.assertEqual(['keep'], os.listdir(self.outside))
+        self.assertEqual(len(fds), len(os.listdir('/proc/self/fd')))
+
+    def test_symlink(self):
+        outside = self.outside
+
+        class SwappingDeleter(Deleter):
+            def _delete_directory(self, job, node):
+                # It is listed as a directory, but is a symlink when opened
+                if node.name == 'dir3':
+                    shutil.rmtree(node.path)
+                    os.symlink(outside, node.path)
+                Deleter._delete_directory(self, job, node)
+
+        path = os.path.join(self.root, 'cache')
+        (size, errors), = SwappingDeleter(workers=1).delete([path])
+
+        self.assertEqual([os.path.join(path, 'dir3')], [error[0] for error in errors])
+        self.assertEqual(['keep'], os.listdir(self.outside))
+        self.assertEqual(['dir3'], os.listdir(path))
+
+    def test_cancel(self):
+        class Cancellable(object):
+            def is_cancelled(self):
+                return True
+
+        path = os.path.join(self.root, 'cache')
+        self.assertEqual([(0, [])], Deleter(cancellable=Cancellable()).delete([path]))
+        self.assertTrue(os.path.exists(path))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        shutil.rmtree(self.outside)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils import diskusage
+from ubuntutweak.utils.diskusage import DiskUsage
+from ubuntutweak.utils.scanindex import ScanIndex
+
+class TestDiskUsage(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        for i in range(5):
+            folder = os.path.join(self.root, 'dir%d' % i, 'sub')
+            os.makedirs(folder)
+            for j in range(10):
+                f = open(os.path.join(folder, 'file%d' % j), 'w')
+                f.write('x' * (i * 100 + j))
+                f.close()
+
+        os.link(os.path.join(self.root, 'dir1', 'sub', 'file1'),
+                os.path.join(self.root, 'dir2', 'hardlink'))
+        os.symlink('/usr', os.path.join(self.root, 'symlink'))
+
+    def get_du_size(self, path):
+        return int(os.popen('du -bs "%s"' % path).read().split()[0])
+
+    def test_disk_usage(self):
+        self.assertEqual(self.get_du_size(self.root), DiskUsage().get_size(self.root))
+        self.assertEqual(self.get_du_size(self.root), DiskUsage(workers=1).get_size(self.root))
+
+        paths = [os.path.join(self.root, name) for name in sorted(os.listdir(self.root))]
+        paths.append(os.path.join(self.root, 'not-exists'))
+        self.assertEqual([self.get_du_size(path) for path in paths[:-1]] + [0],
+                         DiskUsage().get_sizes(paths))
+
+    def test_usage(self):
+        path = os.path.join(self.root, 'dir3', 'sub', 'file3')
+        os.utime(path, (2000000000, 2000000000))
+
+        usage = DiskUsage().get_usages([self.root])[0]
+        self.assertEqual(self.get_du_size(self.root), usage.size)
+        self.assertEqual(2000000000, usage.mtime)
+        self.assertEqual(2000000000, usage.atime)
+
+    def test_usage_callback(self):
+        paths = [os.path.join(self.root, name) for name in sorted(os.listdir(self.root))]
+        done = {}
+        usages = DiskUsage(usage_callback=lambda index, usage: done.setdefault(index, usage.size)).get_usages(paths)
+
+        self.assertEqual(dict(enumerate(usage.size for usage in usages)), done)
+
+    def test_cancel(self):
+        class Cancellable(object):
+            def is_cancelled(self):
+                return True
+
+        self.assertEqual(os.lstat(self.root).st_size,
+                         DiskUsage(cancellable=Cancellable()).get_size(self.root))
+
+    def test_scan_index(self):
+        index = ScanIndex(os.path.join(tempfile.mkdtemp(), 'scan.index'))
+        self.assertEqual(self.get_du_size(self.root), DiskUsage(index=index).get_size(self.root))
+
+        listed = []
+        iter_entries = diskusage.iter_entries
+        diskusage.iter_entries = lambda path: listed.append(path) or iter_entries(path)
+
+        try:
+            # Load from the disk again, nothing changed so nothing is listed
+            index = ScanIndex(index.path)
+            self.assertEqual(self.get_du_size(self.root), DiskUsage(index=index).get_size(self.root))
+            self.assertEqual([], listed)
+
+            new_file = os.path.join(self.root, 'dir3', 'sub', 'new')
+            open(new_file, 'w').write('x' * 1000)
+            self.assertEqual(self.get_du_size(self.root), DiskUsage(index=index).get_size(self.root))
+            self.assertEqual([os.path.dirname(new_file)], listed)
+
+            # Rewrite in place can only be found after invalidate
+            open(new_file, 'w').write('x' * 10)
+            index.invalidate(os.path.join(self.root, 'dir3'))
+            self.assertEqual(self.get_du_size(self.root), DiskUsage(index=index).get_size(self.root))
+        finally:
+            diskusage.iter_entries = iter_entries
+            shutil.rmtree(os.path.dirname(index.path))
+
+    def test_scan_index_expire(self):
+        index = ScanIndex(os.path.join(tempfile.mkdtemp(), 'scan.index'))
+        path = os.path.join(self.root, 'dir3', 'sub', 'file3')
+        os.utime(os.path.dirname(path), (1000000000, 1000000000))
+        DiskUsage(index=index).get_size(self.root)
+
+        try:
+            # The folder isn't changed, so the old size is used until the
+            # record expires
+            open(path, 'w').write('x' * 10000)
+            os.utime(os.path.dirname(path), (1000000000, 1000000000))
+            self.assertNotEqual(self.get_du_size(self.root), DiskUsage(index=index).get_size(self.root))
+
+            index.max_age = 0
+            self.assertEqual(self.get_du_size(self.root), DiskUsage(index=index).get_size(self.root))
+        finally:
+            shutil.rmtree(os.path.dirname(index.path))
+
+    def test_scan_index_prune(self):
+        index = ScanIndex(os.path.join(tempfile.mkdtemp(), 'scan.index'))
+        paths = [os.path.join(self.root, 'dir%d' % i) for i in range(5)]
+        DiskUsage(index=index).get_sizes(paths)
+
+        try:
+            shutil.rmtree(paths[0])
+            index.invalidate(os.path.join(paths[1], 'sub'))
+            index.save()
+
+            index = ScanIndex(index.path)
+            self.assertEqual(sorted(paths[1:] + [os.path.join(path, 'sub') for path in paths[2:]]),
+                             sorted(index._get_records()))
+        finally:
+            shutil.rmtree(os.path.dirname(index.path))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils import dpkg
+
+STATUS = os.path.join(os.path.dirname(__file__), 'data', 'dpkg-status')
+
+class TestDpkg(unittest.TestCase):
+    def test_stanzas(self):
+        stanzas = list(dpkg.iter_stanzas(STATUS))
+        self.assertEqual(['adduser', 'gedit-common', 'libgtk2.0-0', 'unity-lens-shopping'],
+                         [stanza['Package'] for stanza in stanzas])
+        self.assertEqual('add and remove users and groups\n'
+                         'This package includes the \'adduser\' and \'deluser\' commands for creating\n'
+                         'and removing users.', stanzas[0]['Description'])
+        self.assertEqual(['/etc/gedit-common.conf', '/etc/gedit-common/plugins.conf'],
+                         dpkg.get_conffiles(stanzas[1]))
+
+        stanzas = list(dpkg.iter_stanzas(STATUS, fields=('Package', 'Status')))
+        self.assertEqual({'Package': 'adduser', 'Status': 'install ok installed'}, stanzas[0])
+
+    def test_package_stanza(self):
+        self.assertEqual('3.113+nmu3ubuntu3', dpkg.get_package_stanza('adduser', STATUS)['Version'])
+        self.assertEqual('all', dpkg.get_package_stanza('adduser', STATUS)['Architecture'])
+        self.assertEqual(None, dpkg.get_package_stanza('gedit-common', STATUS))
+        self.assertEqual(None, dpkg.get_package_stanza('gedit', STATUS))
+
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, 'status')
+            open(path, 'w').write(open(STATUS).read().replace('install ok installed',
+                                                              'hold ok installed'))
+            self.assertEqual('3.113+nmu3ubuntu3', dpkg.get_package_stanza('adduser', path)['Version'])
+        finally:
+            shutil.rmtree(root)
+
+    def test_config_packages(self):
+        self.assertEqual([('gedit-common', 0), ('libgtk2.0-0:i386', 0)],
+                         list(dpkg.iter_config_packages(STATUS)))
+
+        root = tempfile.mkdtemp()
+        try:
+            conffile = os.path.join(root, 'gedit-common.conf')
+            open(conffile, 'w').write('x' * 100)
+            status = os.path.join(root, 'status')
+            open(status, 'w').write(open(STATUS).read().replace('/etc/gedit-common.conf', conffile))
+
+            self.assertEqual([('gedit-common', 100), ('libgtk2.0-0:i386', 0)],
+                             list(dpkg.iter_config_packages(status)))
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    unittest.main()
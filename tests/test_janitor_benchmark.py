@@ -0,0 +1,261 @@
+'''The benchmark of the bundled janitor cache plugins.
+
+Every plugin gets a deterministic synthetic tree under a temporary home:
+deep and wide thumbnail caches, Chromium style caches with many small files,
+Mozilla profiles and a fake /var/cache/apt/archives with thousands of .deb
+files. get_cruft_by_path/get_cruft_by_glob, get_cruft and clean_cruft are
+timed for every plugin and reported as files/s and bytes/s. The tree is
+scanned once before get_cruft is timed, so it is a warm scan which uses the
+scan index, the first get_cruft of the plugins with targets is reported as
+get_cruft_cold.
+
+The files/s of every operation is divided by the files/s of a calibration
+walk, a plain os.walk and lstat of the same tree in the same process, so
+the relative rates don't depend on how fast the machine is.
+
+It only runs with UT_BENCHMARK=1. The relative rates are compared with
+tests/data/janitor-benchmark.json, a rate lower than the baseline times
+UT_BENCHMARK_TOLERANCE (default 0.25) fails. Run it with UT_BENCHMARK_SAVE=1
+as well to save the relative rates of this machine as the baseline.
+'''
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.modules import ModuleLoader
+from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.scanindex import scan_index
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'janitor-benchmark.json')
+# The calibration walk is timed so many times, the fastest one is used
+CALIBRATION_RUNS = 3
+
+
+class TreeGenerator(object):
+    '''Create the same files for the same seed, return (files, bytes)'''
+
+    def __init__(self, seed):
+        self.random = random.Random(zlib.crc32(seed))
+
+    def write_file(self, path, min_size, max_size):
+        size = self.random.randint(min_size, max_size)
+        f = open(path, 'wb')
+        f.write('x' * size)
+        f.close()
+        return size
+
+    def make_wide(self, root, dirs, files, min_size=1024, max_size=16384, name='%032x.png'):
+        total = 0
+
+        for i in range(dirs):
+            folder = os.path.join(root, 'd%02d' % i) if dirs > 1 else root
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            for j in range(files):
+                total += self.write_file(os.path.join(folder, name % self.random.getrandbits(128)),
+                                         min_size, max_size)
+
+        return dirs * files, total
+
+    def make_deep(self, root, depth, files, min_size=512, max_size=4096):
+        total = 0
+        folder = root
+
+        for i in range(depth):
+            folder = os.path.join(folder, 'level%d' % i)
+            os.makedirs(folder)
+            for j in range(files):
+                total += self.write_file(os.path.join(folder, 'f%d' % j), min_size, max_size)
+
+        return depth * files, total
+
+    def make_thumbnails(self, root):
+        files, size = 0, 0
+        for name in ('normal', 'large', 'fail/gnome-thumbnail-factory'):
+            result = self.make_wide(os.path.join(root, name), 1, 800)
+            files, size = files + result[0], size + result[1]
+
+        result = self.make_deep(os.path.join(root, 'deep'), 30, 20)
+        return files + result[0], size + result[1]
+
+    def make_chromium(self, root):
+        files, size = self.make_wide(os.path.join(root, 'Cache'), 1, 4000, 128, 2048, 'f_%06x')
+        result = self.make_wide(os.path.join(root, 'Media Cache'), 4, 100, 4096, 65536, 'f_%06x')
+        return files + result[0], size + result[1]
+
+    def make_mozilla(self, plugin_class, home):
+        app_path = plugin_class.expand_path(plugin_class.app_path)
+        os.makedirs(app_path)
+        f = open(os.path.join(app_path, 'profiles.ini'), 'w')
+        f.write('[General]\nStartWithLastProfile=1\n\n'
+                '[Profile0]\nName=default\nIsRelative=1\nPath=bench.default\n')
+        f.close()
+
+        root = plugin_class.get_path()
+        files, size = self.make_wide(os.path.join(root, 'cache2', 'entries'), 1, 3000, 256, 8192, '%040X')
+        result = self.make_wide(os.path.join(root, 'startupCache'), 1, 20, 4096, 65536, 'f%x')
+        return files + result[0], size + result[1]
+
+    def make_apt_archives(self, root):
+        os.makedirs(os.path.join(root, 'partial'))
+        return self.make_wide(root, 1, 3000, 1024, 32768, 'package%032x_1.0_amd64.deb')
+
+
+def get_bundled_plugins():
+    loader = ModuleLoader('janitor', check_active=False)
+    plugins = [plugin for plugin in loader.module_table.values()
+               if isinstance(plugin, type) and issubclass(plugin, JanitorCachePlugin) and
+               plugin.get_title() and not plugin.is_user_extension()]
+    plugins.sort(key=lambda plugin: plugin.get_name())
+
+    return plugins
+
+
+@unittest.skipUnless(os.environ.get('UT_BENCHMARK'), 'Set UT_BENCHMARK=1 to run the benchmark')
+class TestJanitorBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.home = os.path.join(self.root, 'home')
+        self.results = {}
+
+        # The plugins use the shared scan index, keep it out of the config
+        # of the user
+        self.index_path = scan_index.path
+        scan_index.path = os.path.join(self.root, 'janitor-scan.index')
+        scan_index._records = None
+
+    def make_tree(self, plugin_class):
+        '''Return the plugin class for the synthetic tree and (files, bytes)'''
+        name = plugin_class.get_name()
+        generator = TreeGenerator(name)
+
+        if plugin_class.pattern != '*':
+            plugin_class = type(name, (plugin_class,),
+                                {'root_path': self.root + plugin_class.root_path,
+                                 '__module__': plugin_class.__module__})
+            return plugin_class, generator.make_apt_archives(plugin_class.get_path())
+
+        plugin_class = plugin_class.for_home(self.home)
+
+        if hasattr(plugin_class, 'app_path'):
+            return plugin_class, generator.make_mozilla(plugin_class, self.home)
+        elif name == 'ThumbnailCachePlugin':
+            return plugin_class, generator.make_thumbnails(plugin_class.get_path())
+        elif name in ('ChromeCachePlugin', 'ChromiumCachePlugin'):
+            return plugin_class, generator.make_chromium(plugin_class.get_path())
+        else:
+            return plugin_class, generator.make_wide(plugin_class.get_path(), 5, 100)
+
+    def time_call(self, plugin, method, *args, **kwargs):
+        found = []
+        handler = plugin.connect('find_object', lambda plugin, cruft, count: found.append(cruft))
+
+        start = time.time()
+        getattr(plugin, method)(*args, **kwargs)
+        seconds = time.time() - start
+
+        plugin.disconnect(handler)
+        return found, seconds
+
+    def calibrate(self, path):
+        '''Return the files/s of a plain walk of the tree'''
+        best = None
+
+        for i in range(CALIBRATION_RUNS):
+            files = 0
+            start = time.time()
+            for folder, dirs, names in os.walk(path):
+                for name in names:
+                    os.lstat(os.path.join(folder, name))
+                    files += 1
+            seconds = max(time.time() - start, 1e-6)
+
+            if best is None or seconds < best:
+                best = seconds
+
+        return files / best
+
+    def add_result(self, plugin_class, operation, files, size, seconds):
+        seconds = max(seconds, 1e-6)
+        self.results['%s.%s' % (plugin_class.get_name(), operation)] = {
+                'files_per_second': int(files / seconds),
+                'bytes_per_second': int(size / seconds),
+                'relative_rate': round(files / seconds / self.calibration, 3)}
+
+    def run_plugin(self, plugin_class):
+        plugin_class, (files, size) = self.make_tree(plugin_class)
+        plugin = plugin_class()
+        self.calibration = self.calibrate(plugin_class.get_path())
+
+        if plugin_class.pattern != '*':
+            crufts, seconds = self.time_call(plugin, 'get_cruft_by_glob')
+            self.add_result(plugin_class, 'get_cruft_by_glob', files, size, seconds)
+        elif not plugin_class.targets:
+            crufts, seconds = self.time_call(plugin, 'get_cruft_by_path')
+            self.add_result(plugin_class, 'get_cruft_by_path', files, size, seconds)
+        else:
+            crufts, seconds = self.time_call(plugin, 'get_cruft')
+            self.add_result(plugin_class, 'get_cruft_cold', files, size, seconds)
+
+        # It is a warm scan if the tree has been scanned above
+        crufts, seconds = self.time_call(plugin, 'get_cruft')
+        self.add_result(plugin_class, 'get_cruft', files, size, seconds)
+        self.assertTrue(crufts, '%s found nothing' % plugin_class.get_name())
+
+        # The apt cache is cleaned by the daemon
+        if plugin_class.get_category() != 'system':
+            found, seconds = self.time_call(plugin, 'clean_cruft', cruft_list=crufts)
+            self.add_result(plugin_class, 'clean_cruft', files, size, seconds)
+            self.assertFalse([cruft for cruft in crufts if os.path.lexists(cruft.get_path())])
+
+    def test_benchmark(self):
+        plugins = get_bundled_plugins()
+        self.assertTrue(plugins)
+
+        for plugin_class in plugins:
+            self.run_plugin(plugin_class)
+
+        sys.stderr.write('\n%-50s %12s %14s %10s\n' % ('', 'files/s', 'bytes/s', 'relative'))
+        for key in sorted(self.results):
+            sys.stderr.write('%-50s %12d %14d %10.3f\n' % (key,
+                                                           self.results[key]['files_per_second'],
+                                                           self.results[key]['bytes_per_second'],
+                                                           self.results[key]['relative_rate']))
+
+        if os.environ.get('UT_BENCHMARK_SAVE'):
+            baseline = dict((key, {'relative_rate': result['relative_rate']})
+                            for key, result in self.results.items())
+            f = open(BASELINE_PATH, 'w')
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.close()
+            return
+
+        baseline = json.load(open(BASELINE_PATH))
+        tolerance = float(os.environ.get('UT_BENCHMARK_TOLERANCE', 0.25))
+        regressions = []
+
+        for key, result in sorted(self.results.items()):
+            if key not in baseline:
+                continue
+            expected = baseline[key]['relative_rate'] * tolerance
+            if result['relative_rate'] < expected:
+                regressions.append('%s: %.3f of the calibration walk, the baseline is %.3f' %
+                                   (key, result['relative_rate'], baseline[key]['relative_rate']))
+
+        self.assertFalse(regressions, '\n'.join(regressions))
+
+    def tearDown(self):
+        scan_index.path = self.index_path
+        scan_index._records = None
+        scan_index._dirty = False
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
 import os
+import time
+import shutil
+import tempfile
 import unittest
 
+from ubuntutweak.utils import scanindex
+from ubuntutweak.janitor import JanitorCachePlugin, CacheObject, PackageObject
 from ubuntutweak.janitor.mozilla_plugin import FirefoxCachePlugin
 
 class TestJanitorPlugin(unittest.TestCase):
@@ -10,5 +15,102 @@ class TestJanitorPlugin(unittest.TestCase):
     def test_firefox_plugin(self):
         self.assertTrue(os.path.expanduser('~/.mozilla/firefox/5tzbwjwa.default'), self.firefox_plugin.get_path())
 
+class TestCruftObject(unittest.TestCase):
+    def test_slots(self):
+        for cruft in (CacheObject('cache', '/tmp/cache', 10, True),
+                      PackageObject('Package', 'package', 10)):
+            self.assertFalse(hasattr(cruft, '__dict__'))
+            self.assertTrue(cruft.is_reclaimable())
+            self.assertEqual(None, cruft.owner)
+
+        self.assertTrue(CacheObject('cache', '/tmp/cache', 10, True).is_dir())
+        self.assertTrue(CacheObject('tmp', '/tmp', 10).is_dir())
+
+class TestSelectionRules(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        old_time = time.time() - 30 * 86400
+
+        for i, name in enumerate(('a.cache', 'b.cache', 'c.cache', 'd.tmp', 'keep.cache')):
+            path = os.path.join(self.root, name)
+            open(path, 'w').write('x' * 1024 * (i + 1))
+            os.utime(path, (old_time + i, old_time + i))
+
+        open(os.path.join(self.root, 'hot.cache'), 'w').write('x' * 10240)
+
+    def get_reclaimable(self, **rules):
+        rules['root_path'] = self.root
+        plugin = type('DemoCachePlugin', (JanitorCachePlugin,), rules)()
+        found = []
+        plugin.connect('find_object', lambda plugin, cruft, count: found.append(cruft))
+        plugin.get_cruft()
+
+        return sorted(cruft.get_name() for cruft in found if cruft.is_reclaimable())
+
+    def test_rules(self):
+        self.assertEqual(['a.cache', 'b.cache', 'c.cache', 'd.tmp', 'hot.cache', 'keep.cache'],
+                         self.get_reclaimable())
+        self.assertEqual(['a.cache', 'b.cache', 'c.cache', 'd.tmp', 'keep.cache'],
+                         self.get_reclaimable(min_age=7, age_by='mtime'))
+        self.assertEqual(['c.cache', 'd.tmp', 'hot.cache', 'keep.cache'],
+                         self.get_reclaimable(min_size=3 * 1024))
+        self.assertEqual(['a.cache', 'b.cache', 'c.cache'],
+                         self.get_reclaimable(include=('*.cache',), exclude=('keep.*', 'hot.*')))
+        self.assertEqual(['a.cache', 'b.cache', 'c.cache', 'd.tmp'],
+                         self.get_reclaimable(keep_newest=2, age_by='mtime'))
+
+    def test_rewritten_in_place(self):
+        folder = os.path.join(self.root, 'folder.cache')
+        os.mkdir(folder)
+        path = os.path.join(folder, 'file')
+        open(path, 'w').write('x')
+        old_time = time.time() - 30 * 86400
+        os.utime(path, (old_time, old_time))
+        os.utime(folder, (old_time, old_time))
+
+        index = scanindex.scan_index
+        old_path = index.path
+        index.path = os.path.join(self.root, 'scan.index')
+        index._records = None
+        try:
+            self.assertTrue('folder.cache' in self.get_reclaimable(min_age=7, age_by='mtime'))
+
+            # Neither the inode nor the mtime of the folder is changed
+            open(path, 'w').write('y')
+            os.utime(folder, (old_time, old_time))
+            self.assertFalse('folder.cache' in self.get_reclaimable(min_age=7, age_by='mtime'))
+        finally:
+            index.path = old_path
+            index._records = None
+            index._dirty = False
+
+    def test_cancel(self):
+        plugin = type('DemoCachePlugin', (JanitorCachePlugin,), {'root_path': self.root})()
+        found = []
+        cancelled = []
+
+        def on_find_object(plugin, cruft, count):
+            found.append(cruft)
+            plugin.cancel()
+
+        plugin.connect('find_object', on_find_object)
+        plugin.connect('scan_cancelled', lambda plugin, count, size: cancelled.append((count, size)))
+        plugin.get_cruft()
+
+        self.assertTrue(found)
+        self.assertEqual([(len(found), sum(cruft.get_size() for cruft in found))], cancelled)
+
+    def test_no_cancellable(self):
+        class UserCachePlugin(JanitorCachePlugin):
+            def __init__(self):
+                pass
+
+        plugin = UserCachePlugin()
+        plugin.cancel()
+        self.assertFalse(plugin.is_cancelled())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
 if __name__ == '__main__':
     unittest.main()
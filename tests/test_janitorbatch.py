@@ -0,0 +1,156 @@
+import os
+import sys
+import pwd
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
+from ubuntutweak.utils.janitorbatch import BatchJanitor, get_home_dirs, get_home_plugins, \
+        is_in_home, parse_size
+
+class DemoCachePlugin(JanitorCachePlugin):
+    __title__ = 'Demo Cache'
+    __category__ = 'application'
+
+    root_path = '~/.cache/demo'
+
+class TestBatchJanitor(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        for user in ('alice', 'bob'):
+            cache = os.path.join(self.root, user, '.cache', 'demo')
+            os.makedirs(cache)
+            open(os.path.join(cache, 'big'), 'w').write('x' * 2048)
+            open(os.path.join(cache, 'small'), 'w').write('x' * 10)
+
+        old_time = time.time() - 10 * 86400
+        os.utime(os.path.join(self.root, 'alice', '.cache', 'demo', 'big'), (old_time, old_time))
+
+    def test_parse_size(self):
+        self.assertEqual(512, parse_size('512'))
+        self.assertEqual(100 * 1024, parse_size('100K'))
+        self.assertEqual(int(1.5 * 1024 ** 2), parse_size('1.5MB'))
+
+    def test_dry_run(self):
+        homes = get_home_dirs([self.root])
+        self.assertEqual(['alice', 'bob'], [user for user, home in homes])
+
+        report = BatchJanitor([DemoCachePlugin], min_size=1024, dry_run=True).run(homes)
+        self.assertEqual(2, report['count'])
+        self.assertEqual(4096, report['size'])
+        self.assertEqual([{'path': os.path.join(self.root, 'bob', '.cache', 'demo', 'big'), 'size': 2048}],
+                         report['users']['bob']['plugins']['DemoCachePlugin']['cruft'])
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'bob', '.cache', 'demo', 'big')))
+
+    def test_clean(self):
+        report = BatchJanitor([DemoCachePlugin], min_age=7).run(get_home_dirs([self.root]))
+        self.assertEqual(1, report['count'])
+        self.assertEqual(1, report['users']['alice']['plugins']['DemoCachePlugin']['cleaned_count'])
+        self.assertEqual(['small'], os.listdir(os.path.join(self.root, 'alice', '.cache', 'demo')))
+        self.assertEqual(2, len(os.listdir(os.path.join(self.root, 'bob', '.cache', 'demo'))))
+
+    def test_subtree_age(self):
+        cache = os.path.join(self.root, 'alice', '.cache', 'demo')
+        old_time = time.time() - 10 * 86400
+        # Only a file inside is used, the folder itself looks old
+        os.makedirs(os.path.join(cache, 'hot'))
+        open(os.path.join(cache, 'hot', 'data'), 'w').write('x' * 2048)
+        os.utime(os.path.join(cache, 'hot'), (old_time, old_time))
+        os.makedirs(os.path.join(cache, 'cold'))
+        open(os.path.join(cache, 'cold', 'data'), 'w').write('x' * 2048)
+        os.utime(os.path.join(cache, 'cold', 'data'), (old_time, old_time))
+        os.utime(os.path.join(cache, 'cold'), (old_time, old_time))
+
+        report = BatchJanitor([DemoCachePlugin], min_age=7, dry_run=True).run(
+                [('alice', os.path.join(self.root, 'alice'))])
+        self.assertEqual([os.path.join(cache, name) for name in ('cold', 'big')],
+                         [cruft['path'] for cruft in report['users']['alice']['plugins']['DemoCachePlugin']['cruft']])
+
+    def test_symlink(self):
+        outside = os.path.join(self.root, 'outside')
+        victim = os.path.join(outside, 'demo')
+        os.makedirs(victim)
+        open(os.path.join(victim, 'secret'), 'w').write('x' * 2048)
+
+        # The cache itself is a symlink
+        mallory = os.path.join(self.root, 'homes', 'mallory')
+        os.makedirs(os.path.join(mallory, '.cache'))
+        os.symlink(victim, os.path.join(mallory, '.cache', 'demo'))
+        # A folder on the way is a symlink
+        eve = os.path.join(self.root, 'homes', 'eve')
+        os.makedirs(eve)
+        os.symlink(outside, os.path.join(eve, '.cache'))
+
+        self.assertFalse(is_in_home(os.path.join(mallory, '.cache', 'demo'), mallory))
+        self.assertFalse(is_in_home(os.path.join(eve, '.cache', 'demo'), eve))
+        self.assertFalse(is_in_home(os.path.join(eve, '..', 'mallory'), eve))
+        self.assertTrue(is_in_home(os.path.join(mallory, '.cache', 'demo'), mallory, allow_link=True))
+
+        report = BatchJanitor([DemoCachePlugin]).run(get_home_dirs([os.path.join(self.root, 'homes')]))
+        self.assertEqual(0, report['count'])
+        self.assertTrue(report['users']['mallory']['plugins']['DemoCachePlugin']['errors'])
+        self.assertTrue(report['users']['eve']['plugins']['DemoCachePlugin']['errors'])
+        self.assertEqual(['secret'], os.listdir(victim))
+
+    def test_home_plugins(self):
+        names = [plugin.get_name() for plugin in get_home_plugins()]
+        self.assertTrue('ChromeCachePlugin' in names)
+        self.assertTrue('FirefoxCachePlugin' in names)
+        self.assertFalse('AptCachePlugin' in names)
+
+        # The tool doesn't need the UI
+        output = subprocess.Popen([sys.executable, '-c',
+                                   'import sys; from ubuntutweak.utils import janitorbatch; '
+                                   'janitorbatch.get_home_plugins(); '
+                                   'print "gi.repository.Gtk" in sys.modules'],
+                                  stdout=subprocess.PIPE).communicate()[0]
+        self.assertEqual('False', output.strip().splitlines()[-1])
+
+    @unittest.skipUnless(os.geteuid() == 0, 'Only root can run as the owner of a home')
+    def test_owner(self):
+        try:
+            nobody = pwd.getpwnam('nobody')
+        except KeyError:
+            self.skipTest('There is no nobody')
+
+        home = os.path.join(self.root, 'homes', 'nobody')
+        cache = os.path.join(home, '.cache', 'google-chrome', 'Default')
+        os.makedirs(os.path.join(cache, 'Cache'))
+        open(os.path.join(cache, 'Cache', 'data'), 'w').write('x' * 2048)
+        for path in (self.root, os.path.join(self.root, 'homes')):
+            os.chmod(path, 0755)
+        for folder, dirs, files in os.walk(home):
+            os.chown(folder, nobody.pw_uid, nobody.pw_gid)
+            for name in files:
+                os.chown(os.path.join(folder, name), nobody.pw_uid, nobody.pw_gid)
+        # It is owned by root, so nobody can't delete it
+        os.makedirs(os.path.join(cache, 'Media Cache'))
+        open(os.path.join(cache, 'Media Cache', 'data'), 'w').write('x' * 2048)
+
+        # The helper must be able to run Python as nobody
+        try:
+            returncode = subprocess.call([sys.executable, '-c', 'import ubuntutweak'],
+                                         preexec_fn=lambda: os.setuid(nobody.pw_uid),
+                                         stderr=open(os.devnull, 'w'))
+        except OSError:
+            returncode = -1
+        if returncode != 0:
+            self.skipTest('nobody can\'t run Python here')
+
+        plugins = [plugin for plugin in get_home_plugins(['ChromeCachePlugin'])]
+        report = BatchJanitor(plugins).run([('nobody', home)])
+        result = report['users']['nobody']['plugins']['ChromeCachePlugin']
+        self.assertEqual(2, result['count'])
+        self.assertEqual(1, result['cleaned_count'])
+        self.assertFalse(os.path.exists(os.path.join(cache, 'Cache')))
+        self.assertTrue(os.path.exists(os.path.join(cache, 'Media Cache', 'data')))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils.janitorhistory import JanitorHistory, SCAN, CLEAN
+
+class TestJanitorHistory(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.history = JanitorHistory(os.path.join(self.root, 'history.db'))
+
+    def test_history(self):
+        now = time.time()
+        day = 86400
+
+        self.history.add(SCAN, 'ThumbnailCachePlugin', 10, 1000, now - 10 * day)
+        self.history.add(CLEAN, 'ThumbnailCachePlugin', 10, 1000, now - 9 * day)
+        self.history.add(SCAN, 'ThumbnailCachePlugin', 1, 100, now - 9 * day)
+        self.history.add(SCAN, 'ThumbnailCachePlugin', 5, 500, now - 5 * day)
+        self.history.add(SCAN, 'ChromeCachePlugin', 3, 300, now - 2 * day)
+        self.history.add(SCAN, 'AptCachePlugin', 2, 200, now - 3 * day)
+        self.history.add(CLEAN, 'AptCachePlugin', 2, 200, now - 2 * day)
+
+        snapshot = self.history.get_snapshot()
+        self.assertEqual(['ChromeCachePlugin', 'ThumbnailCachePlugin'], sorted(snapshot))
+        self.assertEqual(500, snapshot['ThumbnailCachePlugin'].size)
+        self.assertEqual(5, snapshot['ThumbnailCachePlugin'].count)
+
+        self.assertEqual({'ThumbnailCachePlugin': 100.0}, self.history.get_growth_rates())
+        self.assertEqual(None, self.history.get_growth_rate('ChromeCachePlugin'))
+        self.assertAlmostEqual(5, self.history.get_days_until('ThumbnailCachePlugin', 1500), 3)
+        self.assertEqual(0, self.history.get_days_until('ThumbnailCachePlugin', 500))
+
+        # It is kept on the disk
+        self.history.close()
+        history = JanitorHistory(os.path.join(self.root, 'history.db'))
+        self.assertEqual(4, len(history.get_records('ThumbnailCachePlugin')))
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.modules import ModuleLoader, ModuleInfo
+from ubuntutweak.utils.moduleindex import ModuleIndex
+
+FEATURE = 'test-moduleindex'
+
+SAMPLE_MODULE = '''
+from ubuntutweak.modules import TweakModule
+
+class IndexSample(TweakModule):
+    __title__ = 'Index Sample'
+    __category__ = 'desktop'
+    __keywords__ = 'sample'
+    __icon__ = 'gtk-execute'
+    __utmodule__ = 'utindexsample'
+'''
+
+ACTIVE_MODULE = '''
+from ubuntutweak.modules import TweakModule
+
+class ActiveSample(TweakModule):
+    __title__ = 'Active Sample'
+    __category__ = 'system'
+    __utmodule__ = 'utactivesample'
+
+    @classmethod
+    def is_active(cls):
+        return True
+'''
+
+
+class TestModuleIndex(unittest.TestCase):
+    def setUp(self):
+        self.folder = ModuleLoader.get_user_extension_dir(FEATURE)
+        self.path = os.path.join(self.folder, 'utindexsample.py')
+        self.write_module(SAMPLE_MODULE)
+        self.write_module(ACTIVE_MODULE, os.path.join(self.folder, 'utactivesample.py'))
+
+    def write_module(self, content, path=None):
+        f = open(path or self.path, 'w')
+        f.write(content)
+        f.close()
+
+    def test_index(self):
+        root = tempfile.mkdtemp()
+        try:
+            index = ModuleIndex(os.path.join(root, 'module.index'))
+            st = os.stat(self.path)
+            index.update(self.path, st, [('IndexSample',)])
+            index.save()
+
+            index = ModuleIndex(os.path.join(root, 'module.index'))
+            self.assertEqual(index.lookup(self.path, st), (('IndexSample',),))
+
+            self.write_module(SAMPLE_MODULE + '\n')
+            self.assertEqual(index.lookup(self.path, os.stat(self.path)), None)
+        finally:
+            shutil.rmtree(root)
+
+    def test_loader(self):
+        # They are discovered in the worker processes
+        loader = ModuleLoader(FEATURE, use_index=True)
+        self.assertTrue(isinstance(loader.get_module('IndexSample'), ModuleInfo))
+        self.assertTrue(isinstance(loader.get_module('ActiveSample'), ModuleInfo))
+        self.assertFalse('utindexsample' in sys.modules)
+
+        # The unchanged module is taken from the index
+        loader = ModuleLoader(FEATURE, use_index=True)
+        info = loader.get_module('IndexSample')
+        self.assertTrue(isinstance(info, ModuleInfo))
+        self.assertEqual(info.get_title(), 'Index Sample')
+        self.assertEqual(info.get_category(), 'desktop')
+        self.assertEqual(info.get_keywords(), 'sample')
+        self.assertTrue(info.is_user_extension())
+        self.assertEqual(loader.get_modules_by_category('desktop'), [info])
+
+        # It is imported when it is opened
+        klass = info.get_class()
+        self.assertEqual(klass.get_name(), 'IndexSample')
+        self.assertTrue(klass.is_user_extension())
+
+        # is_active() of it must be called, so it is imported
+        self.assertTrue(isinstance(loader.get_module('ActiveSample'), type))
+        loader = ModuleLoader(FEATURE, check_active=False, use_index=True)
+        self.assertTrue(loader.get_module('ActiveSample').dynamic_active)
+
+        # The loader without the index always has the classes
+        loader = ModuleLoader(FEATURE)
+        self.assertTrue(isinstance(loader.get_module('IndexSample'), type))
+
+        # Only one module is changed, it is imported here
+        self.write_module(SAMPLE_MODULE.replace('Index Sample', 'Changed Sample'))
+        loader = ModuleLoader(FEATURE, use_index=True)
+        self.assertEqual(loader.get_module('IndexSample').get_title(), 'Changed Sample')
+        self.assertTrue(isinstance(loader.get_module('IndexSample'), type))
+
+    def test_search_module_for_name(self):
+        default_features = ModuleLoader.default_features
+        ModuleLoader.default_features = (FEATURE,)
+        try:
+            ModuleLoader(FEATURE, use_index=True)
+            feature, module = ModuleLoader.search_module_for_name('IndexSample')
+            self.assertEqual(feature, FEATURE)
+            self.assertTrue(isinstance(module, ModuleInfo))
+            self.assertEqual(ModuleLoader.search_module_for_name('NewSample'), ('overview', None))
+
+            # It is built only once
+            name_table = ModuleLoader.name_table
+            ModuleLoader.search_module_for_name('IndexSample')
+            self.assertTrue(ModuleLoader.name_table is name_table)
+
+            self.assertEqual(ModuleLoader.fuzz_search('index sampel'), [module])
+
+            # A new user extension is found
+            self.write_module(SAMPLE_MODULE.replace('IndexSample', 'NewSample'),
+                              os.path.join(self.folder, 'utnewsample.py'))
+            self.assertEqual(ModuleLoader.search_module_for_name('NewSample')[0], FEATURE)
+            self.assertEqual(len(ModuleLoader.fuzz_search('sample')), 3)
+        finally:
+            ModuleLoader.default_features = default_features
+            ModuleLoader.name_table = None
+
+    def test_discover(self):
+        # They take longer than the budget to be imported
+        for name in ('SlowSample', 'HangSample'):
+            self.write_module('import time\ntime.sleep(10)\n' +
+                              SAMPLE_MODULE.replace('IndexSample', name),
+                              os.path.join(self.folder, 'ut%s.py' % name.lower()))
+        for i in range(4):
+            self.write_module(SAMPLE_MODULE.replace('IndexSample', 'FastSample%d' % i),
+                              os.path.join(self.folder, 'utfastsample%d.py' % i))
+
+        import_jobs, import_budget = ModuleLoader.import_jobs, ModuleLoader.import_budget
+        ModuleLoader.import_jobs, ModuleLoader.import_budget = 2, 1
+        try:
+            start = time.time()
+            loader = ModuleLoader(FEATURE, use_index=True)
+            self.assertTrue(time.time() - start < 5)
+        finally:
+            ModuleLoader.import_jobs, ModuleLoader.import_budget = import_jobs, import_budget
+
+        # Only the slow ones are broken, the others are imported here if
+        # they are left
+        self.assertEqual(sorted(module.get_name() for module in loader.get_modules_by_category('broken')),
+                         ['BrokenUthangsample', 'BrokenUtslowsample'])
+        for i in range(4):
+            self.assertTrue(loader.get_module('FastSample%d' % i))
+        self.assertFalse('utslowsample' in sys.modules)
+
+    def test_discover_budget(self):
+        # Together they take longer than the budget, but every one of them
+        # is in its budget
+        for i in range(3):
+            self.write_module('import time\ntime.sleep(0.6)\n' +
+                              SAMPLE_MODULE.replace('IndexSample', 'MediumSample%d' % i),
+                              os.path.join(self.folder, 'utmediumsample%d.py' % i))
+
+        import_jobs, import_budget = ModuleLoader.import_jobs, ModuleLoader.import_budget
+        ModuleLoader.import_jobs, ModuleLoader.import_budget = 1, 1
+        try:
+            loader = ModuleLoader(FEATURE, use_index=True)
+        finally:
+            ModuleLoader.import_jobs, ModuleLoader.import_budget = import_jobs, import_budget
+
+        self.assertFalse(loader.get_modules_by_category('broken'))
+        for i in range(3):
+            path = os.path.join(self.folder, 'utmediumsample%d.py' % i)
+            self.assertTrue(path in loader._discovered_paths)
+            self.assertFalse('utmediumsample%d' % i in sys.modules)
+
+    def tearDown(self):
+        for name in ['utindexsample', 'utactivesample'] + ['utfastsample%d' % i for i in range(4)]:
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.folder)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import time
+import threading
+import unittest
+
+from ubuntutweak.janitor import packageconfigs_plugin
+from ubuntutweak.janitor.packageconfigs_plugin import PackageConfigsPlugin, PackageConfigObject
+
+
+class FakeMatch(object):
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+    def remove(self):
+        self.proxy.removed += 1
+
+
+class FakeProxy(object):
+    '''The proxy of the daemon, the purge is played by the script, a list of
+    (seconds to wait, signal name, args) which is sent from another thread
+    like the signals of the bus. The purge_id in the args is replaced by the
+    one of the call if it is None'''
+
+    def __init__(self, script, available=True, accepted=True):
+        self.script = script
+        self.available = available
+        self.accepted = accepted
+        self.handlers = {}
+        self.removed = 0
+        self.calls = []
+
+    def connect_to_signal(self, name, handler):
+        if not self.available:
+            return None
+        self.handlers[name] = handler
+        return FakeMatch(self)
+
+    def connect_to_owner_changed(self, handler):
+        return self.connect_to_signal('NameOwnerChanged', handler)
+
+    def purge_config_packages(self, purge_id, pkgs):
+        self.calls.append((purge_id, pkgs))
+        if not self.accepted:
+            return False
+
+        def play():
+            for seconds, name, args in self.script:
+                time.sleep(seconds)
+                if name != 'NameOwnerChanged' and args[0] is None:
+                    args = (purge_id,) + args[1:]
+                self.handlers[name](*args)
+
+        threading.Thread(target=play).start()
+        return True
+
+
+class TestPackageConfigsPlugin(unittest.TestCase):
+    def setUp(self):
+        self.proxy = packageconfigs_plugin.proxy
+        self.cruft_list = [PackageConfigObject('foo'), PackageConfigObject('bar:amd64')]
+
+    def clean(self, proxy, purge_timeout=None):
+        '''Return the list of (signal, args) emitted by the plugin'''
+        packageconfigs_plugin.proxy = proxy
+        plugin = PackageConfigsPlugin()
+        if purge_timeout:
+            plugin.purge_timeout = purge_timeout
+        signals = []
+
+        plugin.connect('object_cleaned',
+                       lambda plugin, cruft, count: signals.append(('object_cleaned', cruft.get_name())))
+        plugin.connect('clean_error', lambda plugin, error: signals.append(('clean_error', error)))
+        plugin.connect('all_cleaned', lambda plugin, cleaned: signals.append(('all_cleaned', cleaned)))
+
+        plugin.clean_cruft(cruft_list=self.cruft_list)
+        return signals
+
+    def test_purge(self):
+        proxy = FakeProxy([(0, 'purge_output', (None, 'Removing foo ...')),
+                           (0, 'purge_output', (None, 'Purging configuration files for foo (1.0) ...')),
+                           (0, 'package_purged', (None, 'foo')),
+                           # dpkg doesn't print the architecture
+                           (0, 'package_purged', (None, 'bar')),
+                           (0, 'purge_finished', (None, 0))])
+
+        self.assertEqual([('object_cleaned', 'foo'),
+                          ('object_cleaned', 'bar:amd64'),
+                          ('all_cleaned', True)],
+                         self.clean(proxy))
+        self.assertEqual([['foo', 'bar:amd64']], [pkgs for purge_id, pkgs in proxy.calls])
+        self.assertEqual(4, proxy.removed)
+
+    def test_other_purge(self):
+        # The signals of another client are ignored, even if they come first
+        proxy = FakeProxy([(0, 'package_purged', ('other', 'foo')),
+                           (0, 'purge_finished', ('other', 0)),
+                           (0, 'purge_output', (None, 'dpkg: error processing bar')),
+                           (0, 'package_purged', (None, 'foo')),
+                           (0, 'purge_finished', (None, 1))])
+
+        self.assertEqual([('object_cleaned', 'foo'),
+                          ('clean_error', 'dpkg: error processing bar'),
+                          ('all_cleaned', True)],
+                         self.clean(proxy))
+
+    def test_timeout(self):
+        # The output keeps the purge alive longer than the timeout
+        script = [(0.1, 'purge_output', (None, 'Purging configuration files for foo (1.0) ...'))
+                  for i in range(6)]
+        proxy = FakeProxy(script + [(0, 'package_purged', (None, 'foo'))])
+
+        start = time.time()
+        signals = self.clean(proxy, purge_timeout=0.3)
+        seconds = time.time() - start
+
+        self.assertTrue(seconds >= 0.9, seconds)
+        self.assertEqual(['object_cleaned', 'clean_error', 'all_cleaned'],
+                         [name for name, arg in signals])
+        self.assertTrue(signals[1][1].startswith('The daemon did not answer'))
+        self.assertEqual(4, proxy.removed)
+
+    def test_daemon_quit(self):
+        proxy = FakeProxy([(0, 'package_purged', (None, 'foo')),
+                           (0, 'NameOwnerChanged', (':1.42', ''))])
+
+        self.assertEqual([('object_cleaned', 'foo'),
+                          ('clean_error', 'The daemon quit while purging'),
+                          ('all_cleaned', True)],
+                         self.clean(proxy, purge_timeout=5))
+
+    def test_not_purged(self):
+        self.assertEqual([('clean_error', 'Another purge is running'), ('all_cleaned', True)],
+                         self.clean(FakeProxy([], accepted=False)))
+        self.assertEqual([('clean_error', 'The daemon is not available'), ('all_cleaned', True)],
+                         self.clean(FakeProxy([], available=False)))
+
+    def tearDown(self):
+        packageconfigs_plugin.proxy = self.proxy
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from ubuntutweak.common.profiler import StartupProfiler
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        f = open(os.path.join(self.root, 'utprofilesample.py'), 'w')
+        f.write('import os\nos.system("true")\n')
+        f.close()
+        sys.path.insert(0, self.root)
+        self.profiler = StartupProfiler()
+
+    def test_trace(self):
+        system = os.system
+        self.profiler.start()
+        try:
+            with self.profiler.phase('outer'):
+                with self.profiler.phase('inner'):
+                    import utprofilesample
+                self.profiler.mark('imported')
+            subprocess.call(['true'])
+        finally:
+            self.profiler.stop()
+
+        # Everything is put back
+        self.assertTrue(os.system is system)
+        self.assertEqual(vars(subprocess.Popen)['_execute_child'].__name__, '_execute_child')
+
+        trace = json.loads(json.dumps(self.profiler.get_trace()))
+        self.assertEqual([(phase['name'], phase['depth']) for phase in trace['phases']],
+                         [('outer', 0), ('inner', 1)])
+        self.assertEqual(trace['marks'][0]['name'], 'imported')
+        imports = dict((item['name'], item) for item in trace['imports'])
+        self.assertTrue(imports['utprofilesample']['seconds'] >= imports['utprofilesample']['self_seconds'])
+
+        forks = [(fork['kind'], fork['command']) for fork in trace['forks']]
+        self.assertEqual(forks, [('system', 'true'), ('subprocess', 'true')])
+        self.assertEqual(trace['summary']['forks'], 2)
+
+        # Nothing is recorded after it is stopped
+        os.system('true')
+        self.assertEqual(len(self.profiler.forks), 2)
+
+    def tearDown(self):
+        sys.path.remove(self.root)
+        sys.modules.pop('utprofilesample', None)
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
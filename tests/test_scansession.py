@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils.diskusage import DiskUsage
+from ubuntutweak.utils.scanindex import ScanIndex
+from ubuntutweak.utils.scansession import ScanSession, filter_nested_paths
+
+class TestScanSession(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        for name in ('cache/mozilla/profile', 'cache/thumbnails', 'mozilla'):
+            os.makedirs(os.path.join(self.root, name))
+
+        for name, size in (('cache/mozilla/profile/cache1', 1000),
+                           ('cache/mozilla/profile/cache2', 2000),
+                           ('cache/thumbnails/1.png', 300),
+                           ('cache/file', 40)):
+            f = open(os.path.join(self.root, name), 'w')
+            f.write('x' * size)
+            f.close()
+
+        os.symlink(os.path.join(self.root, 'cache', 'mozilla', 'profile'),
+                   os.path.join(self.root, 'mozilla', 'profile'))
+        os.link(os.path.join(self.root, 'cache', 'thumbnails', '1.png'),
+                os.path.join(self.root, 'mozilla', 'hardlink'))
+
+    def get_path(self, name):
+        return os.path.join(self.root, name)
+
+    def get_du_size(self, path):
+        return int(os.popen('du -bs "%s"' % path).read().split()[0])
+
+    def test_inner_first(self):
+        session = ScanSession()
+
+        mozilla = DiskUsage(session=session, owner='mozilla')
+        usages = mozilla.get_usages([self.get_path('mozilla/profile/cache1'),
+                                     self.get_path('mozilla/hardlink')])
+        self.assertEqual([1000, 300], [usage.size for usage in usages])
+
+        cache = DiskUsage(session=session, owner='cache')
+        self.assertEqual(self.get_du_size(self.get_path('cache')) - 1300,
+                         cache.get_size(self.get_path('cache')))
+
+        self.assertEqual(self.get_du_size(self.get_path('cache')),
+                         session.get_total_size())
+
+    def test_outer_first(self):
+        session = ScanSession()
+
+        cache = DiskUsage(session=session, owner='cache')
+        self.assertEqual(self.get_du_size(self.get_path('cache')),
+                         cache.get_size(self.get_path('cache')))
+
+        mozilla = DiskUsage(session=session, owner='mozilla')
+        usages = mozilla.get_usages([self.get_path('mozilla/profile/'),
+                                     self.get_path('mozilla/hardlink')])
+        self.assertEqual([0, 0], [usage.size for usage in usages])
+        self.assertEqual(['cache', 'cache'], [usage.owner for usage in usages])
+
+        # The symlink itself isn't in the tree of the others
+        self.assertEqual(os.lstat(self.get_path('mozilla/profile')).st_size,
+                         mozilla.get_size(self.get_path('mozilla/profile')))
+
+        session.release('cache')
+        self.assertEqual(self.get_du_size(self.get_path('cache/mozilla/profile')),
+                         mozilla.get_size(self.get_path('mozilla/profile/')))
+
+    def test_index(self):
+        index = ScanIndex(os.path.join(self.root, 'index'))
+        DiskUsage(index=index).get_size(self.get_path('cache'))
+
+        session = ScanSession()
+        DiskUsage(session=session, owner='mozilla').get_size(self.get_path('cache/file'))
+        self.assertEqual(self.get_du_size(self.get_path('cache')) - 40,
+                         DiskUsage(index=index, session=session, owner='cache').get_size(self.get_path('cache')))
+
+    def test_filter_nested_paths(self):
+        paths = [self.get_path('mozilla/profile/cache1'),
+                 self.get_path('cache/mozilla'),
+                 self.get_path('mozilla/profile'),
+                 self.get_path('cache/mozilla/'),
+                 self.get_path('cache/thumbnails')]
+        self.assertEqual([1, 2, 4], filter_nested_paths(paths))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import time
+import struct
+import shutil
+import tempfile
+import unittest
+
+from ubuntutweak.utils.searchindex import SearchIndex, Translations, get_catalog_paths
+
+DOCUMENTS = [('Nautilus', [('Nautilus', 3.0), ('File Manager', 4.0),
+                           ('Manage the behaviour of the file manager', 1.0),
+                           ('thumbnail', 2.0)]),
+             ('Fonts', [('Fonts', 3.0), ('Fonts', 4.0),
+                        ('Change the fonts of the desktop', 1.0),
+                        ('font size', 2.0)]),
+             ('Workspace', [('Workspace', 3.0), ('Workspace Settings', 4.0),
+                            ('Hot corners and the edges of the screen', 1.0),
+                            ('desktop', 2.0), ('', 2.0)])]
+
+
+def write_mo(path, messages):
+    '''Write a gettext catalog of the {msgid: msgstr}'''
+    messages = dict(messages)
+    messages[''] = 'Content-Type: text/plain; charset=UTF-8\n'
+    keys = sorted(messages)
+
+    # The header, the msgid table and the msgstr table, then the strings
+    offset = 7 * 4 + 16 * len(keys)
+    tables = ['', '']
+    data = ''
+    for index, strings in enumerate((keys, [messages[key] for key in keys])):
+        for string in strings:
+            tables[index] += struct.pack('ii', len(string), offset + len(data))
+            data += string + '\0'
+
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    f = open(path, 'wb')
+    f.write(struct.pack('Iiiiiii', 0x950412de, 0, len(keys), 7 * 4,
+                        7 * 4 + 8 * len(keys), 0, 0))
+    f.write(tables[0] + tables[1] + data)
+    f.close()
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.localedir = os.path.join(self.root, 'locale')
+        write_mo(os.path.join(self.localedir, 'de', 'LC_MESSAGES', 'ubuntu-tweak.mo'),
+                 {'File Manager': 'Dateiverwaltung',
+                  'Workspace Settings': 'Arbeitsfl\xc3\xa4chen'})
+        self.index = SearchIndex(os.path.join(self.root, 'search.index'), self.localedir)
+        self.index.build(DOCUMENTS)
+
+    def test_translations(self):
+        translations = Translations(get_catalog_paths(self.localedir))
+        self.assertEqual(translations.get_translations('File Manager'), set([u'Dateiverwaltung']))
+        self.assertEqual(translations.get_translations(u'Dateiverwaltung'), set([u'File Manager']))
+        self.assertEqual(translations.get_translations('Fonts'), set())
+
+    def test_search(self):
+        self.assertEqual(self.index.search('nautilus'), ['Nautilus'])
+        self.assertEqual(self.index.search('NAUT'), ['Nautilus'])
+        # In another language
+        self.assertEqual(self.index.search('dateiverwaltung'), ['Nautilus'])
+        self.assertEqual(self.index.search(u'arbeitsfl\xe4chen'), ['Workspace'])
+        # With a typo, or inside a word
+        self.assertEqual(self.index.search('nautlus'), ['Nautilus'])
+        self.assertEqual(self.index.search('space'), ['Workspace'])
+        # All the words must match
+        self.assertEqual(self.index.search('file desktop'), [])
+        self.assertEqual(self.index.search('fonts desktop'), ['Fonts'])
+        self.assertEqual(self.index.search(''), [])
+        self.assertEqual(self.index.search('zzz'), [])
+
+    def test_rank(self):
+        # The keyword counts more than the description
+        self.assertEqual(self.index.search('desktop'), ['Workspace', 'Fonts'])
+        # The same weight, by the key
+        self.assertEqual(self.index.search('the'), ['Fonts', 'Nautilus', 'Workspace'])
+
+    def test_load(self):
+        index = SearchIndex(self.index.path, self.localedir)
+        index.build(DOCUMENTS)
+        self.assertEqual(index.search('nautilus'), ['Nautilus'])
+
+        start = time.time()
+        for i in range(100):
+            index.search('nautlus')
+        self.assertTrue((time.time() - start) / 100 < 0.001)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+'''The benchmark of listing the modules of the main window.
+
+Every run is a new Python process which lists the tweaks and admins modules
+the way FeaturePage does, and reports its wall time, its max RSS and how
+many modules it has imported. It is run UT_BENCHMARK_RUNS times (default 5)
+with every module imported, as before the module index, and with the warm
+module index, the medians of them are reported.
+
+The startup of the whole application is benchmarked with the trace of
+"ubuntu-tweak --profile-startup", it needs a display. A cold start has a new
+config folder, without the module and search indexes, a warm start has the
+config folder of the last start. The medians of the time until the main loop
+is idle and of every phase are compared with tests/data/startup-benchmark.json,
+a time longer than the baseline divided by UT_BENCHMARK_TOLERANCE (default
+0.25) fails, and so does any more forks or D-Bus calls than the baseline. Run
+it with UT_BENCHMARK_SAVE=1 to save the results of this machine as the
+baseline.
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, 'tests', 'data', 'startup-benchmark.json')
+
+CHILD_SCRIPT = '''
+import sys
+import json
+import resource
+
+from ubuntutweak.modules import ModuleLoader
+
+for feature in ('tweaks', 'admins'):
+    ModuleLoader(feature, use_index=%s)
+
+json.dump({'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+           'modules': len(sys.modules)}, sys.stdout)
+'''
+
+
+def run_child(use_index):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + filter(None, [env.get('PYTHONPATH')]))
+
+    start = time.time()
+    process = subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT % use_index],
+                               cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=open(os.devnull, 'w'))
+    output = process.communicate()[0]
+    seconds = time.time() - start
+
+    if process.returncode != 0:
+        raise Exception('The child failed with %d' % process.returncode)
+
+    result = json.loads(output.splitlines()[-1])
+    result['seconds'] = seconds
+    return result
+
+
+def get_median(results, key):
+    values = sorted(result[key] for result in results)
+    return values[len(values) / 2]
+
+
+def run_profile(config_home):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + filter(None, [env.get('PYTHONPATH')]))
+    env['XDG_CONFIG_HOME'] = config_home
+    # Don't touch the settings of the user
+    env['GSETTINGS_BACKEND'] = 'memory'
+
+    trace_path = os.path.join(config_home, 'trace.json')
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'ubuntu-tweak'),
+                                '--profile-startup', '--profile-output', trace_path],
+                               cwd=ROOT, env=env,
+                               stdout=open(os.devnull, 'w'), stderr=open(os.devnull, 'w'))
+    process.wait()
+
+    if process.returncode != 0 or not os.path.exists(trace_path):
+        raise Exception('The startup failed with %d' % process.returncode)
+
+    trace = json.load(open(trace_path))
+    result = {'seconds': trace['seconds'],
+              'forks': trace['summary']['forks'],
+              'dbus_calls': trace['summary']['dbus_calls'],
+              'gsettings_reads': trace['summary']['gsettings_reads'],
+              'imports': trace['summary']['imports']}
+    for phase in trace['phases']:
+        result['phase %s' % phase['name']] = result.get('phase %s' % phase['name'], 0) + phase['seconds']
+    return result
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    def test_benchmark(self):
+        runs = int(os.environ.get('UT_BENCHMARK_RUNS', 5))
+        # The first run of the index fills it
+        run_child(True)
+
+        report = {}
+        for name, use_index in (('import', False), ('index', True)):
+            results = [run_child(use_index) for i in range(runs)]
+            report[name] = dict((key, get_median(results, key))
+                                for key in ('seconds', 'rss', 'modules'))
+
+        sys.stderr.write('\n%-10s %10s %12s %10s\n' % ('', 'seconds', 'max RSS (KB)', 'modules'))
+        for name in ('import', 'index'):
+            sys.stderr.write('%-10s %10.3f %12d %10d\n' % (name,
+                                                           report[name]['seconds'],
+                                                           report[name]['rss'],
+                                                           report[name]['modules']))
+
+        self.assertTrue(report['index']['modules'] < report['import']['modules'])
+
+
+@unittest.skipUnless(os.environ.get('DISPLAY'), 'The startup needs a display')
+class TestStartupProfile(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def run_starts(self, cold, runs):
+        results = []
+        warm_home = os.path.join(self.root, 'warm')
+
+        for i in range(runs):
+            if cold:
+                config_home = os.path.join(self.root, 'cold%d' % i)
+            else:
+                config_home = warm_home
+            if not os.path.exists(config_home):
+                os.makedirs(config_home)
+            results.append(run_profile(config_home))
+
+        keys = set()
+        for result in results:
+            keys.update(result)
+        # A phase may be missing in some runs
+        return dict((key, get_median([result for result in results if key in result], key))
+                    for key in keys)
+
+    def test_benchmark(self):
+        runs = int(os.environ.get('UT_BENCHMARK_RUNS', 5))
+        # The first warm start fills the indexes
+        run_profile(os.path.join(self.root, 'warm'))
+
+        report = {'cold': self.run_starts(True, runs),
+                  'warm': self.run_starts(False, runs)}
+
+        sys.stderr.write('\n%-40s %10s %10s\n' % ('', 'cold', 'warm'))
+        for key in sorted(report['cold']):
+            sys.stderr.write('%-40s %10.3f %10.3f\n' % (key, report['cold'][key],
+                                                        report['warm'].get(key, 0)))
+
+        if os.environ.get('UT_BENCHMARK_SAVE'):
+            f = open(BASELINE_PATH, 'w')
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.close()
+            return
+
+        if not os.path.exists(BASELINE_PATH):
+            sys.stderr.write('No baseline, run it with UT_BENCHMARK_SAVE=1 to save one\n')
+            return
+
+        baseline = json.load(open(BASELINE_PATH))
+        tolerance = float(os.environ.get('UT_BENCHMARK_TOLERANCE', 0.25))
+        regressions = []
+
+        for start in ('cold', 'warm'):
+            for key, value in sorted(report[start].items()):
+                expected = baseline.get(start, {}).get(key)
+                if expected is None:
+                    continue
+                if key in ('forks', 'dbus_calls'):
+                    if value > expected:
+                        regressions.append('%s %s: %d, the baseline is %d' % (start, key, value, expected))
+                elif key == 'seconds' or key.startswith('phase '):
+                    if value > expected / tolerance:
+                        regressions.append('%s %s: %.3fs, the baseline is %.3fs' % (start, key, value, expected))
+
+        self.assertFalse(regressions, '\n'.join(regressions))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
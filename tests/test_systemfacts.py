@@ -0,0 +1,118 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from ubuntutweak.common.systemfacts import SystemFacts, parse_release_file
+
+STATUS = os.path.join(os.path.dirname(__file__), 'data', 'dpkg-status')
+
+OS_RELEASE = '''NAME="Ubuntu"
+VERSION="12.04.2 LTS, Precise Pangolin"
+ID=ubuntu
+VERSION_ID="12.04"
+VERSION_CODENAME=precise
+'''
+
+LSB_RELEASE = '''DISTRIB_ID=LinuxMint
+DISTRIB_RELEASE=13
+DISTRIB_CODENAME=maya
+DISTRIB_DESCRIPTION="Linux Mint 13 Maya"
+'''
+
+PACKAGE_STANZA = '''Package: ubuntu-tweak
+Status: install ok installed
+Architecture: all
+Version: 0.8.8-1~precise1
+Description: Ubuntu Tweak
+
+'''
+
+
+class TestSystemFacts(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.os_release = self.write_file('os-release', OS_RELEASE)
+        self.lsb_release = os.path.join(self.root, 'lsb-release')
+        self.status = self.write_file('status', PACKAGE_STANZA + open(STATUS).read())
+
+    def write_file(self, name, content):
+        path = os.path.join(self.root, name)
+        f = open(path, 'w')
+        f.write(content)
+        f.close()
+        return path
+
+    def get_facts(self):
+        return SystemFacts(os.path.join(self.root, 'system-facts.cache'),
+                           self.os_release, self.lsb_release, self.status)
+
+    def test_release(self):
+        self.assertEqual(parse_release_file(self.os_release)['VERSION'],
+                         '12.04.2 LTS, Precise Pangolin')
+
+        facts = self.get_facts()
+        self.assertEqual(facts.get_distro(), 'Ubuntu 12.04 precise')
+        self.assertEqual(facts.get_codename(), 'precise')
+
+        # The lsb-release comes first, as lsb_release does
+        self.write_file('lsb-release', LSB_RELEASE)
+        facts = self.get_facts()
+        self.assertEqual(facts.get_distro(), 'LinuxMint 13 maya')
+        self.assertEqual(facts.get_codename(), 'maya')
+
+    def test_package_version(self):
+        facts = self.get_facts()
+        self.assertEqual(facts.get_package_version('ubuntu-tweak'), '0.8.8-1~precise1')
+        self.assertEqual(facts.get_package_version('adduser'), '3.113+nmu3ubuntu3')
+        # It isn't installed, only the config files are left
+        self.assertEqual(facts.get_package_version('gedit-common'), '')
+        self.assertEqual(facts.get_package_version('vim'), '')
+
+        stamp = self.write_file('version', '0.8.8+testing\n')
+        self.assertEqual(facts.get_package_version('ubuntu-tweak', stamp), '0.8.8+testing')
+
+    def test_cache(self):
+        os.utime(self.status, (1000000000, 1000000000))
+        facts = self.get_facts()
+        self.assertEqual(facts.get_package_version('ubuntu-tweak'), '0.8.8-1~precise1')
+        self.assertEqual(facts.get_codename(), 'precise')
+
+        # The facts are written at once
+        self.assertFalse(os.path.exists(facts.cache_path))
+        facts.save()
+
+        # The status isn't read again while its mtime is the same
+        self.write_file('status', PACKAGE_STANZA.replace('0.8.8-1', '0.8.9-1'))
+        os.utime(self.status, (1000000000, 1000000000))
+        self.assertEqual(self.get_facts().get_package_version('ubuntu-tweak'), '0.8.8-1~precise1')
+
+        os.utime(self.status, (1000000010, 1000000010))
+        self.assertEqual(self.get_facts().get_package_version('ubuntu-tweak'), '0.8.9-1~precise1')
+
+    def test_asked_once(self):
+        facts = self.get_facts()
+        self.assertEqual(facts.get_codename(), 'precise')
+
+        # It isn't read again in the same process
+        self.write_file('lsb-release', LSB_RELEASE)
+        self.assertEqual(facts.get_codename(), 'precise')
+        self.assertEqual(self.get_facts().get_codename(), 'maya')
+
+    def test_lazy(self):
+        # Nothing is read when the modules are imported
+        output = subprocess.Popen([sys.executable, '-c',
+                                   'from ubuntutweak import system; '
+                                   'from ubuntutweak.common import consts; '
+                                   'from ubuntutweak.common.systemfacts import system_facts; '
+                                   'print system_facts._facts is None'],
+                                  stdout=subprocess.PIPE).communicate()[0]
+        self.assertEqual('True', output.strip().splitlines()[-1])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -594,7 +594,7 @@ class AppCenter(TweakModule):
             self.appview.update_model(only_installed=only_installed)
 
     def deep_update(self):
-        self.package_worker.update_apt_cache(True)
+        self.package_worker.update_apt_cache()
         self.update_app_data()
 
     def on_apply_button_clicked(self, widget, data=None):
@@ -633,7 +633,7 @@ class AppCenter(TweakModule):
         to_add, to_rm = kwargs['add_and_rm']
         parent = kwargs['parent']
 
-        AptWorker.update_apt_cache(init=True)
+        AptWorker.update_apt_cache()
 
         self.emit('call', 'ubuntutweak.modules.updatemanager', 'update_list', {})
 
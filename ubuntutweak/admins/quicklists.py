@@ -454,7 +454,7 @@ class QuickLists(TweakModule):
     def _do_icon_reorder(self):
         new_order = []
         for row in self.icon_model:
-            if system.CODENAME == 'precise':
+            if system.get_codename() == 'precise':
                 new_order.append(row[self.DESKTOP_FILE])
             else:
                 if not row[self.DESKTOP_FILE].startswith('unity://'):
@@ -120,7 +120,7 @@ class SourceParser(Parser):
                 for id in distros:
                     codename = distro_parser.get_codename(id)
                     if codename in system.UBUNTU_CODENAMES:
-                        if system.CODENAME == codename:
+                        if system.get_codename() == codename:
                             distro_values = codename
                             break
                     else:
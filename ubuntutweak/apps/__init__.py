@@ -2,6 +2,7 @@ import os
 import json
 import random
 import logging
+import threading
 import webbrowser
 
 from gi.repository import GObject, Gtk, WebKit, Soup
@@ -10,11 +11,12 @@ from aptsources.sourceslist import SourcesList
 
 from ubuntutweak import system
 from ubuntutweak import __version__
-from ubuntutweak.common.consts import IS_TESTING, LANG
+from ubuntutweak.common.consts import LANG, is_testing
 from ubuntutweak.common.debug import log_func
 from ubuntutweak.common.consts import CONFIG_ROOT
 from ubuntutweak.gui.gtk import set_busy, unset_busy
 from ubuntutweak.utils.package import AptWorker
+from ubuntutweak.utils.aptcache import cache_manager
 from ubuntutweak.utils.parser import Parser
 from ubuntutweak.utils import ppa
 from ubuntutweak.policykit.dbusproxy import proxy
@@ -152,8 +154,8 @@ class AppsWebView(WebKit.WebView):
     def setup_user_agent(self):
         user_agent = 'Mozilla/5.0 (X11; Linux %(arch)s) Chrome/%(version)s-%(codename)s' % {'arch': os.uname()[-1],
                           'version': __version__,
-                          'codename': system.CODENAME}
-        if IS_TESTING:
+                          'codename': system.get_codename()}
+        if is_testing():
             user_agent = user_agent + '-beta'
         self.get_settings().set_property('user-agent', user_agent)
 
@@ -167,12 +169,40 @@ class AppsWebView(WebKit.WebView):
             if hasattr(self, parameters[0]):
                 getattr(self, parameters[0])(*parameters[1:])
 
+    def query_cache(self, query, callback):
+        '''Call callback(query()) in the main loop. The query may have to open
+        the apt cache, which takes seconds, so it runs in a thread unless the
+        cache is ready'''
+        if cache_manager.is_ready():
+            callback(query())
+            return
+
+        def do_query():
+            try:
+                result = query()
+            except Exception, e:
+                log.error("Query the apt cache failed: %s" % e)
+                return
+
+            def on_result():
+                callback(result)
+                return False
+
+            GObject.idle_add(on_result)
+
+        thread = threading.Thread(target=do_query)
+        thread.daemon = True
+        thread.start()
+
     @log_func(log)
     def initialize_apps(self, apps_json, *args):
-        apps = json.loads(apps_json)
-        for package in apps.keys():
-            apps[package] = proxy.is_package_installed(package)
+        packages = json.loads(apps_json).keys()
 
+        self.query_cache(lambda: dict((package, cache_manager.is_package_installed(package))
+                                      for package in packages),
+                         self.on_apps_queried)
+
+    def on_apps_queried(self, apps):
         self.execute_script('''
                             var apps_dict = %s;
                             Utapp.get("router.appsController").content.forEach(function(app) {
@@ -184,8 +214,19 @@ class AppsWebView(WebKit.WebView):
         if pkgname != self.current_app:
             self.current_app = pkgname
 
-        if proxy.is_package_avaiable(pkgname):
-            if proxy.is_package_installed(pkgname):
+        self.query_cache(lambda: (cache_manager.is_package_available(pkgname),
+                                  cache_manager.is_package_installed(pkgname)),
+                         lambda states: self.on_app_queried(pkgname, *states))
+
+        self.update_sources();
+
+    def on_app_queried(self, pkgname, available, installed):
+        # Another app may be opened while the cache is being opened
+        if pkgname != self.current_app:
+            return
+
+        if available:
+            if installed:
                 self.execute_script('Utapp.get("router.appController").currentApp.set("isInstalled", true);');
                 self.update_action_button(self.UNINSTALL_ACTION)
             else:
@@ -194,8 +235,6 @@ class AppsWebView(WebKit.WebView):
         else:
             self.update_action_button(self.NOT_AVAILABLE_ACTION)
 
-        self.update_sources();
-
     @log_func(log)
     def do_source_operation(self, enable_str, source_json, *args):
         enable = int(enable_str)
@@ -307,7 +346,7 @@ class AppsWebView(WebKit.WebView):
                         source.set('distro_value', distro_value);
                     }
                 });
-                ''' % (system.CODENAME, list(system.UBUNTU_CODENAMES)));
+                ''' % (system.get_codename(), list(system.UBUNTU_CODENAMES)));
 
         enabled_list = []
 
@@ -331,15 +370,19 @@ class AppsWebView(WebKit.WebView):
 
     @log_func(log)
     def on_update_work_finished(self, transaction, status, kwargs):
-        parent = kwargs['parent']
-        proxy.update_apt_cache(True)
-        if proxy.is_package_upgradable(self.current_app) or \
-           (not proxy.is_package_installed(self.current_app) and \
-            proxy.is_package_avaiable(self.current_app)):
+        pkgname = self.current_app
+
+        self.query_cache(lambda: cache_manager.is_package_upgradable(pkgname) or \
+                                 (not cache_manager.is_package_installed(pkgname) and \
+                                  cache_manager.is_package_available(pkgname)),
+                         lambda need_install: self.on_update_queried(kwargs['parent'], pkgname, need_install))
+
+    def on_update_queried(self, parent, pkgname, need_install):
+        if need_install:
             worker = AptWorker(self.get_toplevel(),
                                finish_handler=self.on_package_work_finished,
                                data={'parent': self})
-            worker.install_packages([self.current_app])
+            worker.install_packages([pkgname])
         else:
             unset_busy(parent)
             self.reset_install_button()
@@ -347,7 +390,6 @@ class AppsWebView(WebKit.WebView):
     @log_func(log)
     def on_package_work_finished(self, transaction, status, kwargs):
         parent = kwargs['parent']
-        proxy.update_apt_cache(True)
         unset_busy(parent)
         self.reset_install_button()
 
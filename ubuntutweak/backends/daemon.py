@@ -11,16 +11,17 @@ import sys
 reload(sys)
 sys.setdefaultencoding('utf8')
 import os
+import re
 import glob
+import errno
 import fcntl
 import shutil
 import logging
 import tempfile
 import subprocess
 
-from subprocess import PIPE
+from subprocess import PIPE, STDOUT
 
-import apt
 import apt_pkg
 import dbus
 import dbus.service
@@ -31,6 +32,7 @@ from aptsources.sourceslist import SourcesList
 
 from ubuntutweak import system
 from ubuntutweak.utils import ppa
+from ubuntutweak.utils.aptcache import cache_manager
 from ubuntutweak.backends import PolicyKitService
 from ubuntutweak.policykit import PK_ACTION_TWEAK, PK_ACTION_CLEAN, PK_ACTION_SOURCE
 from ubuntutweak.settings.configsettings import ConfigSetting
@@ -105,11 +107,13 @@ class Daemon(PolicyKitService):
     #TODO use signal
     liststate = None
     list = SourcesList()
-    cache = None
     stable_url = 'http://ppa.launchpad.net/tualatrix/ppa/ubuntu'
     ppa_list = []
     p = None
+    purge_process = None
+    PURGED_PATTERN = re.compile('^Purging configuration files for (\S+) ')
     SOURCES_LIST = '/etc/apt/sources.list'
+    APT_ARCHIVES = '/var/cache/apt/archives/'
 
     def __init__ (self, bus, mainloop):
         bus_name = dbus.service.BusName(INTERFACE, bus=bus)
@@ -118,19 +122,15 @@ class Daemon(PolicyKitService):
 
     def get_cache(self):
         try:
-            self.update_apt_cache()
+            return cache_manager.get_cache()
         except Exception, e:
             log.error("Error happened when get_cache(): %s" % str(e))
-        finally:
-            return self.cache
 
     @dbus.service.method(INTERFACE,
-                         in_signature='b', out_signature='b')
-    def update_apt_cache(self, init=False):
-        '''if init is true, force to update, or it will update only once'''
-        if init or not getattr(self, 'cache'):
-            apt_pkg.init()
-            self.cache = apt.Cache()
+                         in_signature='', out_signature='b')
+    def update_apt_cache(self):
+        '''The cache is only reopened if the package states changed'''
+        return self.get_cache() is not None
 
     @dbus.service.method(INTERFACE,
                          in_signature='b', out_signature='bv')
@@ -359,7 +359,7 @@ class Daemon(PolicyKitService):
             if self.stable_url in source.str() and source.type == 'deb' and not source.disabled:
                 return
 
-        distro = system.CODENAME
+        distro = system.get_codename()
 
         if distro:
             self.set_separated_entry(self.stable_url, distro, 'main',
@@ -399,8 +399,7 @@ class Daemon(PolicyKitService):
                          in_signature='s', out_signature='b')
     def is_package_installed(self, package):
         try:
-            pkg = self.get_cache()[package]
-            return pkg.isInstalled
+            return cache_manager.is_package_installed(package)
         except Exception, e:
             log.error(e)
         else:
@@ -410,8 +409,7 @@ class Daemon(PolicyKitService):
                          in_signature='s', out_signature='b')
     def is_package_upgradable(self, package):
         try:
-            pkg = self.get_cache()[package]
-            return pkg.isUpgradable
+            return cache_manager.is_package_upgradable(package)
         except Exception, e:
             log.error(e)
         else:
@@ -421,7 +419,7 @@ class Daemon(PolicyKitService):
                          in_signature='s', out_signature='b')
     def is_package_avaiable(self, package):
         try:
-            return self.get_cache().has_key(package)
+            return cache_manager.is_package_available(package)
         except Exception, e:
             log.error(e)
             return False
@@ -529,6 +527,88 @@ class Daemon(PolicyKitService):
         self.p = subprocess.Popen(cmd, stdout=PIPE)
         self._setup_non_block_io(self.p.stdout)
 
+    @dbus.service.method(INTERFACE,
+                         in_signature='sas', out_signature='b',
+                         sender_keyword='sender')
+    def purge_config_packages(self, purge_id, pkgs, sender=None):
+        '''Purge the packages in one dpkg run. The output is sent by the
+        purge_output signal line by line, every purged package by
+        package_purged and the return code by purge_finished. The signals
+        carry the purge_id given by the caller, so it can tell its purge from
+        the others. Return False if a purge is already running'''
+        self._check_permission(sender, PK_ACTION_CLEAN)
+
+        if self.purge_process or not pkgs:
+            return False
+
+        for pkg in pkgs:
+            if pkg.startswith('-'):
+                log.error("Refuse to purge the invalid package: %s" % pkg)
+                return False
+
+        cmd = ['sudo', 'dpkg', '--purge']
+        cmd.extend(pkgs)
+        log.debug("The purge command is %s" % ' '.join(cmd))
+
+        # The output is parsed, so it can't be translated
+        env = os.environ.copy()
+        env['LC_ALL'] = 'C'
+
+        self.purge_process = subprocess.Popen(cmd, stdout=PIPE, stderr=STDOUT, env=env)
+        self._purge_id = purge_id
+        self._purge_buffer = ''
+        self._setup_non_block_io(self.purge_process.stdout)
+        GObject.io_add_watch(self.purge_process.stdout.fileno(),
+                             GObject.IO_IN | GObject.IO_HUP,
+                             self._on_purge_output)
+
+        return True
+
+    @dbus.service.signal(INTERFACE, signature='ss')
+    def purge_output(self, purge_id, line):
+        pass
+
+    @dbus.service.signal(INTERFACE, signature='ss')
+    def package_purged(self, purge_id, pkg):
+        pass
+
+    @dbus.service.signal(INTERFACE, signature='si')
+    def purge_finished(self, purge_id, returncode):
+        pass
+
+    def _on_purge_output(self, fd, condition):
+        try:
+            data = os.read(fd, 4096)
+        except OSError, e:
+            if e.errno == errno.EAGAIN:
+                return True
+            log.error(e)
+            data = ''
+
+        if data:
+            lines = (self._purge_buffer + data).split('\n')
+            self._purge_buffer = lines.pop()
+            for line in lines:
+                self._emit_purge_line(line)
+            return True
+
+        if self._purge_buffer:
+            self._emit_purge_line(self._purge_buffer)
+            self._purge_buffer = ''
+
+        returncode = self.purge_process.wait()
+        self.purge_process = None
+        self.purge_finished(self._purge_id, returncode)
+
+        return False
+
+    def _emit_purge_line(self, line):
+        self.purge_output(self._purge_id, line)
+
+        match = self.PURGED_PATTERN.match(line)
+        if match:
+            self.package_purged(self._purge_id, match.group(1))
+
     @dbus.service.method(INTERFACE,
                          in_signature='as', out_signature='',
                          sender_keyword='sender')
@@ -587,11 +667,45 @@ class Daemon(PolicyKitService):
     def delete_apt_cache_file(self, file_name, sender=None):
         self._check_permission(sender, PK_ACTION_CLEAN)
 
-        full_path = os.path.join('/var/cache/apt/archives/', file_name)
-        if os.path.exists(full_path):
+        return self._delete_apt_cache_file(file_name)
+
+    @dbus.service.method(INTERFACE,
+                         in_signature='as', out_signature='i',
+                         sender_keyword='sender')
+    def delete_apt_cache_files(self, file_names, sender=None):
+        '''Delete a batch of files in the apt archives with only one
+        authorization, the result of every file is sent by the
+        apt_cache_file_deleted signal. Return the number of failed files'''
+        self._check_permission(sender, PK_ACTION_CLEAN)
+
+        failed = 0
+        for file_name in file_names:
+            result = self._delete_apt_cache_file(file_name)
+            if not result:
+                failed += 1
+            self.apt_cache_file_deleted(file_name, result)
+
+        return failed
+
+    @dbus.service.signal(INTERFACE, signature='sb')
+    def apt_cache_file_deleted(self, file_name, result):
+        pass
+
+    def _delete_apt_cache_file(self, file_name):
+        if os.path.basename(file_name) != file_name or \
+                not file_name.endswith('.deb') or file_name.startswith('.'):
+            log.error("Refuse to delete %s, it isn't a package in the apt archives" % file_name)
+            return False
+
+        full_path = os.path.join(self.APT_ARCHIVES, file_name)
+        try:
             os.remove(full_path)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                log.error(e)
+                return False
 
-        return not os.path.exists(full_path)
+        return True
 
     @dbus.service.method(INTERFACE,
                          in_signature='s', out_signature='b')
@@ -1,10 +1,8 @@
-import os
 import glob
 from gi.repository import Gtk, GLib
 
-from ubuntutweak import system
 from ubuntutweak.clips import Clip
-from ubuntutweak.utils import icon
+from ubuntutweak.utils.janitorhistory import janitor_history
 
 class CleanerInfo(Clip):
     __icon__  = 'computerjanitor'
@@ -23,19 +21,22 @@ class CleanerInfo(Clip):
 
         self.add_content(label)
 
-        try:
-            if system.CODENAME in ['precise']:
-                root_path = '~/.thumbnails'
-            else:
-                root_path = '~/.cache/thumbnails'
+        # The sizes of the last janitor scans, the disk isn't walked here
+        snapshot = janitor_history.get_snapshot()
+        thumbnails = snapshot.get('ThumbnailCachePlugin')
 
-            size = int(os.popen('du -bs %s' % root_path).read().split()[0])
-        except:
-            size = 0
+        if thumbnails and thumbnails.size:
+            label = Gtk.Label(label=_('%s thumbnails cache can be cleaned.') % \
+                    GLib.format_size_for_display(thumbnails.size))
+            label.set_alignment(0, 0.5)
+
+            self.add_content(label)
 
+        size = sum(record.size for record in snapshot.values())
         if size:
+            self.set_title(_('Some cache can be cleaned to free your disk space'))
 
-            label = Gtk.Label(label=_('%s thumbnails cache can be cleaned.') % \
+            label = Gtk.Label(label=_('%s cruft was found by the last scan.') % \
                     GLib.format_size_for_display(size))
             label.set_alignment(0, 0.5)
 
@@ -19,7 +19,7 @@ class SystemInfo(Clip):
                         (Gtk.Label(label=_('Platform:')),
                          Gtk.Label(label=os.uname()[-1])),
                         (Gtk.Label(label=_('Distribution:')),
-                         Gtk.Label(label=system.DISTRO)),
+                         Gtk.Label(label=system.get_distro())),
                         (Gtk.Label(label=_('Desktop Environment:')),
                          Gtk.Label(label=system.DESKTOP_FULLNAME))),
                         xpadding=12, ypadding=2)
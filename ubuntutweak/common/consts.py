@@ -13,14 +13,13 @@ import gettext
 from gi.repository import GLib, Notify
 
 from ubuntutweak import __version__
+from ubuntutweak.common.systemfacts import system_facts
 
 def applize(package):
     return ' '.join([a.capitalize() for a in package.split('-')])
 
 PACKAGE = 'ubuntu-tweak'
 VERSION = __version__
-PKG_VERSION = VERSION
-IS_TESTING = False
 DATA_DIR = '/usr/share/ubuntu-tweak/'
 APP = applize(PACKAGE)
 CONFIG_ROOT = os.path.join(GLib.get_user_config_dir(), 'ubuntu-tweak')
@@ -40,13 +39,19 @@ if not __file__.startswith('/usr'):
     DATA_DIR = os.path.join(datadir, 'data')
     IS_INSTALLED = False
 
-try:
-    PKG_VERSION = os.popen("dpkg-query -f '${Version}' -W %s" % PACKAGE).read()
-    IS_TESTING = '+' in PKG_VERSION
-    if IS_TESTING:
-        VERSION = PKG_VERSION
-except Exception, e:
-    print(e)
+def get_pkg_version():
+    '''The version of the installed package, it is read when it is asked for
+    the first time'''
+    return system_facts.get_package_version(PACKAGE, os.path.join(DATA_DIR, 'version'))
+
+def is_testing():
+    return '+' in get_pkg_version()
+
+def get_version():
+    '''The version of the package if it is a testing one, or VERSION'''
+    if is_testing():
+        return get_pkg_version()
+    return VERSION
 
 def init_locale():
     global INIT
@@ -26,8 +26,6 @@ import StringIO
 import traceback
 import webbrowser
 
-from gi.repository import Gtk, Gdk, Notify
-
 from ubuntutweak import system
 from ubuntutweak.common.consts import CONFIG_ROOT
 
@@ -51,6 +49,8 @@ COLORS = {
 
 
 def on_copy_button_clicked(widget, text):
+    from gi.repository import Gtk, Gdk, Notify
+
     atom = Gdk.atom_intern('CLIPBOARD', True)
     clipboard = Gtk.Clipboard.get_for_display(Gdk.Display.get_default(), atom)
     clipboard.set_text(text, -1)
@@ -66,6 +66,8 @@ def on_copy_button_clicked(widget, text):
 
 def run_traceback(level, textview_only=False, text_only=False):
     '''Two level: fatal and error'''
+    # Gtk is imported here, so the tools without the UI can log with it
+    from gi.repository import Gtk
     from ubuntutweak.gui import GuiBuilder
 
     output = StringIO.StringIO()
@@ -83,8 +85,8 @@ def run_traceback(level, textview_only=False, text_only=False):
 
     textview.add_child_at_anchor(button, anchor)
 
-    error_text = "\nDistribution: %s\nApplication: %s\nDesktop:%s\n\n%s" % (system.DISTRO,
-                                       system.APP,
+    error_text = "\nDistribution: %s\nApplication: %s\nDesktop:%s\n\n%s" % (system.get_distro(),
+                                       system.get_app(),
                                        system.DESKTOP,
                                        output.getvalue())
 
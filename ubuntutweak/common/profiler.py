@@ -0,0 +1,244 @@
+'''The startup profiler of "ubuntu-tweak --profile-startup".
+
+It must be started before the other modules of Ubuntu Tweak are imported, so
+it doesn't import any of them. While it is enabled it records:
+
+    - the phases of the startup and the marks between them
+    - every module import, with its total and self wall time
+    - the forks by os.popen, os.system and subprocess
+    - the D-Bus method calls
+    - the GSettings creations and reads
+
+and the trace is dumped as JSON.
+'''
+
+import os
+import sys
+import time
+import thread
+import __builtin__
+
+from contextlib import contextmanager
+
+_MISSING = object()
+
+# The GSettings methods which read a key
+GSETTINGS_READS = ('__getitem__', 'get_value', 'get_boolean', 'get_int',
+                   'get_uint', 'get_double', 'get_string', 'get_strv',
+                   'get_enum', 'get_flags')
+
+
+def get_caller():
+    '''Return "file:line" of the code of Ubuntu Tweak which made the call'''
+    this_file = os.path.splitext(__file__)[0]
+    frame = sys._getframe(1)
+
+    while frame:
+        filename = frame.f_code.co_filename
+        if os.path.splitext(filename)[0] != this_file and \
+                ('ubuntutweak' in filename or 'ubuntu-tweak' in filename):
+            return '%s:%d' % (filename, frame.f_lineno)
+        frame = frame.f_back
+
+    return ''
+
+
+class StartupProfiler(object):
+    '''Use the "profiler" of this module, all the methods do nothing unless
+    it is started'''
+
+    def __init__(self):
+        self.enabled = False
+        self._start_time = 0
+        self._stop_time = 0
+        self._main_thread = None
+        self._patches = []
+        self._original_import = None
+        # The self time of the imports in progress, the innermost last
+        self._import_stack = []
+        self._phase_depth = 0
+
+        self.phases = []
+        self.marks = []
+        self.imports = []
+        self.forks = []
+        self.dbus_calls = []
+        self.gsettings_reads = []
+
+    def _get_time(self, timestamp=None):
+        return round((timestamp or time.time()) - self._start_time, 6)
+
+    def start(self):
+        if self.enabled:
+            return
+
+        self._start_time = time.time()
+        self._main_thread = thread.get_ident()
+        self.enabled = True
+
+        self._original_import = __builtin__.__import__
+        __builtin__.__import__ = self._import
+
+        import subprocess
+
+        self._patch(os, 'popen', self.forks, lambda command, *args: {'kind': 'popen',
+                                                                     'command': command})
+        self._patch(os, 'system', self.forks, lambda command: {'kind': 'system',
+                                                               'command': command})
+        self._patch(subprocess.Popen, '_execute_child', self.forks,
+                    lambda popen, args, *rest: {'kind': 'subprocess',
+                                                'command': isinstance(args, basestring) and \
+                                                           args or ' '.join(args)})
+
+        try:
+            import dbus.connection
+            self._patch(dbus.connection.Connection, 'call_blocking', self.dbus_calls,
+                        self._describe_dbus_call)
+            self._patch(dbus.connection.Connection, 'call_async', self.dbus_calls,
+                        self._describe_dbus_call)
+        except ImportError:
+            pass
+
+        try:
+            from gi.repository import Gio
+            self._patch(Gio.Settings, '__init__', self.gsettings_reads,
+                        lambda settings, schema=None, *args, **kwargs: {'kind': 'new',
+                                                                        'schema': schema or kwargs.get('schema')})
+            for name in GSETTINGS_READS:
+                self._patch(Gio.Settings, name, self.gsettings_reads,
+                            lambda settings, key, *args, **kwargs: {'kind': 'read',
+                                                                    'key': key})
+        except ImportError:
+            pass
+
+    def stop(self):
+        if not self.enabled:
+            return
+
+        self._stop_time = time.time()
+        self.enabled = False
+
+        __builtin__.__import__ = self._original_import
+        for owner, name, original in reversed(self._patches):
+            if original is _MISSING:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patches = []
+
+    def _describe_dbus_call(self, connection, bus_name, object_path, interface, method, *args, **kwargs):
+        return {'bus_name': bus_name, 'path': object_path,
+                'interface': interface, 'method': method}
+
+    def _patch(self, owner, name, events, describe):
+        '''Replace the function, the calls of it are recorded to events with
+        the dict returned by describe(*args)'''
+        function = getattr(owner, name, None)
+        if function is None:
+            return
+
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+
+            start = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                try:
+                    event = describe(*args, **kwargs)
+                except Exception:
+                    event = {}
+                event = dict((key, str(value)) for key, value in event.items())
+                event['start'] = self._get_time(start)
+                event['seconds'] = round(time.time() - start, 6)
+                event['caller'] = get_caller()
+                events.append(event)
+
+        self._patches.append((owner, name, vars(owner).get(name, _MISSING)))
+        setattr(owner, name, wrapper)
+
+    def _import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        if not self.enabled or thread.get_ident() != self._main_thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        count = len(sys.modules)
+        self._import_stack.append(0)
+        start = time.time()
+        try:
+            module = self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            seconds = time.time() - start
+            children = self._import_stack.pop()
+            if self._import_stack:
+                self._import_stack[-1] += seconds
+
+        # Only the imports which load new modules are recorded
+        if len(sys.modules) > count:
+            # "import a.b" returns a, the relative import returns the module
+            if fromlist or '.' not in name:
+                name = getattr(module, '__name__', name)
+            self.imports.append({'name': name,
+                                 'start': self._get_time(start),
+                                 'seconds': round(seconds, 6),
+                                 'self_seconds': round(seconds - children, 6),
+                                 'modules': len(sys.modules) - count})
+
+        return module
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.time()
+        self._phase_depth += 1
+        try:
+            yield
+        finally:
+            self._phase_depth -= 1
+            self.phases.append({'name': name,
+                                'start': self._get_time(start),
+                                'seconds': round(time.time() - start, 6),
+                                'depth': self._phase_depth})
+
+    def mark(self, name):
+        if self.enabled:
+            self.marks.append({'name': name, 'time': self._get_time()})
+
+    def get_trace(self):
+        seconds = (self._stop_time or time.time()) - self._start_time
+
+        return {'argv': sys.argv,
+                'pid': os.getpid(),
+                'seconds': round(seconds, 6),
+                'summary': {'imports': len(self.imports),
+                            'import_seconds': round(sum(item['self_seconds'] for item in self.imports), 6),
+                            'modules': len(sys.modules),
+                            'forks': len(self.forks),
+                            'dbus_calls': len(self.dbus_calls),
+                            'gsettings_reads': len([item for item in self.gsettings_reads
+                                                    if item.get('kind') == 'read'])},
+                'phases': sorted(self.phases, key=lambda item: item['start']),
+                'marks': self.marks,
+                'imports': self.imports,
+                'forks': self.forks,
+                'dbus_calls': self.dbus_calls,
+                'gsettings': self.gsettings_reads}
+
+    def dump(self, path=''):
+        '''Write the trace to the path, or to stdout if it is empty'''
+        import json
+
+        if path:
+            f = open(path, 'w')
+            json.dump(self.get_trace(), f, indent=2)
+            f.close()
+        else:
+            json.dump(self.get_trace(), sys.stdout, indent=2)
+            sys.stdout.write('\n')
+            sys.stdout.flush()
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,166 @@
+import os
+import atexit
+import marshal
+import logging
+
+from gi.repository import GLib
+
+from ubuntutweak.utils import dpkg
+
+log = logging.getLogger('systemfacts')
+
+CACHE_VERSION = 1
+
+OS_RELEASE = '/etc/os-release'
+LSB_RELEASE = '/etc/lsb-release'
+
+
+def parse_release_file(path):
+    '''Return the KEY=value of /etc/os-release or /etc/lsb-release as dict'''
+    values = {}
+
+    try:
+        f = open(path)
+    except IOError:
+        return values
+
+    try:
+        for line in f:
+            key, sep, value = line.strip().partition('=')
+            if not sep or key.startswith('#'):
+                continue
+
+            value = value.strip()
+            if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'':
+                value = value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+            values[key.strip()] = value
+    finally:
+        f.close()
+
+    return values
+
+
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class SystemFacts(object):
+    '''The facts of the system which used to be got by running lsb_release
+    and dpkg-query at every start.
+
+    A fact is computed when it is asked for the first time, and cached in
+    the small file with the mtimes of the files it is computed from. While
+    none of them is changed, the cached value is used. Once it is asked for,
+    it is kept for the life of the process. The new facts are written at
+    once by save(), it is called at exit for system_facts.
+    '''
+
+    def __init__(self, cache_path, os_release=OS_RELEASE,
+                 lsb_release=LSB_RELEASE, dpkg_status=dpkg.DPKG_STATUS):
+        self.cache_path = cache_path
+        self.os_release = os_release
+        self.lsb_release = lsb_release
+        self.dpkg_status = dpkg_status
+        # name: (value, [(path, mtime)])
+        self._facts = None
+        # (name, paths): value of the facts which have been asked for
+        self._values = {}
+        self._dirty = False
+
+    def _get_facts(self):
+        if self._facts is None:
+            self._facts = {}
+
+            if os.path.exists(self.cache_path):
+                try:
+                    version, facts = marshal.load(open(self.cache_path, 'rb'))
+                    if version == CACHE_VERSION:
+                        self._facts = facts
+                except Exception, e:
+                    log.warning("Load system facts failed: %s" % e)
+
+        return self._facts
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        try:
+            temp_path = self.cache_path + '.tmp'
+            f = open(temp_path, 'wb')
+            marshal.dump((CACHE_VERSION, self._facts), f)
+            f.close()
+            os.rename(temp_path, self.cache_path)
+            self._dirty = False
+        except Exception, e:
+            log.error("Save system facts failed: %s" % e)
+
+    def get(self, name, paths, compute):
+        '''Return the fact, compute() is only called if it isn't cached or
+        any of the paths is changed since it was cached'''
+        key = (name, tuple(paths))
+        if key in self._values:
+            return self._values[key]
+
+        facts = self._get_facts()
+        mtimes = [(path, get_mtime(path)) for path in paths]
+
+        if name in facts and facts[name][1] == mtimes:
+            value = facts[name][0]
+        else:
+            value = compute()
+            facts[name] = (value, mtimes)
+            self._dirty = True
+
+        self._values[key] = value
+        return value
+
+    def _get_release(self):
+        '''Return (id, release, codename) like platform.dist() on Ubuntu'''
+        lsb = parse_release_file(self.lsb_release)
+        if lsb.get('DISTRIB_ID'):
+            return (lsb['DISTRIB_ID'], lsb.get('DISTRIB_RELEASE', ''),
+                    lsb.get('DISTRIB_CODENAME', ''))
+
+        release = parse_release_file(self.os_release)
+        return (release.get('NAME', ''), release.get('VERSION_ID', ''),
+                release.get('VERSION_CODENAME', ''))
+
+    def get_distro(self):
+        '''It should be "Ubuntu 10.10 maverick"'''
+        return self.get('distro', (self.lsb_release, self.os_release),
+                        lambda: ' '.join(self._get_release()))
+
+    def get_codename(self):
+        '''The codename as "lsb_release -cs" shows'''
+        return self.get('codename', (self.lsb_release, self.os_release),
+                        lambda: self._get_release()[2])
+
+    def get_package_version(self, package, stamp_path=None):
+        '''Return the version of the installed package, or "" if it isn't
+        installed. The version in the stamp file is used if it exists, it
+        is written by the packaging'''
+        def compute():
+            if stamp_path and os.path.exists(stamp_path):
+                return open(stamp_path).read().strip()
+
+            try:
+                stanza = dpkg.get_package_stanza(package, self.dpkg_status)
+            except IOError, e:
+                log.warning("Read the dpkg status failed: %s" % e)
+                return ''
+
+            return stanza and stanza.get('Version', '') or ''
+
+        paths = [self.dpkg_status]
+        if stamp_path:
+            paths.append(stamp_path)
+
+        return self.get('package-version:%s' % package, paths, compute)
+
+
+system_facts = SystemFacts(os.path.join(GLib.get_user_config_dir(), 'ubuntu-tweak', 'system-facts.cache'))
+atexit.register(system_facts.save)
@@ -1,6 +1,6 @@
 import os
-import glob
-import shutil
+import time
+import Queue
 import logging
 import threading
 import traceback
@@ -8,11 +8,15 @@ import traceback
 from defer import inline_callbacks
 from collections import OrderedDict
 
-from gi.repository import GObject, Gtk, Gdk, Pango
+from gi.repository import GObject, Gio, Gtk, Gdk, Pango
 
 from ubuntutweak.gui import GuiBuilder
-from ubuntutweak.gui.gtk import post_ui
 from ubuntutweak.utils import icon, filesizeformat
+from ubuntutweak.utils.janitorplugin import CruftObject, PackageObject, CacheObject, \
+        JanitorPlugin, JanitorCachePlugin
+from ubuntutweak.utils.scansession import ScanSession, filter_nested_paths
+from ubuntutweak.utils.background import Background
+from ubuntutweak.utils.janitorhistory import janitor_history, SCAN, CLEAN
 from ubuntutweak.modules import ModuleLoader
 from ubuntutweak.settings import GSetting
 from ubuntutweak.common.debug import run_traceback, log_func
@@ -23,261 +27,6 @@ from ubuntutweak.policykit.widgets import PolkitAction
 
 log = logging.getLogger('Janitor')
 
-class CruftObject(object):
-    def __init__(self, name, path=None, size=0):
-        self.name = name
-        self.path = path
-        self.size = size
-
-    def __str__(self):
-        return self.get_name()
-
-    def get_name(self):
-        return self.name
-
-    def get_size(self):
-        return int(self.size)
-
-    def get_size_display(self):
-        return ''
-
-    def get_icon(self):
-        return None
-
-
-class PackageObject(CruftObject):
-    def __init__(self, name, package_name, size):
-        self.name = name
-        self.package_name = package_name
-        self.size = size
-
-    def get_size_display(self):
-        return filesizeformat(self.size)
-
-    def get_icon(self):
-        return icon.get_from_name('deb')
-
-    def get_package_name(self):
-        return self.package_name
-
-
-class CacheObject(CruftObject):
-    def __init__(self, name, path, size):
-        self.name = name
-        self.path = path
-        self.size = size
-
-    def get_path(self):
-        return self.path
-
-    def get_size_display(self):
-        return filesizeformat(self.size)
-
-    def get_icon(self):
-        return icon.guess_from_path(self.get_path())
-
-    def is_dir(self):
-        return os.path.isdir(self.path)
-
-
-class JanitorPlugin(GObject.GObject):
-    __title__ = ''
-    __category__ = ''
-    __utmodule__ = ''
-    __desktop__ = ''
-    __distro__ = ''
-    __utactive__ = True
-    __user_extension__ = False
-
-    scan_finished = GObject.property(type=bool, default=False)
-    clean_finished = GObject.property(type=bool, default=False)
-    error = GObject.property(type=str, default='')
-
-    __gsignals__ = {
-        'find_object': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_PYOBJECT, GObject.TYPE_INT)),
-        'scan_finished': (GObject.SignalFlags.RUN_FIRST, None,
-                          (GObject.TYPE_BOOLEAN,
-                           GObject.TYPE_INT,
-                           GObject.TYPE_LONG)),
-        'object_cleaned': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_PYOBJECT, GObject.TYPE_INT)),
-        'all_cleaned': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_BOOLEAN,)),
-        'scan_error': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_STRING,)),
-        'clean_error': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_STRING,)),
-    }
-
-    @classmethod
-    def is_active(cls):
-        return cls.__utactive__
-
-    @classmethod
-    def get_name(cls):
-        return cls.__name__
-
-    @classmethod
-    def get_title(cls):
-        return cls.__title__
-
-    @classmethod
-    def get_category(cls):
-        return cls.__category__
-
-    @classmethod
-    def is_user_extension(cls):
-        return cls.__user_extension__
-
-    @classmethod
-    def get_pixbuf(cls):
-        #TODO
-        return None
-
-    def get_cruft(self):
-        return ()
-
-    def get_summary(self, count, size):
-        return self.get_title()
-
-    def clean_cruft(self, parent=None, cruft_list=[]):
-        '''Clean all the cruft, you must emit the "cleaned" signal to tell the
-        main thread your task is finished
-
-        :param parent: the toplevel window, use for transient
-        :param cruft_list: a list contains all the cruft objects to be clean
-        :param rescan_handler: the handler to rescan the result, must be called
-            after the clean task is done
-        '''
-        pass
-
-class JanitorCachePlugin(JanitorPlugin):
-    root_path = ''
-    pattern = '*'
-    targets = []
-
-    def __str__(self):
-        try:
-            return self.__module__.split('.')[-1]
-        except Exception, e:
-            return "%s Plugin" % self.__title__
-
-    @classmethod
-    def is_active(cls):
-        return cls.__utactive__ and os.path.exists(cls.get_path())
-
-    def get_cruft(self):
-        if self.pattern == '*':
-            if self.targets:
-                total_size = 0
-                count = 0
-
-                for target in self.targets:
-                    new_root_path = os.path.join(self.get_path(), target)
-
-                    if os.path.exists(new_root_path):
-                        if os.path.isdir(new_root_path):
-                            try:
-                                size = os.popen('du -bs "%s"' % new_root_path).read().split()[0]
-                            except:
-                                size = 0
-                        else:
-                            size = os.path.getsize(new_root_path)
-
-                        total_size += int(size)
-                        count += 1
-
-                        self.emit('find_object',
-                                  CacheObject(os.path.basename(new_root_path), new_root_path, size),
-                                  count)
-
-                self.emit('scan_finished', True, count, total_size)
-            else:
-                self.get_cruft_by_path()
-        else:
-            self.get_cruft_by_glob()
-
-    def clean_cruft(self, cruft_list=[], parent=None):
-        for index, cruft in enumerate(cruft_list):
-            try:
-                log.debug('Cleaning...%s' % cruft.get_name())
-                if cruft.is_dir():
-                    shutil.rmtree(cruft.get_path())
-                else:
-                    os.remove(cruft.get_path())
-                self.emit('object_cleaned', cruft, index + 1)
-            except Exception, e:
-                log.error(run_traceback(e))
-                self.emit('clean_error', cruft.get_name())
-                break
-
-        self.emit('all_cleaned', True)
-
-    def on_done(self, widget):
-        widget.destroy()
-
-    def get_cruft_by_glob(self):
-        cruft_list = glob.glob('%s/%s' % (self.get_path(), self.pattern))
-        cruft_list.sort()
-        size = 0
-        count = 0
-
-        for full_path in cruft_list:
-            current_size = os.path.getsize(full_path)
-            size += current_size
-            count += 1
-
-            self.emit('find_object',
-                      CacheObject(os.path.basename(full_path), full_path, current_size),
-                      count)
-
-        self.emit('scan_finished', True, len(cruft_list), size)
-
-    @classmethod
-    def get_path(cls):
-        if cls.root_path.startswith('~'):
-            return os.path.expanduser(cls.root_path)
-        else:
-            return cls.root_path
-
-    def get_cruft_by_path(self, root_path=None):
-        if root_path is None:
-            root_path = self.get_path()
-
-        try:
-            count = 0
-            total_size = 0
-            for root, dirs, files in os.walk(root_path):
-                if root == root_path and dirs:
-                    dirs.sort()
-                    files.sort()
-
-                    to_deleted = dirs + files
-
-                    for path in to_deleted:
-                        full_path = os.path.join(root_path, path)
-
-                        try:
-                            size = os.popen('du -bs "%s"' % full_path).read().split()[0]
-                        except:
-                            size = 0
-                        count += 1
-                        total_size += int(size)
-
-                        self.emit('find_object',
-                                  CacheObject(path, full_path, size),
-                                  count)
-                else:
-                    continue
-
-            self.emit('scan_finished', True, count, total_size)
-        except Exception, e:
-            log.error(e)
-            self.emit('scan_error', e)
-
-    def get_summary(self, count):
-        if count:
-            return '[%d] %s' % (count, self.__title__)
-        else:
-            return '%s (%s)' % (self.__title__, _('No cache to be cleaned'))
-
-
 class JanitorPage(Gtk.VBox, GuiBuilder):
     (JANITOR_CHECK,
      JANITOR_ICON,
@@ -296,6 +45,8 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
      RESULT_CRUFT) = range(7)
 
     max_janitor_view_width = 0
+    # How long (in seconds) the queued plugin events can block the UI once
+    event_time_slice = 0.02
 
     def __init__(self):
         GObject.GObject.__init__(self)
@@ -303,6 +54,21 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         self.scan_tasks = []
         self.clean_tasks = []
         self._total_count = 0
+        # {plugin: (find_handler, scan_handler, cancel_handler, error_handler)}
+        self._scan_handlers = {}
+        # The signals from the plugin threads, they are handled by the UI
+        # in the idle time
+        self._event_queue = Queue.Queue()
+        self._event_lock = threading.Lock()
+        self._event_source = None
+        # Cancelled when the page is destroyed, no more task will be started
+        self.cancellable = Gio.Cancellable()
+        self.scan_session = ScanSession()
+        # The Background of the running tasks, None if it isn't enabled
+        self.background = None
+        # What the running clean task has removed, for the history
+        self._cleaned_count = 0
+        self._cleaned_size = 0
 
         self.set_border_width(6)
         GuiBuilder.__init__(self, 'janitorpage.ui')
@@ -310,11 +76,15 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         self.autoscan_setting = GSetting('com.ubuntu-tweak.janitor.auto-scan')
         self.autoscan_setting.connect_notify(self.on_autoscan_button_toggled)
         self.plugins_setting = GSetting('com.ubuntu-tweak.janitor.plugins')
+        self.scan_workers_setting = GSetting('com.ubuntu-tweak.janitor.scan-workers')
+        self.background_setting = GSetting('com.ubuntu-tweak.janitor.background-mode')
+        self.delete_budget_setting = GSetting('com.ubuntu-tweak.janitor.delete-budget')
         self.view_width_setting = GSetting('com.ubuntu-tweak.janitor.janitor-view-width')
 
         self.pack_start(self.vbox1, True, True, 0)
 
         self.connect('realize', self.setup_ui_tasks)
+        self.connect('destroy', self.on_destroy)
         self.janitor_view.get_selection().connect('changed', self.on_janitor_selection_changed)
         self.plugins_setting.connect_notify(self.update_model, True)
 
@@ -387,8 +157,7 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         result_display_renderer.set_property('ellipsize', Pango.EllipsizeMode.END)
         result_icon_renderer= self.builder.get_object('result_icon_renderer')
         self.result_column.set_cell_data_func(result_icon_renderer,
-                                              self.icon_column_view_func,
-                                              self.RESULT_ICON)
+                                              self.result_icon_view_func)
         #end new result columns
 
         auto_scan = self.autoscan_setting.get_value()
@@ -449,6 +218,8 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         iter = self.janitor_model.get_iter(path)
 
         if self._is_scanning_or_cleaning():
+            if self.janitor_model[iter][self.JANITOR_CHECK]:
+                self._cancel_scan_cruft(iter)
             return
 
         checked = not self.janitor_model[iter][self.JANITOR_CHECK]
@@ -515,6 +286,8 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
     def on_scan_button_clicked(self, widget=None):
         self.result_model.clear()
         self.clean_button.set_sensitive(False)
+        self.scan_session = ScanSession()
+        self._update_background()
 
         scan_dict = OrderedDict()
 
@@ -534,6 +307,7 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
 
     def _auto_scan_cruft(self, iter, checked):
         self.set_busy()
+        self._update_background()
 
         scan_dict = OrderedDict()
 
@@ -550,64 +324,145 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
 
         self.scan_tasks = list(scan_dict.items())
 
-        for plugin_iter, checked in self.scan_tasks:
+        self.do_scan_task()
+
+    def _cancel_scan_cruft(self, iter):
+        '''Uncheck the plugins and cancel their running or pending scan, the
+        cancelled plugins stop at the next entry and report what they found'''
+        if self.janitor_model.iter_has_child(iter):
+            plugin_iters = []
+            child_iter = self.janitor_model.iter_children(iter)
+
+            while child_iter:
+                plugin_iters.append(child_iter)
+                child_iter = self.janitor_model.iter_next(child_iter)
+        else:
+            plugin_iters = [iter]
+
+        pending = [self.janitor_model[task[0]][self.JANITOR_PLUGIN] for task in self.scan_tasks]
+        plugin_iters = [plugin_iter for plugin_iter in plugin_iters
+                        if self.janitor_model[plugin_iter][self.JANITOR_PLUGIN] in self._scan_handlers or
+                           self.janitor_model[plugin_iter][self.JANITOR_PLUGIN] in pending]
+
+        for plugin_iter in plugin_iters:
             plugin = self.janitor_model[plugin_iter][self.JANITOR_PLUGIN]
+            self.janitor_model[plugin_iter][self.JANITOR_CHECK] = False
+            self.scan_tasks = [task for task in self.scan_tasks
+                               if self.janitor_model[task[0]][self.JANITOR_PLUGIN] != plugin]
+
+            if plugin in self._scan_handlers:
+                log.info('Cancel the scan of plugin: %s' % plugin.get_name())
+                plugin.cancel()
+                self.janitor_model[plugin_iter][self.JANITOR_SPINNER_ACTIVE] = False
+            else:
+                # It isn't started, so the results of its last scan are outdated
+                self._remove_plugin_results(plugin)
+                self.janitor_model[plugin_iter][self.JANITOR_DISPLAY] = plugin.get_title()
 
-            for row in self.result_model:
-                if row[self.RESULT_PLUGIN] == plugin:
-                    self.result_model.remove(row.iter)
+            self._check_child_is_all_the_same(self.janitor_model, plugin_iter,
+                                             self.JANITOR_CHECK, False)
 
-        self.do_scan_task()
+    def _remove_plugin_results(self, plugin):
+        self.scan_session.release(plugin.get_name())
+
+        for row in self.result_model:
+            if row[self.RESULT_PLUGIN] == plugin:
+                self.result_model.remove(row.iter)
+
+    def _update_background(self):
+        '''Create the Background shared by the next tasks from the settings,
+        or None if the background mode is off'''
+        if self.background_setting.get_value():
+            self.background = Background(self.delete_budget_setting.get_value() * 1024 * 1024)
+        else:
+            self.background = None
 
     def do_scan_task(self):
-        plugin_iter, checked = self.scan_tasks.pop(0)
+        '''Start the pending scan tasks, at most "scan-workers" plugins are
+        scanned at the same time, and the plugins in the same scan group are
+        scanned one by one'''
+        if self.cancellable.is_cancelled():
+            return
 
-        plugin = self.janitor_model[plugin_iter][self.JANITOR_PLUGIN]
-        plugin.set_property('scan_finished', False)
+        max_workers = max(1, self.scan_workers_setting.get_value())
+        busy_groups = set(plugin.get_scan_group() for plugin in self._scan_handlers
+                          if plugin.get_scan_group())
 
-        log.debug("do_scan_task for %s for status: %s" % (plugin, checked))
+        for task in list(self.scan_tasks):
+            if len(self._scan_handlers) >= max_workers:
+                break
 
-        if checked:
-            log.info('Scan cruft for plugin: %s' % plugin.get_name())
+            plugin_iter, checked = task
+            plugin = self.janitor_model[plugin_iter][self.JANITOR_PLUGIN]
 
-            iter = self.result_model.append(None, (None,
-                                                   None,
-                                                   plugin.get_title(),
-                                                   '<b>%s</b>' % _('Scanning cruft for "%s"...') % plugin.get_title(),
-                                                   None,
-                                                   plugin,
-                                                   None))
+            if plugin in self._scan_handlers:
+                log.debug("The cancelled scan of %s isn't stopped yet" % plugin)
+                continue
 
-            self.janitor_model[plugin_iter][self.JANITOR_SPINNER_ACTIVE] = True
-            self.janitor_model[plugin_iter][self.JANITOR_SPINNER_PULSE] = 0
-            self.janitor_view.scroll_to_cell(self.janitor_model.get_path(plugin_iter))
+            if checked and plugin.get_scan_group() in busy_groups:
+                log.debug("Scan group of %s is busy, wait for next turn" % plugin)
+                continue
 
-            self._find_handler = plugin.connect('find_object', self.on_find_object, (plugin_iter, iter))
-            self._scan_handler = plugin.connect('scan_finished', self.on_scan_finished, (plugin_iter, iter))
-            self._error_handler = plugin.connect('scan_error', self.on_scan_error, (plugin_iter, iter))
+            self.scan_tasks.remove(task)
+            self._remove_plugin_results(plugin)
+            plugin.set_property('scan_finished', False)
 
-            t = threading.Thread(target=plugin.get_cruft)
-            GObject.timeout_add(50, self._on_spinner_timeout, plugin_iter, t)
+            log.debug("do_scan_task for %s for status: %s" % (plugin, checked))
 
-            t.start()
-        else:
-            # Update the janitor title
-            for row in self.janitor_model:
-                for child_row in row.iterchildren():
-                    if child_row[self.JANITOR_PLUGIN] == plugin:
-                        child_row[self.JANITOR_DISPLAY] = plugin.get_title()
-
-            if self.scan_tasks:
-                self.do_scan_task()
+            if checked:
+                if plugin.get_scan_group():
+                    busy_groups.add(plugin.get_scan_group())
+                self._start_scan_task(plugin_iter, plugin)
+            else:
+                # Update the janitor title
+                for row in self.janitor_model:
+                    for child_row in row.iterchildren():
+                        if child_row[self.JANITOR_PLUGIN] == plugin:
+                            child_row[self.JANITOR_DISPLAY] = plugin.get_title()
+
+        if not self.scan_tasks and not self._scan_handlers:
+            log.debug("total_count is: %d, total_size is: %d" % (self._total_count,
+                                                                 self.scan_session.get_total_size()))
+            if self._total_count == 0:
+                self.result_view.hide()
+                self.happy_box.show()
             else:
-                if self._total_count == 0:
-                    self.result_view.hide()
-                    self.happy_box.show()
-                else:
-                    self.result_view.show()
-                    self.happy_box.hide()
+                self.result_view.show()
+                self.happy_box.hide()
+
+            self.unset_busy()
+
+    def _start_scan_task(self, plugin_iter, plugin):
+        log.info('Scan cruft for plugin: %s' % plugin.get_name())
+
+        iter = self.result_model.append(None, (None,
+                                               None,
+                                               plugin.get_title(),
+                                               '<b>%s</b>' % _('Scanning cruft for "%s"...') % plugin.get_title(),
+                                               None,
+                                               plugin,
+                                               None))
+
+        self.janitor_model[plugin_iter][self.JANITOR_SPINNER_ACTIVE] = True
+        self.janitor_model[plugin_iter][self.JANITOR_SPINNER_PULSE] = 0
+        self.janitor_view.scroll_to_cell(self.janitor_model.get_path(plugin_iter))
+
+        self._scan_handlers[plugin] = (plugin.connect('find_object', self._push_event,
+                                                      self.on_find_object, (plugin_iter, iter)),
+                                       plugin.connect('scan_finished', self._push_event,
+                                                      self.on_scan_finished, (plugin_iter, iter)),
+                                       plugin.connect('scan_cancelled', self._push_event,
+                                                      self.on_scan_cancelled, (plugin_iter, iter)),
+                                       plugin.connect('scan_error', self._push_event,
+                                                      self.on_scan_error, (plugin_iter, iter)))
+
+        plugin.reset_cancellable()
+        plugin.scan_session = self.scan_session
+        plugin.background = self.background
+        t = threading.Thread(target=plugin.get_cruft)
+        GObject.timeout_add(50, self._on_spinner_timeout, plugin_iter, t)
 
-                self.unset_busy()
+        t.start()
 
     def _on_spinner_timeout(self, plugin_iter, thread):
         plugin = self.janitor_model[plugin_iter][self.JANITOR_PLUGIN]
@@ -616,9 +471,7 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         self.janitor_model[plugin_iter][self.JANITOR_SPINNER_PULSE] += 1
 
         if finished:
-            for handler in (self._find_handler,
-                            self._scan_handler,
-                            self._error_handler):
+            for handler in self._scan_handlers.pop(plugin, ()):
                 if plugin.handler_is_connected(handler):
                     log.debug("Disconnect the cleaned signal, or it will clean many times: %s" % plugin)
                     plugin.disconnect(handler)
@@ -627,38 +480,63 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
 
             thread.join()
 
-            if len(self.scan_tasks) != 0:
-                log.debug("Pending scan tasks: %d" % len(self.scan_tasks))
-                self.do_scan_task()
-            else:
-                log.debug("total_count is: %d" % self._total_count)
-                if self._total_count == 0:
-                    self.result_view.hide()
-                    self.happy_box.show()
-                else:
-                    self.result_view.show()
-                    self.happy_box.hide()
-
-                self.unset_busy()
+            log.debug("Pending scan tasks: %d" % len(self.scan_tasks))
+            self.do_scan_task()
 
         return not finished
 
-    @post_ui
-    def on_find_object(self, plugin, cruft, count, iters):
-        while Gtk.events_pending():
-            Gtk.main_iteration()
+    def _push_event(self, plugin, *args):
+        '''The handler of the plugin signals, it may be called in the plugin
+        threads, so just queue the signal. The last two arguments are the
+        real handler and its user data'''
+        handler, data = args[-2:]
+        self._event_queue.put((handler, (plugin,) + args[:-2] + (data,)))
+
+        with self._event_lock:
+            if not self._event_source:
+                self._event_source = GObject.idle_add(self._process_events)
 
+    def _process_events(self):
+        '''Handle the queued signals in order, it returns to the main loop
+        after event_time_slice, and continues in the next idle time'''
+        deadline = time.time() + self.event_time_slice
+
+        while time.time() < deadline:
+            try:
+                handler, args = self._event_queue.get_nowait()
+            except Queue.Empty:
+                with self._event_lock:
+                    if self._event_queue.empty():
+                        self._event_source = None
+                        return False
+                continue
+
+            handler(*args)
+
+        return True
+
+    def on_find_object(self, plugin, cruft, count, iters):
         plugin_iter, result_iter = iters
 
-        self.result_model.append(result_iter, (False,
-                                               cruft.get_icon(),
+        # The plugins with selection rules check the reclaimable cruft for the user
+        checked = plugin.has_selection_rules() and cruft.is_reclaimable()
+
+        if cruft.owner:
+            desc = _('Counted in "%s"') % self._get_plugin_title(cruft.owner)
+        else:
+            desc = cruft.get_size_display()
+
+        # The icon is looked up when the row is drawn, see result_icon_view_func
+        self.result_model.append(result_iter, (checked,
+                                               None,
                                                cruft.get_name(),
                                                cruft.get_name(),
-                                               cruft.get_size_display(),
+                                               desc,
                                                plugin,
                                                cruft))
 
-        self.result_view.expand_row(self.result_model.get_path(result_iter), True)
+        if self.result_model.iter_n_children(result_iter) == 1:
+            self.result_view.expand_row(self.result_model.get_path(result_iter), True)
 
         # Update the janitor title
         if count:
@@ -666,10 +544,18 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         else:
             self.janitor_model[plugin_iter][self.JANITOR_DISPLAY] = "[0] %s" % plugin.get_title()
 
-    @post_ui
+    def _get_plugin_title(self, name):
+        for row in self.janitor_model:
+            for child_row in row.iterchildren():
+                if child_row[self.JANITOR_PLUGIN].get_name() == name:
+                    return child_row[self.JANITOR_PLUGIN].get_title()
+        return name
+
     def on_scan_finished(self, plugin, result, count, size, iters):
-        plugin.disconnect(self._find_handler)
-        plugin.disconnect(self._scan_handler)
+        find_handler, scan_handler, cancel_handler, error_handler = self._scan_handlers[plugin]
+        plugin.disconnect(find_handler)
+        plugin.disconnect(scan_handler)
+        plugin.disconnect(cancel_handler)
         plugin.set_property('scan_finished', True)
 
         plugin_iter, result_iter = iters
@@ -681,6 +567,15 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
             if size != 0:
                 self.result_model[result_iter][self.RESULT_DESC] = "<b>%s</b>" % filesizeformat(size)
 
+            if plugin.has_selection_rules():
+                reclaimable = sum(row[self.RESULT_CRUFT].get_size()
+                                  for row in self.result_model[result_iter].iterchildren()
+                                  if row[self.RESULT_CRUFT].is_reclaimable())
+                self.result_model[result_iter][self.RESULT_DESC] = "<b>%s</b>" % (_('%s, %s reclaimable') %
+                                                                                 (filesizeformat(size),
+                                                                                  filesizeformat(reclaimable)))
+                self._update_clean_button_sensitive()
+
         # Update the janitor title
         self._total_count += count
 
@@ -690,7 +585,13 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         else:
             self.janitor_model[plugin_iter][self.JANITOR_DISPLAY] = "[0] %s" % plugin.get_title()
 
-    @post_ui
+        if result:
+            janitor_history.add(SCAN, plugin.get_name(), count, size)
+
+    def on_scan_cancelled(self, plugin, count, size, iters):
+        log.info("Scan of %s is cancelled with %d found" % (plugin, count))
+        self.on_scan_finished(plugin, False, count, size, iters)
+
     def on_scan_error(self, plugin, error, iters):
         plugin_iter, result_iter = iters
 
@@ -729,12 +630,31 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
             if cruft_dict:
                 plugin_dict[plugin] = cruft_dict
 
+        self._filter_nested_cruft(plugin_dict)
+        self._update_background()
         self.clean_tasks = list(plugin_dict.items())
 
         self.do_real_clean_task()
         log.debug("All finished!")
 
+    def _filter_nested_cruft(self, plugin_dict):
+        '''The plugins may find the same cache or a cache inside another one,
+        only the outermost one is cleaned, so nothing is deleted twice'''
+        crufts = [(plugin, cruft) for plugin, cruft_dict in plugin_dict.items()
+                  for cruft in cruft_dict if isinstance(cruft, CacheObject)]
+        kept = set(filter_nested_paths([cruft.get_path() for plugin, cruft in crufts]))
+
+        for index, (plugin, cruft) in enumerate(crufts):
+            if index not in kept:
+                log.debug("Skip %s, it is cleaned with another one" % cruft.get_path())
+                del plugin_dict[plugin][cruft]
+                if not plugin_dict[plugin]:
+                    del plugin_dict[plugin]
+
     def do_real_clean_task(self):
+        if self.cancellable.is_cancelled():
+            return
+
         if len(self.clean_tasks) != 0:
             plugin, cruft_dict = self.clean_tasks.pop(0)
             plugin.set_property('clean_finished', False)
@@ -745,11 +665,16 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
                         plugin_iter = child_row.iter
 
             log.debug("Call %s to clean cruft" % plugin)
+            self._cleaned_count = 0
+            self._cleaned_size = 0
             self._object_clean_handler = plugin.connect('object_cleaned',
+                                                        self._push_event,
                                                         self.on_plugin_object_cleaned,
                                                         (plugin_iter, cruft_dict))
-            self._all_clean_handler = plugin.connect('all_cleaned', self.on_plugin_cleaned, plugin_iter)
-            self._error_handler = plugin.connect('clean_error', self.on_clean_error, plugin_iter)
+            self._all_clean_handler = plugin.connect('all_cleaned', self._push_event,
+                                                     self.on_plugin_cleaned, plugin_iter)
+            self._error_handler = plugin.connect('clean_error', self._push_event,
+                                                 self.on_clean_error, plugin_iter)
             self.janitor_view.scroll_to_cell(self.janitor_model.get_path(plugin_iter))
 
             t = threading.Thread(target=plugin.clean_cruft,
@@ -758,6 +683,8 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
 
             for row in self.result_model:
                 if row[self.RESULT_PLUGIN] == plugin:
+                    self._progress_handler = plugin.connect('clean_progress', self._push_event,
+                                                            self.on_clean_progress, row.iter)
                     self.result_view.get_selection().select_path(row.path)
                     self.result_view.scroll_to_cell(row.path)
                     row[self.RESULT_DISPLAY] = '<b>%s</b>' % _('Cleaning cruft for "%s"...') % plugin.get_title()
@@ -768,6 +695,8 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
 
             GObject.timeout_add(50, self._on_clean_spinner_timeout, plugin_iter, t)
 
+            plugin.reset_cancellable()
+            plugin.background = self.background
             t.start()
         else:
             self.on_scan_button_clicked()
@@ -782,7 +711,8 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
             log.debug("Disconnect the cleaned signal for %s, or it will clean many times" % plugin)
             for handler in (self._object_clean_handler,
                             self._all_clean_handler,
-                            self._error_handler):
+                            self._error_handler,
+                            self._progress_handler):
                 if plugin.handler_is_connected(handler):
                     plugin.disconnect(handler)
 
@@ -790,17 +720,18 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
 
             thread.join()
 
+            if self._cleaned_count:
+                janitor_history.add(CLEAN, plugin.get_name(), self._cleaned_count, self._cleaned_size)
+
             self.do_real_clean_task()
 
         return not finished
 
-    @post_ui
     def on_plugin_object_cleaned(self, plugin, cruft, count, user_data):
-        while Gtk.events_pending():
-            Gtk.main_iteration()
-
         plugin_iter, cruft_dict = user_data
         self.result_model.remove(cruft_dict[cruft])
+        self._cleaned_count += 1
+        self._cleaned_size += cruft.get_size()
 
         self.janitor_model[plugin_iter][self.JANITOR_DISPLAY]
         remain = len(cruft_dict) - count
@@ -810,8 +741,14 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         else:
             self.janitor_model[plugin_iter][self.JANITOR_DISPLAY] = "[0] %s" % plugin.get_title()
 
+    def on_clean_progress(self, plugin, size, total_size, result_iter):
+        self.result_model[result_iter][self.RESULT_DESC] = "<b>%s / %s</b>" % (filesizeformat(size),
+                                                                              filesizeformat(total_size))
+
     def on_plugin_cleaned(self, plugin, cleaned, plugin_iter):
         #TODO should accept the cruft_list
+        if not cleaned:
+            self.clean_tasks = []
         plugin.set_property('clean_finished', True)
         self.janitor_model[plugin_iter][self.JANITOR_DISPLAY] = "[0] %s" % plugin.get_title()
 
@@ -821,6 +758,19 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         self.clean_tasks = []
         plugin.set_property('clean_finished', True)
 
+    def on_destroy(self, widget):
+        '''Stop all the scan and clean tasks, the running plugins stop at the
+        next entry'''
+        self.cancellable.cancel()
+        self.scan_tasks = []
+        self.clean_tasks = []
+
+        for row in self.janitor_model:
+            for child_row in row.iterchildren():
+                plugin = child_row[self.JANITOR_PLUGIN]
+                if plugin in self._scan_handlers or child_row[self.JANITOR_SPINNER_ACTIVE]:
+                    plugin.cancel()
+
     def on_autoscan_button_toggled(self, *args):
         if self.autoscan_setting.get_value():
             self.scan_button.hide()
@@ -833,6 +783,16 @@ class JanitorPage(Gtk.VBox, GuiBuilder):
         else:
             renderer.set_property("visible", True)
 
+    def result_icon_view_func(self, cell_layout, renderer, model, iter, data=None):
+        cruft = model[iter][self.RESULT_CRUFT]
+
+        if cruft:
+            pixbuf = cruft.get_icon()
+            renderer.set_property("pixbuf", pixbuf)
+            renderer.set_property("visible", pixbuf is not None)
+        else:
+            self.icon_column_view_func(cell_layout, renderer, model, iter, self.RESULT_ICON)
+
     def update_model(self, a=None, b=None, expand=False):
         self.janitor_model.clear()
         self.result_model.clear()
@@ -1,6 +1,7 @@
 import logging
+import threading
 
-from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
 from ubuntutweak.policykit.dbusproxy import proxy
 
 log = logging.getLogger('aptcache_plugin')
@@ -13,15 +14,86 @@ class AptCachePlugin(JanitorCachePlugin):
     root_path = '/var/cache/apt/archives/'
     pattern = '*.deb'
 
+    # How many files are sent to the daemon in one call
+    chunk_size = 200
+    # How long to wait for the daemon to delete one chunk
+    reply_timeout = 120
+
     def clean_cruft(self, cruft_list=[], parent=None):
-        for index, cruft in enumerate(cruft_list):
-            log.debug('Cleaning...%s' % cruft.get_name())
-            result = proxy.delete_apt_cache_file(cruft.get_name())
+        self._pending = dict((cruft.get_name(), cruft) for cruft in cruft_list)
+        self._cleaned = 0
+        self._failed = []
+
+        self._delete_method = proxy.get_method('delete_apt_cache_files')
+        if self._delete_method:
+            match = proxy.connect_to_signal('apt_cache_file_deleted',
+                                            self.on_apt_cache_file_deleted)
+        else:
+            match = None
+
+        if match is None:
+            log.error("The daemon is not available")
+            if cruft_list:
+                self.emit('clean_error', cruft_list[0].get_name())
+            self.emit('all_cleaned', True)
+            return
+
+        cleaned = True
+
+        try:
+            for start in range(0, len(cruft_list), self.chunk_size):
+                if self.is_cancelled():
+                    cleaned = False
+                    break
+
+                names = [cruft.get_name() for cruft in cruft_list[start:start + self.chunk_size]]
+                log.debug('Cleaning %d files from %s' % (len(names), names[0]))
+
+                if not self._delete_files(names) or self._failed:
+                    break
+        finally:
+            match.remove()
+
+        if self._failed:
+            self.emit('clean_error', self._failed[0])
+
+        self.emit('all_cleaned', cleaned)
+
+    def _delete_files(self, names):
+        '''Call the daemon asynchronously and wait for the reply, the signals
+        of the files are always dispatched before the reply'''
+        done = threading.Event()
+        result = []
+
+        def on_reply(failed):
+            result.append(True)
+            done.set()
+
+        def on_error(error):
+            log.error(error)
+            self._failed.extend(name for name in names if name in self._pending)
+            done.set()
+
+        self._delete_method(names,
+                            reply_handler=on_reply,
+                            error_handler=on_error,
+                            timeout=self.reply_timeout)
+
+        if not done.wait(self.reply_timeout):
+            log.error("The daemon did not answer in %d seconds" % self.reply_timeout)
+            self._failed.extend(name for name in names if name in self._pending)
+            return False
+
+        return bool(result)
+
+    def on_apt_cache_file_deleted(self, file_name, result):
+        cruft = self._pending.pop(file_name, None)
 
-            if bool(result) == False:
-                self.emit('clean_error', cruft.get_name())
-                break
-            else:
-                self.emit('object_cleaned', cruft, index + 1)
+        if cruft is None:
+            return
 
-        self.emit('all_cleaned', True)
+        if result:
+            self._cleaned += 1
+            self.emit('object_cleaned', cruft, self._cleaned)
+        else:
+            self._failed.append(file_name)
@@ -5,6 +5,8 @@ from gi.repository import Gtk
 from ubuntutweak.gui.gtk import set_busy, unset_busy
 from ubuntutweak.janitor import JanitorPlugin, PackageObject
 from ubuntutweak.utils.package import AptWorker
+from ubuntutweak.utils.aptcache import cache_manager
+from ubuntutweak.common.debug import get_traceback
 from ubuntutweak.utils import filesizeformat
 
 
@@ -13,21 +15,30 @@ log = logging.getLogger('AutoRemovalPlugin')
 class AutoRemovalPlugin(JanitorPlugin):
     __title__ = _('Unneeded Packages')
     __category__ = 'system'
+    __scan_group__ = 'apt'
 
     def get_cruft(self):
-        cache = AptWorker.get_cache()
         count = 0
         size = 0
-        if cache:
-            for pkg in cache:
+
+        try:
+            for pkg in cache_manager.get_installed_packages():
+                if self.is_cancelled():
+                    self.emit('scan_cancelled', count, size)
+                    return
+
                 if pkg.is_auto_removable and not pkg.name.startswith('linux'):
                     count += 1
-                    size += pkg.installed.size
+                    size += pkg.installed_size
                     self.emit('find_object',
-                              PackageObject(pkg.installed.summary, pkg.name, pkg.installed.size),
+                              PackageObject(pkg.summary, pkg.name, pkg.installed_size),
                               count)
 
-        self.emit('scan_finished', True, count, size)
+            self.emit('scan_finished', True, count, size)
+        except Exception, e:
+            error = get_traceback()
+            log.error(error)
+            self.emit('scan_error', error)
 
     def clean_cruft(self, parent=None, cruft_list=[]):
         set_busy(parent)
@@ -43,7 +54,7 @@ class AutoRemovalPlugin(JanitorPlugin):
 
     def on_clean_finished(self, transaction, status, parent):
         unset_busy(parent)
-        AptWorker.update_apt_cache(True)
+        AptWorker.update_apt_cache()
         self.emit('all_cleaned', True)
 
     def get_summary(self, count):
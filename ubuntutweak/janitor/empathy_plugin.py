@@ -1,4 +1,4 @@
-from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
 
 class EmpathyCachePlugin(JanitorCachePlugin):
     __title__ = _('Empathy Cache')
@@ -1,4 +1,4 @@
-from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
 
 class GwibberCachePlugin(JanitorCachePlugin):
     __title__ = _('Gwibber Cache')
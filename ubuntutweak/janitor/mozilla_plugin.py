@@ -1,7 +1,7 @@
 import os
 import logging
 
-from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
 from ubuntutweak.settings.configsettings import RawConfigSetting
 
 log = logging.getLogger('MozillaCachePlugin')
@@ -19,7 +19,7 @@ class MozillaCachePlugin(JanitorCachePlugin):
 
     @classmethod
     def get_path(cls):
-        profiles_path = os.path.expanduser('%s/profiles.ini' % cls.app_path)
+        profiles_path = cls.expand_path('%s/profiles.ini' % cls.app_path)
         if os.path.exists(profiles_path):
             config = RawConfigSetting(profiles_path)
             try:
@@ -28,12 +28,12 @@ class MozillaCachePlugin(JanitorCachePlugin):
                     if section.startswith('Profile'):
                         relative_id = config.get_value(section, 'IsRelative')
                         if relative_id == profile_id:
-                            return os.path.expanduser('%s/%s' % (cls.cache_path, config.get_value(section, 'Path')))
+                            return cls.expand_path('%s/%s' % (cls.cache_path, config.get_value(section, 'Path')))
             except Exception, e:
                 log.error(e)
                 path = config.get_value('Profile0', 'Path')
                 if path:
-                    return os.path.expanduser('%s/%s' % (cls.cache_path, path))
+                    return cls.expand_path('%s/%s' % (cls.cache_path, path))
         return cls.root_path
 
 
@@ -6,6 +6,7 @@ from distutils.version import LooseVersion
 from ubuntutweak.gui.gtk import set_busy, unset_busy
 from ubuntutweak.janitor import JanitorPlugin, PackageObject
 from ubuntutweak.utils.package import AptWorker
+from ubuntutweak.utils.aptcache import cache_manager, parse_kernel_package
 from ubuntutweak.common.debug import log_func, get_traceback
 
 
@@ -15,9 +16,14 @@ log = logging.getLogger('OldKernelPlugin')
 class OldKernelPlugin(JanitorPlugin):
     __title__ = _('Old Kernel')
     __category__ = 'system'
+    __scan_group__ = 'apt'
 
     p_kernel_version = re.compile('[.\d]+-\d+')
-    p_kernel_package = re.compile('linux-[a-z\-]+')
+
+    basenames = ('linux-image', 'linux-image-extra', 'linux-headers',
+                 'linux-image-debug', 'linux-ubuntu-modules',
+                 'linux-header-lum', 'linux-backport-modules',
+                 'linux-header-lbm', 'linux-restricted-modules')
 
     def __init__(self):
         JanitorPlugin.__init__(self)
@@ -30,19 +36,21 @@ class OldKernelPlugin(JanitorPlugin):
 
     def get_cruft(self):
         try:
-            cache = AptWorker.get_cache()
             count = 0
             size = 0
 
-            if cache:
-                for pkg in cache:
-                    if pkg.is_installed and self.is_old_kernel_package(pkg.name):
-                        log.debug("Find old kernerl: %s" % pkg.name)
-                        count += 1
-                        size += pkg.installed.size
-                        self.emit('find_object',
-                                  PackageObject(pkg.name, pkg.name, pkg.installed.size),
-                                  count)
+            for pkg in cache_manager.get_installed_packages():
+                if self.is_cancelled():
+                    self.emit('scan_cancelled', count, size)
+                    return
+
+                if pkg.kernel and self.is_old_kernel(*pkg.kernel):
+                    log.debug("Find old kernerl: %s" % pkg.name)
+                    count += 1
+                    size += pkg.installed_size
+                    self.emit('find_object',
+                              PackageObject(pkg.name, pkg.name, pkg.installed_size),
+                              count)
 
             self.emit('scan_finished', True, count, size)
         except Exception, e:
@@ -64,28 +72,18 @@ class OldKernelPlugin(JanitorPlugin):
 
     def on_clean_finished(self, transaction, status, parent):
         unset_busy(parent)
-        AptWorker.update_apt_cache(True)
+        AptWorker.update_apt_cache()
         self.emit('all_cleaned', True)
 
     def is_old_kernel_package(self, pkg):
-        basenames = ['linux-image', 'linux-image-extra', 'linux-headers',
-                     'linux-image-debug', 'linux-ubuntu-modules',
-                     'linux-header-lum', 'linux-backport-modules',
-                     'linux-header-lbm', 'linux-restricted-modules']
-
-        if pkg.startswith('linux'):
-            package = self.p_kernel_package.findall(pkg)
-            if package:
-                package = package[0].rstrip('-')
-            else:
-                return False
-
-            if package in basenames:
-                match = self.p_kernel_version.findall(pkg)
-                if match and self._compare_kernel_version(match[0]):
-                    return True
+        kernel = parse_kernel_package(pkg)
+        if kernel:
+            return self.is_old_kernel(*kernel)
         return False
 
+    def is_old_kernel(self, package, version):
+        return package in self.basenames and self._compare_kernel_version(version)
+
     @log_func(log)
     def _compare_kernel_version(self, version):
         c1, c2 = self.current_kernel_version.split('-')
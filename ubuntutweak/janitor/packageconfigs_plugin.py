@@ -1,71 +1,146 @@
-import os
 import time
+import uuid
 import logging
+import threading
 
 from gi.repository import GObject, Gtk
 
 from ubuntutweak.gui.gtk import set_busy, unset_busy
 from ubuntutweak.janitor import JanitorPlugin, PackageObject
-from ubuntutweak.utils import icon, filesizeformat
+from ubuntutweak.utils import icon, filesizeformat, dpkg
+from ubuntutweak.common.debug import get_traceback
 from ubuntutweak.policykit.dbusproxy import proxy
 
 
 log = logging.getLogger('PackageConfigsPlugin')
 
 class PackageConfigObject(PackageObject):
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ()
 
-    def get_icon(self):
-        return icon.get_from_name('text-plain')
-
-    def get_size_display(self):
-        return ''
+    def __init__(self, name, size=0):
+        PackageObject.__init__(self, name, name, size)
 
-    def get_size(self):
-        return 0
+    def get_icon(self):
+        return icon.get_shared_from_name('text-plain')
 
 
 class PackageConfigsPlugin(JanitorPlugin):
     __title__ = _('Package Configs')
     __category__ = 'system'
 
+    # The purge is given up if the daemon sends nothing for so long
+    purge_timeout = 300
+
     def get_cruft(self):
         count = 0
-
-        for line in os.popen('dpkg -l'):
-            try:
-                temp_list = line.split()
-                status, pkg = temp_list[0], temp_list[1]
-                if status == 'rc':
-                    des = temp_list[3:]
-                    count += 1
-                    self.emit('find_object',
-                              PackageConfigObject(pkg),
-                              count)
-            except:
-                pass
-
-        self.emit('scan_finished', True, count, 0)
+        size = 0
+
+        try:
+            for pkg, pkg_size in dpkg.iter_config_packages():
+                if self.is_cancelled():
+                    self.emit('scan_cancelled', count, size)
+                    return
+
+                count += 1
+                size += pkg_size
+                self.emit('find_object',
+                          PackageConfigObject(pkg, pkg_size),
+                          count)
+
+            self.emit('scan_finished', True, count, size)
+        except Exception, e:
+            error = get_traceback()
+            log.error(error)
+            self.emit('scan_error', error)
 
     def clean_cruft(self, cruft_list=[], parent=None):
-        for index, cruft in enumerate(cruft_list):
-            log.debug('Cleaning...%s' % cruft.get_name())
-            proxy.clean_configs(cruft.get_name())
-            line, returncode = proxy.get_cmd_pipe()
-            while returncode == 'None':
-                log.debug('output: %s, returncode: %s' % (line, returncode))
-                time.sleep(0.2)
-                line, returncode = proxy.get_cmd_pipe()
-
-            if returncode != '0':
-                self.emit('clean_error', returncode)
-                break
+        self._pending = dict((cruft.get_name(), cruft) for cruft in cruft_list)
+        self._cleaned = 0
+        self._last_line = ''
+        self._last_time = time.time()
+        self._returncode = None
+        self._finished = threading.Event()
+        # The signals of the purges of the other clients are ignored
+        self._purge_id = uuid.uuid4().hex
+
+        matches = [proxy.connect_to_signal('purge_output', self.on_purge_output),
+                   proxy.connect_to_signal('package_purged', self.on_package_purged),
+                   proxy.connect_to_signal('purge_finished', self.on_purge_finished),
+                   proxy.connect_to_owner_changed(self.on_daemon_changed)]
+
+        try:
+            if None in matches:
+                raise Exception('The daemon is not available')
+
+            log.debug('Purging %d packages' % len(cruft_list))
+            if proxy.purge_config_packages(self._purge_id,
+                                           [cruft.get_name() for cruft in cruft_list]):
+                self._wait_purge()
             else:
-                self.emit('object_cleaned', cruft, index + 1)
+                self._last_line = 'Another purge is running'
+        except Exception, e:
+            log.error(e)
+            self._last_line = str(e)
+        finally:
+            for match in matches:
+                if match:
+                    match.remove()
+
+        if self._returncode != 0 or self._pending:
+            self.emit('clean_error', self._last_line or str(self._returncode))
 
         self.emit('all_cleaned', True)
 
+    def _wait_purge(self):
+        while not self._finished.is_set():
+            timeout = self._last_time + self.purge_timeout - time.time()
+            if timeout <= 0:
+                log.error("The purge sent nothing in %d seconds" % self.purge_timeout)
+                self._last_line = _('The daemon did not answer in %d seconds') % self.purge_timeout
+                return
+
+            self._finished.wait(timeout)
+
+    def on_purge_output(self, purge_id, line):
+        if purge_id != self._purge_id:
+            return
+
+        log.debug('output: %s' % line)
+        self._last_time = time.time()
+        if line.strip():
+            self._last_line = line
+
+    def on_package_purged(self, purge_id, pkg):
+        if purge_id != self._purge_id:
+            return
+
+        cruft = self._pending.pop(pkg, None)
+
+        # dpkg may print the name with or without the architecture
+        if cruft is None:
+            for name in self._pending.keys():
+                if name.split(':')[0] == pkg.split(':')[0]:
+                    cruft = self._pending.pop(name)
+                    break
+
+        if cruft:
+            self._cleaned += 1
+            self.emit('object_cleaned', cruft, self._cleaned)
+
+    def on_purge_finished(self, purge_id, returncode):
+        if purge_id != self._purge_id:
+            return
+
+        self._returncode = returncode
+        self._finished.set()
+
+    def on_daemon_changed(self, old_owner, new_owner):
+        # The daemon which runs the purge is gone, purge_finished won't come
+        if old_owner and not self._finished.is_set():
+            log.error("The daemon quit while purging")
+            self._last_line = _('The daemon quit while purging')
+            self._finished.set()
+
     def get_summary(self, count):
         if count:
             return '[%d] %s' % (count, self.__title__)
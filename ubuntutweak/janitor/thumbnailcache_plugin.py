@@ -1,11 +1,11 @@
 from ubuntutweak import system
-from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
 
 class ThumbnailCachePlugin(JanitorCachePlugin):
     __title__ = _('Thumbnail cache')
     __category__ = 'personal'
 
-    if system.CODENAME in ['precise']:
+    if system.get_codename() in ['precise']:
         root_path = '~/.thumbnails'
     else:
         root_path = '~/.cache/thumbnails'
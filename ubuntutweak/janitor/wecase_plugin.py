@@ -1,4 +1,4 @@
-from ubuntutweak.janitor import JanitorCachePlugin
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
 
 class WeCaseCachePlugin(JanitorCachePlugin):
     __title__ = _('WeCase')
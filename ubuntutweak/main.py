@@ -16,7 +16,6 @@
 # along with Ubuntu Tweak; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 
-import thread
 import logging
 
 from gi.repository import GObject, Gtk, Gdk, Pango
@@ -25,11 +24,13 @@ from ubuntutweak.gui import GuiBuilder
 from ubuntutweak.gui.gtk import post_ui
 from ubuntutweak.policykit.widgets import PolkitButton
 from ubuntutweak.utils import icon
-from ubuntutweak.common.consts import VERSION
-from ubuntutweak.modules import ModuleLoader, create_broken_module_class
+from ubuntutweak.common.consts import get_version
+from ubuntutweak.common.profiler import profiler
+from ubuntutweak.modules import ModuleLoader, ModuleInfo, create_broken_module_class
 from ubuntutweak.gui.dialogs import ErrorDialog
 from ubuntutweak.clips import ClipPage
 from ubuntutweak.apps import AppsPage
+from ubuntutweak.utils.aptcache import cache_manager
 from ubuntutweak.janitor import JanitorPage
 from ubuntutweak.policykit.dbusproxy import proxy
 from ubuntutweak.settings import GSetting
@@ -178,7 +179,7 @@ class FeaturePage(Gtk.ScrolledWindow):
     def load_modules(self, *args, **kwargs):
         log.debug("Loading modules...")
 
-        loader = ModuleLoader(self._feature)
+        loader = ModuleLoader(self._feature, use_index=True)
 
         self._boxes = []
         for child in self._box.get_children():
@@ -288,16 +289,24 @@ class UbuntuTweakWindow(GuiBuilder):
     modules_index = {}
 
     def __init__(self, feature='', module='', splash_window=None):
-        GuiBuilder.__init__(self, file_name='mainwindow.ui')
+        with profiler.phase('GuiBuilder'):
+            GuiBuilder.__init__(self, file_name='mainwindow.ui')
 
-        tweaks_page = FeaturePage('tweaks')
-        admins_page = FeaturePage('admins')
+        with profiler.phase('FeaturePage tweaks'):
+            tweaks_page = FeaturePage('tweaks')
+        with profiler.phase('FeaturePage admins'):
+            admins_page = FeaturePage('admins')
         self.no_result_box.label = self.result_text
-        self.search_page = SearchPage(self.no_result_box)
-        clip_page = ClipPage()
-        self.apps_page = AppsPage(self.back_button, self.next_button)
-        janitor_page = JanitorPage()
-        self.preferences_dialog = PreferencesDialog(self.mainwindow)
+        with profiler.phase('SearchPage'):
+            self.search_page = SearchPage(self.no_result_box)
+        with profiler.phase('ClipPage'):
+            clip_page = ClipPage()
+        with profiler.phase('AppsPage'):
+            self.apps_page = AppsPage(self.back_button, self.next_button)
+        with profiler.phase('JanitorPage'):
+            janitor_page = JanitorPage()
+        with profiler.phase('PreferencesDialog'):
+            self.preferences_dialog = PreferencesDialog(self.mainwindow)
 
         self.recently_used_settings = GSetting('com.ubuntu-tweak.tweak.recently-used')
 
@@ -322,7 +331,8 @@ class UbuntuTweakWindow(GuiBuilder):
         clip_page.connect('load_module', lambda widget, name: self.do_load_module(name))
         clip_page.connect('load_feature', lambda widget, name: self.select_target_feature(name))
 
-        self.mainwindow.show()
+        with profiler.phase('show'):
+            self.mainwindow.show()
 
         if module:
             self.do_load_module(module)
@@ -336,15 +346,11 @@ class UbuntuTweakWindow(GuiBuilder):
                                           Gdk.ModifierType.CONTROL_MASK,
                                           Gtk.AccelFlags.VISIBLE)
         self.mainwindow.add_accel_group(accel_group)
-        thread.start_new_thread(self.preload_proxy_cache, ())
+        cache_manager.warm_up()
 
     def show_apps_page(self, widget):
         self.notebook.set_current_page(self.feature_dict['apps'])
 
-    def preload_proxy_cache(self):
-        #This function just called to make sure the cache is loaded as soon as possible
-        proxy.is_package_installed('ubuntu-tweak')
-
     def on_search_entry_activate(self, widget):
         widget.grab_focus()
         self.on_search_entry_changed(widget)
@@ -418,7 +424,7 @@ class UbuntuTweakWindow(GuiBuilder):
             log.error(e)
 
     def on_about_button_clicked(self, widget):
-        self.aboutdialog.set_version(VERSION)
+        self.aboutdialog.set_version(get_version())
         self.aboutdialog.set_transient_for(self.mainwindow)
         self.aboutdialog.run()
         self.aboutdialog.hide()
@@ -492,6 +498,9 @@ class UbuntuTweakWindow(GuiBuilder):
                 module, index = self.get_module_and_index(name)
             else:
                 try:
+                    # The modules listed from the index are imported now
+                    if isinstance(module, ModuleInfo):
+                        module = module.get_class()
                     page = module()
                 except Exception, e:
                     log.error(e)
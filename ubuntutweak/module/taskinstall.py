@@ -179,7 +179,7 @@ class TaskView(gtk.TreeView):
 
                     if res == gtk.RESPONSE_YES:
                         PACKAGE_WORKER.perform_action(self.get_toplevel(), [], updateview.to_add)
-                        PACKAGE_WORKER.update_apt_cache(True)
+                        PACKAGE_WORKER.update_apt_cache()
                         self.update_model()
         else:
             list = os.popen('tasksel --task-packages %s' % task).read().split('\n')
@@ -197,7 +197,7 @@ class TaskView(gtk.TreeView):
 
             if res == gtk.RESPONSE_YES:
                 PACKAGE_WORKER.perform_action(self.get_toplevel(), updateview.to_add, [])
-                PACKAGE_WORKER.update_apt_cache(True)
+                PACKAGE_WORKER.update_apt_cache()
                 self.update_model()
 
         print self.model.get_value(iter, self.COLUMN_ACTION)
@@ -56,7 +56,7 @@ class UpdateManager(TweakModule):
         self.reparent(self.main_vbox)
 
     def update_list(self):
-        PACKAGE_WORKER.update_apt_cache(init=True)
+        PACKAGE_WORKER.update_apt_cache()
         self.updateview.get_model().clear()
         self.updateview.update_updates(list(PACKAGE_WORKER.get_update_package()))
         self.install_button.set_sensitive(False)
@@ -69,7 +69,7 @@ class UpdateManager(TweakModule):
 
         UpdateCacheDialog(widget.get_toplevel()).run()
 
-        PACKAGE_WORKER.update_apt_cache(True)
+        PACKAGE_WORKER.update_apt_cache()
 
         new_updates = list(PACKAGE_WORKER.get_update_package())
         if new_updates:
@@ -100,7 +100,7 @@ class UpdateManager(TweakModule):
     def on_install_button_clicked(self, widget):
         PACKAGE_WORKER.perform_action(widget.get_toplevel(), self.updateview.to_add, self.updateview.to_rm)
 
-        PACKAGE_WORKER.update_apt_cache(True)
+        PACKAGE_WORKER.update_apt_cache()
 
         PACKAGE_WORKER.show_installed_status(self.updateview.to_add, self.updateview.to_rm)
 
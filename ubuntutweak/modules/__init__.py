@@ -1,24 +1,286 @@
 import os
 import sys
-import glob
+import time
+import marshal
 import logging
 import inspect
-import traceback
 from new import classobj
 
 from gi.repository import GObject, Gtk, Gdk, GdkPixbuf
 
 from ubuntutweak import system
 from ubuntutweak.utils import icon
+from ubuntutweak.utils import searchindex
+from ubuntutweak.utils.moduleindex import module_index
 from ubuntutweak.common.consts import DATA_DIR, CONFIG_ROOT, IS_INSTALLED 
+from ubuntutweak.common.profiler import profiler
 from ubuntutweak.common.debug import run_traceback, log_traceback, open_bug_report
 
 log = logging.getLogger('ModuleLoader')
 
+# The classes which all the modules are made from, they are never loaded
+BASE_CLASS_NAMES = ('TweakModule', 'Clip', 'JanitorPlugin', 'proxy')
+
+# The folder which has the ubuntutweak package, for the discovery helpers
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 def module_cmp(m1, m2):
     return cmp(m1.get_title(), m2.get_title())
 
 
+def stat_module_file(path):
+    '''Return the stat of the module file, or the __init__.py of the
+    package, or None if it fails'''
+    try:
+        if os.path.isdir(path):
+            return os.stat(os.path.join(path, '__init__.py'))
+        return os.stat(path)
+    except OSError, e:
+        log.debug("stat failed: %s" % e)
+
+
+def get_module_records(members, path):
+    '''Return the ModuleInfo records of the module classes in the members
+    of the module file at path'''
+    records = []
+
+    for k, v in members:
+        if k in BASE_CLASS_NAMES or not inspect.isclass(v) or \
+                not hasattr(v, '__utmodule__'):
+            continue
+        records.append(ModuleInfo.from_class(v, path).to_record())
+
+    return records
+
+
+def discover_module_file(path):
+    '''Import the module file in a helper process of the discovery, return
+    (records, seconds), the records are None if it fails'''
+    start = time.time()
+
+    try:
+        package = ModuleLoader.import_module_file(path)
+        records = get_module_records(inspect.getmembers(package), path)
+    except Exception, e:
+        log.debug("Discover %s failed: %s" % (path, e))
+        records = None
+
+    return records, time.time() - start
+
+
+def run_discovery_helper():
+    '''The main of a DiscoveryHelper process. It reads the paths from stdin
+    and imports them one by one, it writes "ready" once it is started,
+    "start" when an import starts and "done" with the marshalled result of
+    discover_module_file() when it is finished'''
+    # What the modules print mustn't be taken as the replies
+    output = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def reply(line):
+        output.write(line + '\n')
+        output.flush()
+
+    reply('ready')
+
+    for line in iter(sys.stdin.readline, ''):
+        reply('start')
+        result = discover_module_file(line.rstrip('\n'))
+        reply('done %s' % marshal.dumps(result).encode('hex'))
+
+
+class DiscoveryHelper(object):
+    '''A process which imports the new modules for the discovery. It is a
+    new Python, not a fork of the UI, which has the threads and the D-Bus
+    connections a module may need when it is imported'''
+
+    def __init__(self):
+        # It is only needed for the new modules, so it isn't imported at
+        # every start
+        import subprocess
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([SOURCE_ROOT] + filter(None, [env.get('PYTHONPATH')]))
+
+        self.process = subprocess.Popen([sys.executable, '-c',
+                                         'from ubuntutweak.modules import run_discovery_helper; '
+                                         'run_discovery_helper()'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        env=env, close_fds=True)
+        self.ready = False
+        # The path it is importing, when the import is started, and when it
+        # is started or the path is sent, until it is known to be started
+        self.path = None
+        self.started = None
+        self.sent = time.time()
+        self._buffer = ''
+
+    def fileno(self):
+        return self.process.stdout.fileno()
+
+    def send(self, path):
+        self.path = path
+        self.started = None
+        self.sent = time.time()
+        self.process.stdin.write(path + '\n')
+        self.process.stdin.flush()
+
+    def read_lines(self):
+        '''Return the complete lines it has written, or None if it exits'''
+        data = os.read(self.fileno(), 65536)
+        if not data:
+            return None
+
+        lines = (self._buffer + data).split('\n')
+        self._buffer = lines.pop()
+        return lines
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+class ModuleImportTimeout(Exception):
+    pass
+
+
+def get_search_fields(module):
+    '''Return the (text, weight) of the searchable strings of the module'''
+    fields = [(module.get_name(), searchindex.NAME_WEIGHT),
+              (module.get_title(), searchindex.TITLE_WEIGHT),
+              (module.get_description(), searchindex.DESCRIPTION_WEIGHT)]
+
+    for keyword in module.get_keyword_list():
+        fields.append((keyword, searchindex.KEYWORD_WEIGHT))
+
+    return fields
+
+
+def get_module_pixbuf(module_icon, size=32):
+    if module_icon:
+        if type(module_icon) != list:
+            if module_icon.endswith('.png'):
+                icon_path = os.path.join(DATA_DIR, 'pixmaps', module_icon)
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file(icon_path)
+                pixbuf = pixbuf.scale_simple(size, size, GdkPixbuf.InterpType.BILINEAR)
+            else:
+                pixbuf = icon.get_from_name(module_icon, size=size)
+        else:
+            pixbuf = icon.get_from_list(module_icon, size=size)
+
+        return pixbuf
+
+
+class ModuleInfo(object):
+    '''What the module index knows about a module class, and a lazy proxy
+    of it.
+
+    It answers the classmethods which are used to list the modules, so the
+    category boxes and the search results can be shown without importing
+    the modules. The module file at path is imported by get_class(), when
+    the module is opened. dynamic_active is True if is_active() of the class
+    is its own, e.g. it checks a file, so the recorded active is only a
+    guess.
+    '''
+    __slots__ = ('name', 'path', 'title', 'description', 'category', 'icon', 'keywords',
+                 'desktop', 'distro', 'active', 'dynamic_active', 'user_extension')
+
+    def __init__(self, name, path, title, description, category, icon, keywords,
+                 desktop, distro, active, dynamic_active, user_extension=False):
+        self.name = name
+        self.path = path
+        self.title = title
+        self.description = description
+        self.category = category
+        self.icon = icon
+        # None if the module has no __keywords__, it isn't searchable
+        self.keywords = keywords
+        self.desktop = desktop
+        self.distro = distro
+        self.active = active
+        self.dynamic_active = dynamic_active
+        self.user_extension = user_extension
+
+    def __repr__(self):
+        return '<ModuleInfo: %s>' % self.name
+
+    @classmethod
+    def from_class(cls, klass, path):
+        for base in inspect.getmro(klass):
+            if 'is_active' in base.__dict__:
+                dynamic_active = base.__name__ not in BASE_CLASS_NAMES
+                break
+        else:
+            dynamic_active = False
+
+        return cls(klass.get_name(),
+                   path,
+                   klass.get_title(),
+                   hasattr(klass, 'get_description') and klass.get_description() or '',
+                   klass.get_category(),
+                   klass.__icon__ if hasattr(klass, '__icon__') else '',
+                   klass.get_keyword_list() if hasattr(klass, '__keywords__') else None,
+                   klass.__desktop__,
+                   klass.__distro__,
+                   bool(klass.is_active()),
+                   dynamic_active)
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(*record)
+
+    def to_record(self):
+        return (self.name, self.path, self.title, self.description, self.category, self.icon,
+                self.keywords, self.desktop, self.distro, self.active, self.dynamic_active)
+
+    def is_active(self):
+        return self.active
+
+    def get_name(self):
+        return self.name
+
+    def get_title(self):
+        return self.title
+
+    def get_description(self):
+        return self.description
+
+    def get_category(self):
+        return self.category
+
+    def get_keyword_list(self):
+        return self.keywords or []
+
+    def get_keywords(self):
+        return ' '.join(self.get_keyword_list())
+
+    def get_search_fields(self):
+        if self.keywords is not None:
+            return get_search_fields(self)
+
+    def get_pixbuf(self, size=32):
+        return get_module_pixbuf(self.icon, size)
+
+    def is_user_extension(self):
+        return self.user_extension
+
+    def get_class(self):
+        '''Import the module file and return the real class'''
+        package = ModuleLoader.import_module_file(self.path)
+
+        for k, v in inspect.getmembers(package):
+            if k not in BASE_CLASS_NAMES and hasattr(v, '__utmodule__') and \
+                    v.get_name() == self.name:
+                if self.user_extension:
+                    v.__user_extension__ = True
+                return v
+
+        raise ImportError('No module named "%s" in %s' % (self.name, self.path))
+
+
 class ModuleLoader:
     # the key will like this: 'Compiz': <class 'ubuntutweak.tweaks.compiz.Compiz'
     module_table = None
@@ -37,42 +299,80 @@ class ModuleLoader:
 
     default_features = ('tweaks', 'admins', 'janitor')
 
-    search_loaded_table = {}
-    fuzz_search_table = {}
-
-    def __init__(self, feature, user_only=False):
-        '''feature choices: tweaks, admins and janitor'''
+    # path: ((mtime, size), module), a module file is imported again only
+    # if it is changed
+    imported_table = {}
+    # name: (feature, module) of all the default features, it is built once
+    # from the module index, and again if a user extension folder is changed
+    name_table = None
+    name_table_mtimes = None
+    # The search index of the modules in the name table, None if it isn't
+    # built for it
+    search_index = None
+
+    # How many processes import the modules which aren't in the module
+    # index, and how long (in seconds) they may take
+    import_jobs = 4
+    import_budget = 5
+
+    def __init__(self, feature, user_only=False, check_active=True, use_index=False):
+        '''feature choices: tweaks, admins and janitor
+
+        If check_active is False, the modules are loaded even if they aren't
+        active for the current user, e.g. the janitor plugins of other homes
+
+        If use_index is True, the unchanged modules are taken from the module
+        index as ModuleInfo instead of being imported, and the others are
+        imported by the discovery in worker processes, only use it to list
+        the modules
+        '''
         self.module_table = {}
         self.category_table = {}
         self.feature = feature
+        self.check_active = check_active
+        self.use_index = use_index
+        # The paths which have been imported by the discovery just now
+        self._discovered_paths = set()
 
         for k, v in self.category_names:
             self.category_table[k] = {}
 
-        # First import system staff
-        if not user_only:
-            log.info("Loading system modules for %s..." % feature)
-            try:
-                m = __import__('ubuntutweak.%s' % self.feature, fromlist='ubuntutweak')
-                self.do_folder_import(m.__path__[0])
-            except ImportError, e:
-                log.error(e)
+        with profiler.phase('ModuleLoader %s' % feature):
+            # First import system staff
+            if not user_only:
+                log.info("Loading system modules for %s..." % feature)
+                try:
+                    m = __import__('ubuntutweak.%s' % self.feature, fromlist='ubuntutweak')
+                    self.do_folder_import(m.__path__[0])
+                except ImportError, e:
+                    log.error(e)
+
+            # Second import user plugins
+            user_folder = self.get_user_extension_dir(self.feature)
 
-        # Second import user plugins
-        user_folder = self.get_user_extension_dir(self.feature)
+            log.info("Loading user extensions for %s..." % feature)
+            self.do_folder_import(user_folder, mark_user=True)
 
-        log.info("Loading user extensions for %s..." % feature)
-        self.do_folder_import(user_folder, mark_user=True)
+            module_index.save()
 
     @classmethod
     def fuzz_search(cls, text):
-        modules = []
-        text = text.lower()
-        for k, v in cls.fuzz_search_table.items():
-            if text in k and v not in modules:
-                modules.append(v)
+        '''Return the modules which match the text, the best ones first, a
+        typo or the words of another language are found as well'''
+        cls._update_name_table()
 
-        return modules
+        if cls.search_index is None:
+            documents = []
+            for name, (feature, module) in sorted(cls.name_table.items()):
+                # The janitor plugins aren't searchable
+                fields = hasattr(module, 'get_search_fields') and module.get_search_fields()
+                if fields:
+                    documents.append((name, fields))
+
+            searchindex.search_index.build(documents)
+            cls.search_index = searchindex.search_index
+
+        return [cls.name_table[name][1] for name in cls.search_index.search(text)]
 
     @classmethod
     def get_user_extension_dir(cls, feature):
@@ -82,59 +382,51 @@ class ModuleLoader:
 
         package_identy_file = os.path.join(user_folder, '__init__.py')
         if not os.path.exists(package_identy_file):
-            os.system("touch %s" % package_identy_file)
+            open(package_identy_file, 'a').close()
 
         return user_folder
 
     @classmethod
     def search_module_for_name(cls, name):
-        if name in cls.search_loaded_table:
-            log.info('Module "%s" has already loaded.' % name)
-            return cls.search_loaded_table[name]
-
-        for feature in cls.default_features:
-            #User's at first
-            user_folder = os.path.join(CONFIG_ROOT, feature)
+        '''Return (feature, module) of the module name, the module may be a
+        ModuleInfo, or ('overview', None) if there isn't such a module'''
+        cls._update_name_table()
 
-            if not os.path.exists(user_folder):
-                os.makedirs(user_folder)
+        return cls.name_table.get(name, ('overview', None))
 
-            package_identy_file = os.path.join(user_folder, '__init__.py')
-            if not os.path.exists(package_identy_file):
-                os.system("touch %s" % package_identy_file)
-
-            module = cls._get_module_by_name_from_folder(name, user_folder)
+    @classmethod
+    def _update_name_table(cls):
+        if cls.name_table is None or cls._get_user_folder_mtimes() != cls.name_table_mtimes:
+            cls._build_name_table()
 
-            if module:
-                log.info('Loading module "%s" for "%s"...' % (name, feature))
-                if name not in cls.search_loaded_table:
-                    cls.search_loaded_table[name] = feature, module
-                return feature, module
+    @classmethod
+    def _get_user_folder_mtimes(cls):
+        mtimes = []
 
+        for feature in cls.default_features:
             try:
-                m = __import__('ubuntutweak.%s' % feature, fromlist='ubuntutweak')
-                module = cls._get_module_by_name_from_folder(name, m.__path__[0])
-                if module:
-                    log.info('Loading module "%s" for "%s"...' % (name, feature))
-                    if name not in cls.search_loaded_table:
-                        cls.search_loaded_table[name] = feature, module
-                    return feature, module
-            except ImportError, e:
-                log.error(traceback.print_exc())
-
-        return 'overview', None
+                mtimes.append(os.stat(os.path.join(CONFIG_ROOT, feature)).st_mtime)
+            except OSError:
+                mtimes.append(None)
+
+        return mtimes
 
     @classmethod
-    def _get_module_by_name_from_folder(cls, name, folder):
-        for path in glob.glob(os.path.join(folder, '*.py')):
-            module_name = os.path.splitext(os.path.basename(path))[0]
-            dirname = os.path.dirname(path)
-            if folder not in sys.path:
-                sys.path.insert(0, folder)
-            package = __import__(module_name)
-            for k, v in inspect.getmembers(package):
-                if k == name and cls.is_module_active(k, v):
-                    return v
+    def _build_name_table(cls):
+        log.debug("Build the name table of the modules")
+        name_table = {}
+
+        for feature in cls.default_features:
+            loader = cls(feature, use_index=True)
+
+            for name, module in loader.module_table.items():
+                if module.get_category() != 'broken' and name not in name_table:
+                    name_table[name] = feature, module
+
+        # The user folders are made by the loaders, so they are stated after
+        cls.name_table_mtimes = cls._get_user_folder_mtimes()
+        cls.name_table = name_table
+        cls.search_index = None
 
     @classmethod
     def is_target_class(cls, path, klass):
@@ -157,57 +449,254 @@ class ModuleLoader:
     def do_single_import(self, path, mark_user=False):
         module_name = os.path.splitext(os.path.basename(path))[0]
         log.debug("Try to load module: %s" % module_name)
-        if module_name in sys.modules:
-            del sys.modules[module_name]
+
+        st = stat_module_file(path)
+
+        if self.use_index and st:
+            records = module_index.lookup(path, st)
+
+            if records is not None:
+                infos = [ModuleInfo.from_record(record) for record in records]
+
+                # The modules which check themselves if they are active must
+                # be imported to know it, unless they are just discovered
+                if path in self._discovered_paths or \
+                        not (self.check_active and [info for info in infos if info.dynamic_active]):
+                    for info in infos:
+                        self._insert_info(info, mark_user)
+                    return
 
         try:
-            package = __import__(module_name)
+            package = self.import_module_file(path, st)
         except Exception, e:
-            Broken = create_broken_module_class(module_name)
-            self.module_table[Broken.get_name()] = Broken
-            self.category_table['broken'][Broken.get_name()] = Broken
-            log.error("Module import error: %s", str(e))
+            self._insert_broken(module_name, e)
+            if st and not module_index.is_known(path, st):
+                module_index.update(path, st, None)
         else:
-            for k, v in inspect.getmembers(package):
+            members = inspect.getmembers(package)
+            for k, v in members:
                 self._insert_moduel(k, v, mark_user)
 
+            if st:
+                self._update_index(path, st, members)
+
+    @classmethod
+    def import_module_file(cls, path, st=None):
+        '''Import the module file or package at path, it is only imported
+        again if it is changed'''
+        module_name = os.path.splitext(os.path.basename(path))[0]
+
+        if st is None:
+            st = stat_module_file(path)
+
+        key = st and (st.st_mtime, st.st_size)
+        if key and cls.imported_table.get(path, (None,))[0] == key:
+            return cls.imported_table[path][1]
+
+        if os.path.dirname(path) not in sys.path:
+            sys.path.insert(0, os.path.dirname(path))
+        if module_name in sys.modules:
+            del sys.modules[module_name]
+        package = __import__(module_name)
+
+        if key:
+            cls.imported_table[path] = key, package
+        return package
+
+    def _update_index(self, path, st, members):
+        try:
+            module_index.update(path, st, get_module_records(members, path))
+        except Exception, e:
+            log.error("Index module %s failed: %s" % (path, e))
+            module_index.invalidate(path)
+
+    def _insert_broken(self, module_name, error):
+        Broken = create_broken_module_class(module_name)
+        self.module_table[Broken.get_name()] = Broken
+        self.category_table['broken'][Broken.get_name()] = Broken
+        log.error("Module import error: %s", str(error))
+
+    def discover_modules(self, paths):
+        '''Import the module files which aren't in the module index in the
+        helper processes, and record them in the index.
+
+        Every import has import_budget seconds since it is started, the
+        helper of an import which takes longer is killed and replaced.
+        Return {path: seconds} of these imports, they are broken modules.
+        The paths which weren't started are left to be imported here.
+        '''
+        missing = []
+        for path in paths:
+            st = stat_module_file(path)
+            if st and not module_index.is_known(path, st):
+                missing.append((path, st))
+
+        if len(missing) < 2:
+            return {}
+
+        import select
+
+        helpers = []
+        try:
+            for i in range(min(self.import_jobs, len(missing))):
+                helpers.append(DiscoveryHelper())
+        except OSError, e:
+            log.warning("Start the discovery helper failed: %s" % e)
+
+        queue = [path for path, st in missing]
+        stats = dict(missing)
+        start = time.time()
+        timings = []
+        timed_out = {}
+
+        def get_deadline(helper):
+            # A helper has the budget to be ready, and every import has the
+            # budget since it is started, an idle helper has no deadline
+            since = helper.started or helper.sent
+            if since:
+                return since + self.import_budget
+
+        try:
+            while helpers:
+                if not queue and not [helper for helper in helpers
+                                      if helper.path or not helper.ready]:
+                    break
+
+                now = time.time()
+                for helper in [helper for helper in helpers
+                               if get_deadline(helper) and get_deadline(helper) <= now]:
+                    helpers.remove(helper)
+                    helper.kill()
+
+                    if helper.path and helper.started:
+                        seconds = now - helper.started
+                        timed_out[helper.path] = seconds
+                        timings.append((seconds, helper.path))
+
+                        if queue:
+                            try:
+                                helpers.append(DiscoveryHelper())
+                            except OSError, e:
+                                log.warning("Start the discovery helper failed: %s" % e)
+                    else:
+                        log.warning("The discovery helper didn't start in %ss" %
+                                    self.import_budget)
+
+                if not helpers:
+                    break
+
+                deadlines = filter(None, [get_deadline(helper) for helper in helpers])
+                if deadlines:
+                    timeout = max(min(deadlines) - now, 0)
+                else:
+                    timeout = None
+
+                for helper in select.select(helpers, [], [], timeout)[0]:
+                    lines = helper.read_lines()
+                    if lines is None:
+                        # The module it was importing is imported here
+                        log.warning("The discovery helper exited with %s" %
+                                    helper.process.wait())
+                        helpers.remove(helper)
+                        continue
+
+                    for line in lines:
+                        if line == 'ready':
+                            helper.ready = True
+                            helper.sent = None
+                        elif line == 'start':
+                            helper.started = time.time()
+                        elif line.startswith('done '):
+                            records, seconds = marshal.loads(line[5:].decode('hex'))
+                            timings.append((seconds, helper.path))
+                            # The failed ones are imported again here to show
+                            # the error
+                            module_index.update(helper.path, stats[helper.path], records)
+                            if records is not None:
+                                self._discovered_paths.add(helper.path)
+                            helper.path = None
+                            helper.started = None
+                            helper.sent = None
+
+                    if helper.ready and not helper.path and queue:
+                        try:
+                            helper.send(queue.pop(0))
+                        except IOError, e:
+                            log.warning("The discovery helper failed: %s" % e)
+                            helpers.remove(helper)
+        finally:
+            for helper in helpers:
+                helper.kill()
+
+        timings.sort(reverse=True)
+        log.info("Discovered %d modules in %.2fs, the slowest: %s" %
+                 (len(missing), time.time() - start,
+                  ', '.join('%s (%.2fs)' % (os.path.basename(path), seconds)
+                            for seconds, path in timings[:3])))
+
+        return timed_out
+
     def do_folder_import(self, path, mark_user=False):
         if path not in sys.path:
             sys.path.insert(0, path)
 
+        paths = []
         for f in os.listdir(path):
             full_path = os.path.join(path, f)
 
             if os.path.isdir(full_path) and \
                     os.path.exists(os.path.join(path, '__init__.py')):
-                self.do_single_import(f, mark_user)
+                paths.append(full_path)
             elif f.endswith('.py') and f != '__init__.py':
-                self.do_single_import(f, mark_user)
+                paths.append(full_path)
+
+        # Only the listed modules can be taken from other processes
+        timed_out = self.use_index and self.discover_modules(paths) or {}
+
+        for full_path in paths:
+            if full_path in timed_out:
+                module_name = os.path.splitext(os.path.basename(full_path))[0]
+                try:
+                    raise ModuleImportTimeout('Importing %s was stopped after %.1fs, '
+                                              'its budget is %ss' %
+                                              (full_path, timed_out[full_path],
+                                               self.import_budget))
+                except ModuleImportTimeout, e:
+                    self._insert_broken(module_name, e)
+            else:
+                self.do_single_import(full_path, mark_user)
 
     def _insert_moduel(self, k, v, mark_user=False):
-        if self.is_module_active(k, v):
-            self.module_table[v.get_name()] = v
-
+        if self.is_module_active(k, v, self.check_active):
             if mark_user:
                 v.__user_extension__ = True
 
-            if v.get_category() not in dict(self.category_names):
-                self.category_table['other'][v.get_name()] = v
-            else:
-                self.category_table[v.get_category()][v.get_name()] = v
-            if hasattr(v, '__keywords__'):
-                for attr in ('name', 'title', 'description', 'keywords'):
-                    value = getattr(v, 'get_%s' % attr)()
-                    self.fuzz_search_table[value.lower()] = v
+            self._add_module(v)
+
+    def _insert_info(self, info, mark_user=False):
+        if self.is_supported_desktop(info.desktop) and \
+                self.is_supported_distro(info.distro) and \
+                (not self.check_active or info.is_active()):
+            info.user_extension = mark_user
+
+            self._add_module(info)
+
+    def _add_module(self, v):
+        self.module_table[v.get_name()] = v
+
+        if v.get_category() not in dict(self.category_names):
+            self.category_table['other'][v.get_name()] = v
+        else:
+            self.category_table[v.get_category()][v.get_name()] = v
 
     @classmethod
-    def is_module_active(cls, k, v):
+    def is_module_active(cls, k, v, check_active=True):
         try:
-            if k not in ('TweakModule', 'Clip', 'JanitorPlugin', 'proxy') and \
+            if k not in BASE_CLASS_NAMES and \
                     hasattr(v, '__utmodule__'):
                 if cls.is_supported_desktop(v.__desktop__) and \
                    cls.is_supported_distro(v.__distro__) and \
-                   v.is_active():
+                   (not check_active or v.is_active()):
                        return True
             return False
         except Exception, e:
@@ -237,7 +726,7 @@ class ModuleLoader:
     def is_supported_distro(cls, distro):
         log.debug('is_supported_distro')
         if distro:
-            return system.CODENAME in distro
+            return system.get_codename() in distro
         else:
             return True
 
@@ -330,12 +819,20 @@ class TweakModule(Gtk.VBox):
         return cls.__title__
 
     @classmethod
-    def get_keywords(cls):
+    def get_keyword_list(cls):
         keywords = [cls.__keywords__]
         for k, v in inspect.getmembers(cls):
             if k.startswith('utext'):
                 keywords.append(v)
-        return ' '.join(keywords)
+        return keywords
+
+    @classmethod
+    def get_keywords(cls):
+        return ' '.join(cls.get_keyword_list())
+
+    @classmethod
+    def get_search_fields(cls):
+        return get_search_fields(cls)
 
     @classmethod
     def get_url(cls):
@@ -361,18 +858,7 @@ class TweakModule(Gtk.VBox):
     @classmethod
     def get_pixbuf(cls, size=32):
         '''Return gtk Pixbuf'''
-        if cls.__icon__:
-            if type(cls.__icon__) != list:
-                if cls.__icon__.endswith('.png'):
-                    icon_path = os.path.join(DATA_DIR, 'pixmaps', cls.__icon__)
-                    pixbuf = GdkPixbuf.Pixbuf.new_from_file(icon_path)
-                    pixbuf = pixbuf.scale_simple(size, size, GdkPixbuf.InterpType.BILINEAR)
-                else:
-                    pixbuf = icon.get_from_name(cls.__icon__, size=size)
-            else:
-                pixbuf = icon.get_from_list(cls.__icon__, size=size)
-
-            return pixbuf
+        return get_module_pixbuf(cls.__icon__, size)
 
     @classmethod
     def get_icon(cls, size=32):
@@ -34,13 +34,15 @@ def nothing(*args):
     return None
 
 class DbusProxy:
+    NAME = "com.ubuntu_tweak.daemon"
     INTERFACE = "com.ubuntu_tweak.daemon"
 
     try:
         __system_bus = dbus.SystemBus()
-        __object = __system_bus.get_object('com.ubuntu_tweak.daemon', '/com/ubuntu_tweak/daemon')
+        __object = __system_bus.get_object(NAME, '/com/ubuntu_tweak/daemon')
     except Exception, e:
         log.error(e)
+        __system_bus = None
         __object = None
 
     def __getattr__(self, name):
@@ -58,6 +60,43 @@ class DbusProxy:
     def get_object(self):
         return self.__object
 
+    def get_method(self, name):
+        '''Return the daemon method, or None if the daemon isn't available.
+        Unlike the attribute, it never falls back to the error dialog'''
+        if self.__object is None:
+            return None
+
+        try:
+            return self.__object.get_dbus_method(name, dbus_interface=self.INTERFACE)
+        except Exception, e:
+            log.error(e)
+            return None
+
+    def connect_to_signal(self, name, handler):
+        '''Connect to the daemon signal, return the match which can be removed
+        by its remove(), or None if the daemon isn't available'''
+        try:
+            return self.__object.connect_to_signal(name, handler,
+                                                   dbus_interface=self.INTERFACE)
+        except Exception, e:
+            log.error(e)
+            return None
+
+    def connect_to_owner_changed(self, handler):
+        '''Call handler(old_owner, new_owner) when the daemon starts, quits or
+        is replaced, return the match like connect_to_signal()'''
+        try:
+            return self.__system_bus.add_signal_receiver(
+                    lambda name, old_owner, new_owner: handler(old_owner, new_owner),
+                    'NameOwnerChanged',
+                    'org.freedesktop.DBus',
+                    'org.freedesktop.DBus',
+                    '/org/freedesktop/DBus',
+                    arg0=self.NAME)
+        except Exception, e:
+            log.error(e)
+            return None
+
 proxy = DbusProxy()
 
 if __name__ == '__main__':
@@ -67,7 +67,30 @@ class PreferencesDialog(GuiBuilder):
                                                 label=_("Auto scan:"),
                                                 key='com.ubuntu-tweak.janitor.auto-scan',
                                                 backend="gsettings")
-        pack = GridPack((auto_scan_label, auto_scan_switch))
+        scan_workers_label, scan_workers_scale = WidgetFactory.create("Scale",
+                                                label=_("Scan workers:"),
+                                                key='com.ubuntu-tweak.janitor.scan-workers',
+                                                min=1,
+                                                max=8,
+                                                step=1,
+                                                type=int,
+                                                backend="gsettings")
+        background_label, background_switch = WidgetFactory.create("Switch",
+                                                label=_("Background mode:"),
+                                                key='com.ubuntu-tweak.janitor.background-mode',
+                                                backend="gsettings")
+        delete_budget_label, delete_budget_scale = WidgetFactory.create("Scale",
+                                                label=_("Delete budget (MiB/s, 0 for no limit):"),
+                                                key='com.ubuntu-tweak.janitor.delete-budget',
+                                                min=0,
+                                                max=1024,
+                                                step=1,
+                                                type=int,
+                                                backend="gsettings")
+        pack = GridPack((auto_scan_label, auto_scan_switch),
+                        (scan_workers_label, scan_workers_scale),
+                        (background_label, background_switch),
+                        (delete_budget_label, delete_budget_scale))
         self.generic_alignment.add(pack)
 
         self.generic_alignment.show_all()
@@ -1,15 +1,17 @@
 import os
-import platform
 
-from ubuntutweak.common.consts import APP, PKG_VERSION
+from ubuntutweak.common.consts import APP, get_pkg_version
+from ubuntutweak.common.systemfacts import system_facts
 
 def get_distro():
     '''It should be "Ubuntu 10.10 maverick"'''
-    return ' '.join(platform.dist())
+    return system_facts.get_distro()
 
 def get_codename():
+    '''The codename of the Ubuntu release, it is read when it is asked for
+    the first time'''
     try:
-        codename = os.popen('lsb_release -cs').read().strip()
+        codename = system_facts.get_codename()
         if codename in ['karmic', 'helena', 'Helena']:
             return 'karmic'
         elif codename in ['lucid', 'isadora', 'Isadora']:
@@ -60,27 +62,26 @@ def get_desktop_fullname():
 
 def get_app():
     '''Ubuntu Tweak 0.5.x'''
-    return " ".join([APP, PKG_VERSION])
+    return " ".join([APP, get_pkg_version()])
 
-DISTRO = get_distro()
-CODENAME = get_codename()
 DESKTOP = get_desktop()
 DESKTOP_FULLNAME = get_desktop_fullname()
-APP = get_app()
 UBUNTU_CODENAMES = ('dapper', 'edgy', 'feisty',
                     'gutsy', 'hardy', 'intrepid',
                     'jaunty', 'karmic', 'lucid',
                     'maverick', 'natty', 'oneiric',
                     'precise', 'quantal', 'raring', 'saucy')
 
-def is_supported(codename=CODENAME):
+def is_supported(codename=None):
+    if codename is None:
+        codename = get_codename()
     return codename in ('precise', 'quantal', 'raring', 'saucy', 'trusty')
 
 
 if __name__ == '__main__':
-    print 'DISTRO: ', DISTRO
-    print 'CODENAME: ', CODENAME
+    print 'DISTRO: ', get_distro()
+    print 'CODENAME: ', get_codename()
     print 'DESKTOP: ', DESKTOP
     print 'DESKTOP_FULLNAME: ', DESKTOP_FULLNAME
     print 'DESKTOP_VERSION: ', DESKTOP_VERSION
-    print 'APP: ', APP
+    print 'APP: ', get_app()
@@ -46,7 +46,7 @@ class Fonts(TweakModule):
         fb.set_show_size(False)
         fb.set_use_size(13)
 
-        if system.CODENAME == 'precise':
+        if system.get_codename() == 'precise':
             window_font_label, window_font_button, window_font_reset_button = WidgetFactory.create("FontButton",
                        label=self.utext_window_title_font,
                        key="/apps/metacity/general/titlebar_font",
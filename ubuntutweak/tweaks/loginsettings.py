@@ -94,7 +94,7 @@ class LoginSettings(TweakModule):
         self.login_box.set_sensitive(False)
         self.add_start(self.login_box, False, False, 0)
 
-        if system.CODENAME != 'saucy':
+        if system.get_codename() != 'saucy':
             self.add_start(Gtk.Separator(), False, False, 6)
 
             self._setup_logo_image()
@@ -61,7 +61,7 @@ class Misc(TweakModule):
                 _('Note: you may need to log out to take effect'))
         notes_label._ut_left = 1
 
-        if system.CODENAME == 'precise':
+        if system.get_codename() == 'precise':
            overlay_label, overlay_widget = WidgetFactory.create('Switch',
                                                  label=self.utext_overlay_scrollbar,
                                                  key='org.gnome.desktop.interface.ubuntu-overlay-scrollbars',
@@ -46,7 +46,7 @@ class Session(TweakModule):
     def __init__(self):
         TweakModule.__init__(self)
 
-        if system.CODENAME == 'precise':
+        if system.get_codename() == 'precise':
             user_indicator_label, user_menu_switch, reset_button = WidgetFactory.create("Switch",
                                       label=self.utext_user_indicator,
                                       enable_reset=True,
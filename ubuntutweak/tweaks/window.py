@@ -42,7 +42,7 @@ class Window(TweakModule):
     if system.DESKTOP in ('gnome', 'gnome-shell'):
         config = GSetting(key='org.gnome.shell.overrides.button-layout')
     else:
-        if system.CODENAME == 'precise':
+        if system.get_codename() == 'precise':
             config = GconfSetting(key='/apps/metacity/general/button_layout')
         else:
             config = GSetting(key='org.gnome.desktop.wm.preferences.button-layout')
@@ -66,7 +66,7 @@ class Window(TweakModule):
             only_close_switch.set_active(True)
         only_close_label = Gtk.Label(self.utext_only_close_button)
 
-        if system.CODENAME == 'precise' and system.DESKTOP == 'ubuntu':
+        if system.get_codename() == 'precise' and system.DESKTOP == 'ubuntu':
             box = GridPack(
                         (Gtk.Label(self.utext_window_button),
                          self.place_hbox),
@@ -0,0 +1,180 @@
+import os
+import re
+import logging
+import threading
+
+import apt
+import apt_pkg
+
+log = logging.getLogger('aptcache')
+
+# Match the kernel packages like "linux-image-3.2.0-36-generic", the groups
+# are the base name with the trailing "-" and the version
+KERNEL_PATTERN = re.compile('^(linux-[a-z\-]+)([.\d]+-\d+)')
+
+
+def parse_kernel_package(name):
+    '''Return (base name, version) of the kernel package, e.g.
+    ("linux-image", "3.2.0-36"), or None'''
+    match = KERNEL_PATTERN.match(name)
+    if match:
+        return match.group(1).rstrip('-'), match.group(2)
+
+
+class InstalledPackage(object):
+    __slots__ = ('name', 'version', 'installed_size', 'is_auto_removable',
+                 'kernel', 'summary')
+
+    def __init__(self, name, version, installed_size, is_auto_removable,
+                 kernel, summary):
+        self.name = name
+        self.version = version
+        self.installed_size = installed_size
+        self.is_auto_removable = is_auto_removable
+        self.kernel = kernel
+        self.summary = summary
+
+
+def query_installed_packages(cache):
+    '''Walk the installed packages of the apt.Cache once at the apt_pkg
+    level, without creating the apt.Package objects, and return them as
+    InstalledPackage. The summary is only looked up for the auto removable
+    packages'''
+    depcache = cache._depcache
+    records = cache._records
+    packages = []
+
+    for pkg in cache._cache.packages:
+        version = pkg.current_ver
+        if version is None:
+            continue
+
+        name = pkg.get_fullname(True)
+        is_auto_removable = depcache.is_garbage(pkg)
+
+        if name.startswith('linux'):
+            kernel = parse_kernel_package(name)
+        else:
+            kernel = None
+
+        summary = ''
+        if is_auto_removable and version.file_list:
+            records.lookup(version.file_list[0])
+            summary = records.short_desc
+
+        packages.append(InstalledPackage(name,
+                                         version.ver_str,
+                                         version.installed_size,
+                                         is_auto_removable,
+                                         kernel,
+                                         summary))
+
+    return packages
+
+
+class AptCacheManager(object):
+    '''Hand out one shared apt.Cache for the whole process.
+
+    Opening the cache takes seconds and a lot of memory, so it is only
+    reopened when the dpkg status, the package lists or the auto installed
+    states have changed since it was opened. The cache is reopened in place,
+    so the object you got before stays the same.
+
+    rootdir is the same as the one of apt.Cache, the watched paths are in it.
+    '''
+
+    watch_paths = ('/var/lib/dpkg/status',
+                   '/var/lib/apt/lists',
+                   '/var/lib/apt/extended_states')
+
+    def __init__(self, rootdir=None):
+        self.rootdir = rootdir
+        self._cache = None
+        self._stamp = None
+        self._generation = 0
+        self._installed = None
+        self._lock = threading.RLock()
+
+    def get_stamp(self):
+        stamp = []
+
+        for path in self.watch_paths:
+            if self.rootdir:
+                path = os.path.join(self.rootdir, path.lstrip('/'))
+
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_ino, st.st_mtime))
+            except OSError:
+                stamp.append(None)
+
+        return tuple(stamp)
+
+    def get_cache(self, force=False):
+        with self._lock:
+            stamp = self.get_stamp()
+
+            if force or self._cache is None or stamp != self._stamp:
+                self._open(stamp)
+
+            return self._cache
+
+    def warm_up(self):
+        '''Open the cache in a thread, so the first query in the UI doesn't
+        wait for it'''
+        def do_open():
+            try:
+                self.get_cache()
+            except Exception, e:
+                log.error("Open the apt cache failed: %s" % e)
+
+        thread = threading.Thread(target=do_open)
+        thread.daemon = True
+        thread.start()
+
+    def is_ready(self):
+        '''Return True if the queries won't open or reopen the cache'''
+        return self._cache is not None and self.get_stamp() == self._stamp
+
+    def get_generation(self):
+        '''Return a number which is increased every time the cache is
+        reopened, it can be used to invalidate what is computed from it'''
+        return self._generation
+
+    def get_installed_packages(self):
+        '''Return the InstalledPackage list of the current cache, it is
+        queried once and shared until the cache is reopened'''
+        with self._lock:
+            cache = self.get_cache()
+            generation = self._generation
+
+            if self._installed is None or self._installed[0] != generation:
+                self._installed = (generation, query_installed_packages(cache))
+
+            return self._installed[1]
+
+    def _open(self, stamp):
+        if self._cache is None:
+            log.debug("Open the apt cache")
+            apt_pkg.init()
+            self._cache = apt.Cache(rootdir=self.rootdir)
+        else:
+            log.debug("Reopen the apt cache as the package states changed")
+            self._cache.open()
+
+        self._stamp = stamp
+        self._generation += 1
+
+    def is_package_installed(self, name):
+        cache = self.get_cache()
+        return name in cache and cache[name].is_installed
+
+    def is_package_upgradable(self, name):
+        cache = self.get_cache()
+        return name in cache and cache[name].is_upgradable
+
+    def is_package_available(self, name):
+        return name in self.get_cache()
+
+
+cache_manager = AptCacheManager()
@@ -0,0 +1,157 @@
+import os
+import time
+import ctypes
+import ctypes.util
+import logging
+import platform
+import threading
+
+from ubuntutweak.utils import filesizeformat
+
+log = logging.getLogger('background')
+
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+# The numbers of the ioprio_set syscall, Python doesn't wrap it
+IOPRIO_SET_SYSCALLS = {'x86_64': 251,
+                       'i386': 289,
+                       'i686': 289,
+                       'armv7l': 314,
+                       'aarch64': 30,
+                       'ppc': 273,
+                       'ppc64': 273,
+                       'ppc64le': 273}
+
+_libc = None
+
+
+def set_idle_io_priority():
+    '''Set the I/O priority of the calling thread to idle, so it only gets
+    the disk when no other process wants it. Return False if it fails'''
+    global _libc
+
+    number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if number is None:
+        log.debug("ioprio_set isn't known on %s" % platform.machine())
+        return False
+
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+
+        # On Linux the I/O priority is per thread, 0 is the calling thread
+        if _libc.syscall(number, IOPRIO_WHO_PROCESS, 0,
+                         IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) != 0:
+            log.warning("ioprio_set failed: %s" % os.strerror(ctypes.get_errno()))
+            return False
+    except Exception, e:
+        log.warning("ioprio_set failed: %s" % e)
+        return False
+
+    return True
+
+
+def set_low_cpu_priority():
+    '''Set the nice value of the calling thread to 19, it is per thread on
+    Linux as well'''
+    try:
+        os.nice(19 - os.nice(0))
+    except OSError, e:
+        log.warning("nice failed: %s" % e)
+        return False
+
+    return True
+
+
+class Throttle(object):
+    '''A token bucket which keeps the bytes under rate bytes per second, a
+    burst of one second is allowed. The rate 0 means no limit'''
+
+    def __init__(self, rate=0):
+        self.rate = rate
+        self._tokens = rate
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def consume(self, size, cancellable=None):
+        '''Take the bytes from the budget, it sleeps until they are in it or
+        the cancellable is cancelled'''
+        if not self.rate:
+            return
+
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= size
+            wait = -self._tokens / float(self.rate)
+
+        deadline = time.time() + wait
+        while wait > 0:
+            if cancellable and cancellable.is_cancelled():
+                return
+            time.sleep(min(wait, 0.1))
+            wait = deadline - time.time()
+
+
+class Throughput(object):
+    '''What a DiskUsage walk or a Deleter has done, it is passed to the
+    metrics_callback of them'''
+    __slots__ = ('name', 'size', 'count', 'seconds')
+
+    def __init__(self, name, size, count, seconds):
+        self.name = name
+        self.size = size
+        self.count = count
+        self.seconds = seconds
+
+    def __str__(self):
+        return '%s: %d entries, %s in %.2fs (%s/s)' % (self.name,
+                                                      self.count,
+                                                      filesizeformat(self.size),
+                                                      self.seconds,
+                                                      filesizeformat(self.get_rate()))
+
+    def get_rate(self):
+        '''Return the bytes per second'''
+        if self.seconds > 0:
+            return int(self.size / self.seconds)
+        return self.size
+
+    def to_dict(self):
+        return {'size': self.size,
+                'count': self.count,
+                'seconds': round(self.seconds, 3),
+                'rate': self.get_rate()}
+
+
+class Background(object):
+    '''The background mode of DiskUsage and Deleter.
+
+    Their worker threads get the idle I/O priority and the lowest CPU
+    priority, they yield the CPU after every directory, and the deleted bytes
+    are kept under delete_budget bytes per second. Share one Background, so
+    all the walks and deletes share the budget.
+    '''
+
+    # How long (in seconds) a worker sleeps after every directory, sleep(0)
+    # still gives up the CPU
+    directory_pause = 0
+
+    def __init__(self, delete_budget=0):
+        self.delete_budget = delete_budget
+        self.delete_throttle = Throttle(delete_budget)
+        self._local = threading.local()
+
+    def enter_thread(self):
+        '''Call it in every worker thread, only the first call of a thread
+        changes its priorities'''
+        if not getattr(self._local, 'entered', False):
+            self._local.entered = True
+            set_idle_io_priority()
+            set_low_cpu_priority()
+
+    def pause(self):
+        time.sleep(self.directory_pause)
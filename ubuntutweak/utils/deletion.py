@@ -0,0 +1,395 @@
+import os
+import stat
+import time
+import errno
+import Queue
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+from ubuntutweak.utils.diskusage import DEFAULT_WORKERS
+from ubuntutweak.utils.background import Throughput
+
+log = logging.getLogger('deletion')
+
+AT_FDCWD = -100
+AT_REMOVEDIR = 0x200
+
+# The os module of Python 2 doesn't have them, the numbers are the same on
+# the architectures Ubuntu runs on
+O_PATH = 010000000
+O_CLOEXEC = 02000000
+
+
+class _Dirent(ctypes.Structure):
+    _fields_ = [('d_ino', ctypes.c_uint64),
+                ('d_off', ctypes.c_int64),
+                ('d_reclen', ctypes.c_ushort),
+                ('d_type', ctypes.c_ubyte),
+                ('d_name', ctypes.c_char * 256)]
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.openat.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        libc.unlinkat.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        libc.fdopendir.argtypes = [ctypes.c_int]
+        libc.fdopendir.restype = ctypes.c_void_p
+        libc.readdir64.argtypes = [ctypes.c_void_p]
+        libc.readdir64.restype = ctypes.POINTER(_Dirent)
+        libc.closedir.argtypes = [ctypes.c_void_p]
+        _libc = libc
+
+    return _libc
+
+
+def _raise_errno(path):
+    error = ctypes.get_errno()
+    raise OSError(error, os.strerror(error), path)
+
+
+def open_directory(dir_fd, name, path):
+    '''Open the directory name in the directory dir_fd, it fails with ELOOP
+    if name is a symlink. path is only used in the error'''
+    fd = _get_libc().openat(dir_fd, name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | O_CLOEXEC)
+    if fd < 0:
+        _raise_errno(path)
+    return fd
+
+
+def stat_at(dir_fd, name, path):
+    '''Like fstatat(dir_fd, name, AT_SYMLINK_NOFOLLOW)'''
+    # An O_PATH fd doesn't open the file itself, so it is allowed for any
+    # file and fstat() of it gets the stat_result of Python
+    fd = _get_libc().openat(dir_fd, name, O_PATH | os.O_NOFOLLOW | O_CLOEXEC)
+    if fd < 0:
+        _raise_errno(path)
+
+    try:
+        return os.fstat(fd)
+    finally:
+        os.close(fd)
+
+
+def unlink_at(dir_fd, name, path, flags=0):
+    if _get_libc().unlinkat(dir_fd, name, flags) != 0:
+        _raise_errno(path)
+
+
+def list_directory(fd, path):
+    '''Return the names in the opened directory, without "." and ".."'''
+    libc = _get_libc()
+
+    # closedir() closes the fd given to fdopendir()
+    dir_fd = os.dup(fd)
+    dirp = libc.fdopendir(dir_fd)
+    if not dirp:
+        error = ctypes.get_errno()
+        os.close(dir_fd)
+        raise OSError(error, os.strerror(error), path)
+
+    names = []
+    try:
+        while True:
+            ctypes.set_errno(0)
+            entry = libc.readdir64(dirp)
+            if not entry:
+                if ctypes.get_errno():
+                    _raise_errno(path)
+                return names
+
+            name = entry.contents.d_name
+            if name != '.' and name != '..':
+                names.append(name)
+    finally:
+        libc.closedir(dirp)
+
+
+class _Node(object):
+    __slots__ = ('path', 'name', 'index', 'parent', 'fd', 'size', 'pending', 'failed')
+
+    def __init__(self, path, name, index, parent):
+        self.path = path
+        self.name = name
+        self.index = index
+        self.parent = parent
+        self.fd = None
+        self.size = 0
+        self.pending = 0
+        self.failed = False
+
+
+class _DeleteJob(object):
+    def __init__(self, paths):
+        self.paths = paths
+        self.devices = [None] * len(paths)
+        self.deleted = [0] * len(paths)
+        self.errors = [[] for path in paths]
+        self.links = [set() for path in paths]
+        self.total = 0
+        self.count = 0
+        self.last_progress = 0
+        self.lock = threading.Lock()
+        # The directory fds are kept open until the sub directories are
+        # removed, going depth first keeps them about as few as the depth
+        self.queue = Queue.LifoQueue()
+
+
+class Deleter(object):
+    '''Remove files and directory trees like "rm -rf --one-file-system" with
+    a bounded pool of worker threads.
+
+    Every directory is listed by one worker, its files are removed at once
+    and its sub directories are queued, so the independent subtrees are
+    removed concurrently. A directory is removed after the last of its sub
+    directories.
+
+    Like rm, the walk goes by directory fds: a directory is opened in its
+    parent with O_NOFOLLOW, and its entries are stat'ed and removed in it.
+    A directory which is replaced with a symlink while the tree is deleted
+    is reported as an error, the target of the symlink is never touched.
+
+    The freed bytes are counted in the same way as DiskUsage, so they add up
+    to the scanned size. progress_callback(bytes) gets the bytes removed so
+    far at most every progress_interval seconds, finished_callback(index,
+    bytes, errors) is called when a path is done. An entry which can't be
+    removed is recorded with its error, the others are still removed.
+
+    If a Background is given, the workers delete in its background mode and
+    the freed bytes are kept under its delete budget. metrics_callback(
+    throughput) gets the Throughput of every delete().
+    '''
+
+    progress_interval = 0.1
+
+    def __init__(self, workers=DEFAULT_WORKERS, progress_callback=None,
+                 finished_callback=None, cancellable=None, background=None,
+                 metrics_callback=None):
+        self.workers = max(1, workers)
+        self.progress_callback = progress_callback
+        self.finished_callback = finished_callback
+        self.cancellable = cancellable
+        self.background = background
+        self.metrics_callback = metrics_callback
+
+    def delete(self, paths):
+        '''Return [(removed bytes, [(path, error), ...]), ...] in the same
+        order as the paths'''
+        job = _DeleteJob(paths)
+        start_time = time.time()
+
+        for index, path in enumerate(paths):
+            # The names are read as bytes, so the paths are bytes as well
+            if isinstance(path, unicode):
+                path = path.encode('utf-8')
+
+            try:
+                st = os.lstat(path)
+            except OSError, e:
+                if e.errno != errno.ENOENT:
+                    self._add_error(job, index, path, e)
+                self._finish_path(job, index)
+                continue
+
+            job.devices[index] = st.st_dev
+
+            if stat.S_ISDIR(st.st_mode):
+                job.queue.put(_Node(path, path, index, None))
+            else:
+                self._remove_file(job, index, AT_FDCWD, path, path, st)
+                self._finish_path(job, index)
+
+        if not job.queue.empty():
+            threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._do_work, args=(job,))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+
+            job.queue.join()
+
+            for thread in threads:
+                job.queue.put(None)
+            for thread in threads:
+                thread.join()
+
+        if self.progress_callback:
+            self.progress_callback(job.total)
+
+        if self.metrics_callback:
+            self.metrics_callback(Throughput('delete', job.total, job.count,
+                                             time.time() - start_time))
+
+        return zip(job.deleted, job.errors)
+
+    def _do_work(self, job):
+        if self.background:
+            self.background.enter_thread()
+
+        while True:
+            node = job.queue.get()
+            try:
+                if node is None:
+                    break
+                self._delete_directory(job, node)
+                if self.background:
+                    self.background.pause()
+            except Exception, e:
+                log.error("Delete directory failed: %s" % e)
+            finally:
+                job.queue.task_done()
+
+    def _is_cancelled(self):
+        return self.cancellable and self.cancellable.is_cancelled()
+
+    def _get_parent_fd(self, node):
+        if node.parent is None:
+            return AT_FDCWD
+        return node.parent.fd
+
+    def _delete_directory(self, job, node):
+        if self._is_cancelled():
+            self._finish_directory(job, node)
+            return
+
+        subdirs = []
+        device = job.devices[node.index]
+
+        try:
+            node.fd = open_directory(self._get_parent_fd(node),
+                                     node.name, node.path)
+            st = os.fstat(node.fd)
+            node.size = st.st_size
+
+            if st.st_dev != device:
+                self._add_error(job, node.index, node.path, 'It is on another filesystem')
+                node.failed = True
+            else:
+                for name in list_directory(node.fd, node.path):
+                    full_path = os.path.join(node.path, name)
+                    try:
+                        st = stat_at(node.fd, name, full_path)
+                    except OSError, e:
+                        if e.errno != errno.ENOENT:
+                            self._add_error(job, node.index, full_path, e)
+                            node.failed = True
+                        continue
+
+                    if stat.S_ISDIR(st.st_mode):
+                        if st.st_dev != device:
+                            self._add_error(job, node.index, full_path, 'It is on another filesystem')
+                            node.failed = True
+                        else:
+                            subdirs.append(_Node(full_path, name, node.index, node))
+                    elif not self._remove_file(job, node.index, node.fd, name, full_path, st):
+                        node.failed = True
+        except OSError, e:
+            self._add_error(job, node.index, node.path, e)
+            node.failed = True
+
+        if subdirs:
+            node.pending = len(subdirs)
+            for subdir in subdirs:
+                job.queue.put(subdir)
+        else:
+            self._finish_directory(job, node)
+
+    def _finish_directory(self, job, node):
+        while node:
+            if node.fd is not None:
+                os.close(node.fd)
+                node.fd = None
+
+            # A cancelled directory is left, so are its parents
+            cancelled = self._is_cancelled()
+            if cancelled:
+                node.failed = True
+            elif not node.failed:
+                try:
+                    unlink_at(self._get_parent_fd(node),
+                              node.name, node.path, AT_REMOVEDIR)
+                    self._add_bytes(job, node.index, node.size)
+                except OSError, e:
+                    self._add_error(job, node.index, node.path, e)
+                    node.failed = True
+
+            parent = node.parent
+            if parent is None:
+                if not cancelled:
+                    self._finish_path(job, node.index)
+                return
+
+            with job.lock:
+                if node.failed:
+                    parent.failed = True
+                parent.pending -= 1
+                if parent.pending:
+                    return
+
+            node = parent
+
+    def _remove_file(self, job, index, dir_fd, name, path, st):
+        try:
+            unlink_at(dir_fd, name, path)
+        except OSError, e:
+            if e.errno == errno.ENOENT:
+                return True
+            self._add_error(job, index, path, e)
+            return False
+
+        # The last link of a hard linked file may be listed after the others
+        # are removed, so its st_nlink is 1 but it is still counted
+        key = (st.st_dev, st.st_ino)
+        if st.st_nlink > 1 or key in job.links[index]:
+            with job.lock:
+                if key in job.links[index]:
+                    return True
+                job.links[index].add(key)
+
+        self._add_bytes(job, index, st.st_size)
+        return True
+
+    def _add_bytes(self, job, index, size):
+        if self.background:
+            self.background.delete_throttle.consume(size, self.cancellable)
+
+        total = None
+        with job.lock:
+            job.count += 1
+            job.deleted[index] += size
+            job.total += size
+
+            if self.progress_callback:
+                now = time.time()
+                if now - job.last_progress >= self.progress_interval:
+                    job.last_progress = now
+                    total = job.total
+
+        # The callbacks are called without the lock, they may take long or
+        # call back into the deleter
+        if total is not None:
+            self.progress_callback(total)
+
+    def _add_error(self, job, index, path, error):
+        log.error("Delete %s failed: %s" % (path, error))
+        with job.lock:
+            job.errors[index].append((path, str(error)))
+
+    def _finish_path(self, job, index):
+        if self.finished_callback:
+            with job.lock:
+                deleted = job.deleted[index]
+                errors = list(job.errors[index])
+
+            self.finished_callback(index, deleted, errors)
+
+
+def delete(paths, cancellable=None):
+    return Deleter(cancellable=cancellable).delete(paths)
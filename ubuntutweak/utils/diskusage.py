@@ -0,0 +1,331 @@
+import os
+import stat
+import time
+import Queue
+import logging
+import threading
+
+from ubuntutweak.utils.scansession import get_key
+from ubuntutweak.utils.background import Throughput
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+log = logging.getLogger('diskusage')
+
+DEFAULT_WORKERS = 4
+
+
+def iter_entries(path):
+    '''Yield (name, full_path, lstat) for every entry of the directory, it
+    never follows symlinks'''
+    if scandir:
+        for entry in scandir(path):
+            try:
+                yield entry.name, entry.path, entry.stat(follow_symlinks=False)
+            except OSError, e:
+                log.debug("lstat failed: %s" % e)
+    else:
+        for name in os.listdir(path):
+            full_path = os.path.join(path, name)
+            try:
+                yield name, full_path, os.lstat(full_path)
+            except OSError, e:
+                log.debug("lstat failed: %s" % e)
+
+
+class Usage(object):
+    '''The apparent size of a path, and the newest mtime and atime of it and
+    everything under it. If the path is owned by another owner of the
+    ScanSession, owner is that one and the size is 0'''
+    __slots__ = ('size', 'mtime', 'atime', 'owner', 'is_dir')
+
+    def __init__(self, size=0, mtime=0, atime=0, owner=None, is_dir=False):
+        self.size = size
+        self.mtime = mtime
+        self.atime = atime
+        self.owner = owner
+        self.is_dir = is_dir
+
+
+class _SizeJob(object):
+    def __init__(self, paths):
+        self.paths = paths
+        self.totals = [0] * len(paths)
+        self.mtimes = [0] * len(paths)
+        self.atimes = [0] * len(paths)
+        self.owners = [None] * len(paths)
+        self.dirs = [False] * len(paths)
+        self.count = 0
+        self.links = [set() for path in paths]
+        # The directories of every path which are queued or being listed
+        self.pending = [0] * len(paths)
+        self.lock = threading.Lock()
+        self.queue = Queue.Queue()
+
+
+class DiskUsage(object):
+    '''Compute the same apparent size as "du -bs" without forking.
+
+    Directories are listed by a bounded pool of worker threads, so the
+    subtrees of a root are walked concurrently. Like du, a hard linked inode
+    is only counted once for each root, and the walk never crosses a
+    filesystem boundary.
+
+    If a ScanIndex is given, the unchanged directories are taken from it
+    instead of being listed again, only their sub directories are checked.
+    Reading a file doesn't change its directory, so the atime of the files
+    in these directories is unknown, don't use an index if you need it.
+
+    If a cancellable (anything with is_cancelled()) is given, the walk stops
+    at the next entry once it is cancelled, so the sizes are partial.
+
+    usage_callback(index, usage) is called as soon as the walk of a path is
+    done, from the thread which finished it. It isn't called for the paths
+    which aren't done when the walk is cancelled.
+
+    If a ScanSession is given, the walk claims what it finds for the owner,
+    and skips the roots, directories and files claimed by the other owners.
+
+    If a Background is given, the workers walk in its background mode.
+    metrics_callback(throughput) gets the Throughput of every get_usages().
+    '''
+
+    def __init__(self, workers=DEFAULT_WORKERS, index=None, cancellable=None,
+                 session=None, owner=None, background=None, metrics_callback=None,
+                 usage_callback=None):
+        self.workers = max(1, workers)
+        self.index = index
+        self.cancellable = cancellable
+        self.session = session
+        self.owner = owner
+        self.background = background
+        self.metrics_callback = metrics_callback
+        self.usage_callback = usage_callback
+
+    def _is_cancelled(self):
+        return self.cancellable and self.cancellable.is_cancelled()
+
+    def get_size(self, path):
+        return self.get_sizes([path])[0]
+
+    def get_sizes(self, paths):
+        '''Return the sizes of the paths in the same order, every path is
+        counted as if it was passed to its own "du -bs"'''
+        return [usage.size for usage in self.get_usages(paths)]
+
+    def get_usages(self, paths):
+        '''Return the Usage of the paths in the same order, they are
+        measured in the same walk as get_sizes()'''
+        job = _SizeJob(paths)
+        job.start_time = time.time()
+
+        for index, path in enumerate(paths):
+            try:
+                st = os.lstat(path)
+            except OSError, e:
+                log.debug("lstat failed: %s" % e)
+                continue
+
+            job.dirs[index] = stat.S_ISDIR(st.st_mode)
+
+            if self.session:
+                owner = self.session.claim_root(path, st, self.owner)
+                if owner != self.owner:
+                    job.owners[index] = owner
+                    continue
+
+            job.mtimes[index] = st.st_mtime
+            job.atimes[index] = st.st_atime
+
+            if stat.S_ISDIR(st.st_mode):
+                job.totals[index] += st.st_size
+                self._queue_directory(job, index, path, st, st.st_dev)
+            elif st.st_nlink > 1:
+                self._count_link(job, index, st.st_dev, st.st_ino, st.st_size)
+            else:
+                job.totals[index] += st.st_size
+
+        if self.usage_callback:
+            for index in range(len(paths)):
+                if not job.pending[index]:
+                    self.usage_callback(index, self._get_usage(job, index))
+
+        if job.queue.empty():
+            return self._get_result(job)
+
+        threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._do_work, args=(job,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        job.queue.join()
+
+        for thread in threads:
+            job.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+        if self.index:
+            self.index.save()
+
+        return self._get_result(job)
+
+    def _get_result(self, job):
+        if self.session:
+            self.session.add_size(self.owner, sum(job.totals))
+
+        if self.metrics_callback:
+            self.metrics_callback(Throughput('scan', sum(job.totals), job.count + len(job.paths),
+                                             time.time() - job.start_time))
+
+        return [self._get_usage(job, index) for index in range(len(job.paths))]
+
+    def _get_usage(self, job, index):
+        return Usage(job.totals[index], job.mtimes[index], job.atimes[index],
+                     job.owners[index], job.dirs[index])
+
+    def _queue_directory(self, job, index, path, st, device):
+        with job.lock:
+            job.pending[index] += 1
+        job.queue.put((index, path, st, device))
+
+    def _do_work(self, job):
+        if self.background:
+            self.background.enter_thread()
+
+        while True:
+            item = job.queue.get()
+            try:
+                if item is None:
+                    break
+                self._scan_directory(job, *item)
+            except Exception, e:
+                log.error("Scan directory failed: %s" % e)
+            finally:
+                if item is not None:
+                    self._finish_directory(job, item[0])
+                job.queue.task_done()
+
+            if self.background:
+                self.background.pause()
+
+    def _finish_directory(self, job, index):
+        with job.lock:
+            job.pending[index] -= 1
+            done = not job.pending[index]
+
+        if done and self.usage_callback and not self._is_cancelled():
+            self.usage_callback(index, self._get_usage(job, index))
+
+    def _scan_directory(self, job, index, path, dir_st, device):
+        if self._is_cancelled():
+            return
+
+        # The index doesn't know which files are claimed by the others
+        if self.session and self.session.has_root_files(get_key(dir_st)):
+            record = None
+        else:
+            record = self.index and self.index.lookup(path, dir_st)
+        atime = 0
+
+        if record:
+            size, links, subdirs, mtime = record
+
+            for dev, ino, link_size in links:
+                self._count_link(job, index, dev, ino, link_size)
+
+            for name in subdirs:
+                full_path = os.path.join(path, name)
+                try:
+                    st = os.lstat(full_path)
+                except OSError, e:
+                    log.debug("lstat failed: %s" % e)
+                    continue
+
+                if stat.S_ISDIR(st.st_mode) and st.st_dev == device:
+                    if self.session and not self.session.claim(get_key(st), self.owner):
+                        continue
+                    self._queue_directory(job, index, full_path, st, device)
+                    size += st.st_size
+                    mtime = max(mtime, st.st_mtime)
+                    atime = max(atime, st.st_atime)
+        else:
+            files_size = 0
+            files_mtime = 0
+            dirs_size = 0
+            dirs_mtime = 0
+            # The size of what the other owners claimed, it is still recorded
+            # in the index
+            skipped_size = 0
+            links = []
+            subdirs = []
+
+            try:
+                for name, full_path, st in iter_entries(path):
+                    # The listing is partial, so it isn't recorded
+                    if self._is_cancelled():
+                        return
+
+                    if st.st_dev != device:
+                        log.debug("Skip %s, it is on another filesystem" % full_path)
+                        continue
+
+                    atime = max(atime, st.st_atime)
+
+                    if stat.S_ISDIR(st.st_mode):
+                        if self.session and not self.session.claim(get_key(st), self.owner):
+                            skipped_size += st.st_size
+                        else:
+                            self._queue_directory(job, index, full_path, st, device)
+                        subdirs.append(name)
+                        dirs_size += st.st_size
+                        dirs_mtime = max(dirs_mtime, st.st_mtime)
+                        continue
+                    elif st.st_nlink > 1:
+                        links.append((st.st_dev, st.st_ino, st.st_size))
+                        self._count_link(job, index, st.st_dev, st.st_ino, st.st_size)
+                    else:
+                        files_size += st.st_size
+                        if self.session and self.session.is_owned_by_other(get_key(st), self.owner):
+                            skipped_size += st.st_size
+
+                    files_mtime = max(files_mtime, st.st_mtime)
+            except OSError, e:
+                log.debug("List directory failed: %s" % e)
+            else:
+                if self.index:
+                    self.index.update(path, dir_st, files_size, links, subdirs, files_mtime)
+
+            size = files_size + dirs_size - skipped_size
+            mtime = max(files_mtime, dirs_mtime)
+
+        with job.lock:
+            job.count += 1
+            job.totals[index] += size
+            job.mtimes[index] = max(job.mtimes[index], mtime)
+            job.atimes[index] = max(job.atimes[index], atime)
+
+    def _count_link(self, job, index, dev, ino, size):
+        if self.session and not self.session.claim((dev, ino), self.owner):
+            return
+
+        with job.lock:
+            if (dev, ino) not in job.links[index]:
+                job.links[index].add((dev, ino))
+                job.totals[index] += size
+
+
+def get_size(path, index=None):
+    return DiskUsage(index=index).get_size(path)
+
+
+def get_sizes(paths, index=None):
+    return DiskUsage(index=index).get_sizes(paths)
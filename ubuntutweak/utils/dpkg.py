@@ -0,0 +1,118 @@
+import os
+import logging
+
+log = logging.getLogger('dpkg')
+
+DPKG_STATUS = '/var/lib/dpkg/status'
+CONFIG_FILES_STATUS = 'deinstall ok config-files'
+
+
+def iter_stanzas(path=DPKG_STATUS, fields=None):
+    '''Yield the stanzas of a dpkg status file one by one as dicts.
+
+    The lines of a multiline field are joined with "\\n", the first line is
+    the value after the colon. If fields is given, only these fields are kept
+    and the others are skipped without being parsed.
+    '''
+    f = open(path)
+    try:
+        for stanza in iter_stanzas_of_lines(f, fields):
+            yield stanza
+    finally:
+        f.close()
+
+
+def iter_stanzas_of_lines(lines, fields=None):
+    stanza = {}
+    key = None
+
+    for line in lines:
+        if line[0] in ' \t':
+            if key:
+                stanza[key] += '\n' + line.strip()
+            continue
+
+        line = line.rstrip('\n')
+        if not line:
+            if stanza:
+                yield stanza
+                stanza = {}
+            key = None
+            continue
+
+        key, sep, value = line.partition(':')
+        if not sep or (fields and key not in fields):
+            key = None
+            continue
+
+        stanza[key] = value.strip()
+
+    if stanza:
+        yield stanza
+
+
+def get_package_stanza(package, path=DPKG_STATUS):
+    '''Return the stanza of the installed package, or None.
+
+    The status file isn't parsed, the stanza is found by its Package line.
+    '''
+    content = '\n' + open(path).read()
+    header = '\nPackage: %s\n' % package
+    start = content.find(header)
+
+    while start != -1:
+        end = content.find('\n\n', start + 1)
+        if end == -1:
+            end = len(content)
+
+        stanza = iter_stanzas_of_lines(content[start + 1:end].splitlines(True)).next()
+        # The first word is the selection, "hold ok installed" is installed
+        # as well
+        status = stanza.get('Status', '').split()
+        if len(status) == 3 and status[2] == 'installed':
+            return stanza
+
+        start = content.find(header, end)
+
+
+def get_package_name(stanza):
+    '''Return the name dpkg accepts for the package, the architecture is
+    added for the Multi-Arch: same packages'''
+    if stanza.get('Multi-Arch') == 'same' and stanza.get('Architecture'):
+        return '%s:%s' % (stanza['Package'], stanza['Architecture'])
+    return stanza['Package']
+
+
+def get_conffiles(stanza):
+    '''Return the paths of the conffiles in the stanza'''
+    conffiles = []
+
+    for line in stanza.get('Conffiles', '').splitlines():
+        line = line.split()
+        if line:
+            conffiles.append(line[0])
+
+    return conffiles
+
+
+def get_files_size(paths):
+    '''Return the total size of the paths which still exist'''
+    size = 0
+
+    for path in paths:
+        try:
+            size += os.lstat(path).st_size
+        except OSError:
+            pass
+
+    return size
+
+
+def iter_config_packages(path=DPKG_STATUS):
+    '''Yield (package name, conffiles size) for the packages which are
+    removed but their config files are left, the "rc" in "dpkg -l"'''
+    fields = ('Package', 'Status', 'Architecture', 'Multi-Arch', 'Conffiles')
+
+    for stanza in iter_stanzas(path, fields):
+        if stanza.get('Status') == CONFIG_FILES_STATUS and 'Package' in stanza:
+            yield get_package_name(stanza), get_files_size(get_conffiles(stanza))
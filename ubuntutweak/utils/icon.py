@@ -7,7 +7,9 @@ from gi.repository import Gtk, Gdk, Gio, GdkPixbuf
 log = logging.getLogger("utils.icon")
 
 icontheme = Gtk.IconTheme.get_default()
-icontheme.append_search_path('/usr/share/ccsm/icons')
+# There isn't a default icon theme without the display, e.g. in the cron job
+if icontheme:
+    icontheme.append_search_path('/usr/share/ccsm/icons')
 
 DEFAULT_SIZE = 24
 
@@ -104,5 +106,29 @@ def guess_from_path(filepath, size=DEFAULT_SIZE):
         log.error('guess_from_path failed: %s' % e)
         return get_from_name(size=size)
 
+# The pixbufs shared by get_shared_from_name and guess_from_name
+_shared_icons = {}
+
+def get_shared_from_name(name, size=DEFAULT_SIZE):
+    '''Like get_from_name, but the pixbuf is loaded once and shared, so
+    don't change it'''
+    key = (name, size)
+    if key not in _shared_icons:
+        _shared_icons[key] = get_from_name(name, size=size)
+    return _shared_icons[key]
+
+def guess_from_name(filepath, is_dir=False, size=DEFAULT_SIZE):
+    '''Like guess_from_path, but the type is only guessed from the name, so
+    the file is never opened. The pixbuf of a type is shared'''
+    if is_dir:
+        return get_shared_from_name('folder', size)
+
+    content_type, uncertain = Gio.content_type_guess(os.path.basename(filepath), None)
+
+    key = (content_type, size)
+    if key not in _shared_icons:
+        _shared_icons[key] = get_from_mime_type(content_type, size)
+    return _shared_icons[key]
+
 if __name__ == '__main__':
     print get_from_name('ok', alter='ko')
@@ -0,0 +1,399 @@
+'''Clean the janitor caches of many homes without the UI, for the
+ubuntu-tweak-janitor tool.
+
+The bundled cache plugins are found by parsing the sources in
+ubuntutweak/janitor instead of through ModuleLoader('janitor'). The tool
+runs as root, often without a display: ModuleLoader needs Gtk, and it
+imports every janitor plugin, while the apt and package plugins need the
+apt module and the daemon. Only the modules with a cache plugin of the homes
+are imported.
+'''
+
+import os
+import ast
+import pwd
+import sys
+import json
+import shutil
+import inspect
+import logging
+import tempfile
+import subprocess
+
+from multiprocessing.pool import ThreadPool
+
+from ubuntutweak.utils.janitorplugin import JanitorCachePlugin
+from ubuntutweak.utils.scansession import ScanSession
+
+log = logging.getLogger('janitorbatch')
+
+DEFAULT_JOBS = 4
+
+JANITOR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'janitor')
+# The folder which has the ubuntutweak package, for the helper processes
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(value):
+    '''Parse the size like "512", "100K", "20M" or "1G" to bytes'''
+    value = value.strip().upper().rstrip('B')
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def get_home_dirs(roots):
+    '''Return (user name, home dir) of every directory in the home roots,
+    e.g. "/home"'''
+    homes = []
+
+    for root in roots:
+        try:
+            names = sorted(os.listdir(root))
+        except OSError, e:
+            log.error("List home root failed: %s" % e)
+            continue
+
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.isdir(path) and not os.path.islink(path):
+                homes.append((name, path))
+
+    return homes
+
+
+def is_cache_plugin_node(node):
+    '''Return True if the class node looks like a cache plugin which isn't
+    in the system category'''
+    bases = [getattr(base, 'id', getattr(base, 'attr', '')) for base in node.bases]
+    if not [base for base in bases if base.endswith('CachePlugin')]:
+        return False
+
+    for item in node.body:
+        if isinstance(item, ast.Assign) and isinstance(item.value, ast.Str) and \
+                [target for target in item.targets if getattr(target, 'id', '') == '__category__']:
+            return item.value.s != 'system'
+
+    return True
+
+
+def get_cache_plugin_files(folder=JANITOR_DIR):
+    '''Return the module files in the folder which have a cache plugin of
+    the homes. They are found by their source, the other plugins need Gtk or
+    the daemon once they are imported'''
+    paths = []
+
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith('.py') or name == '__init__.py':
+            continue
+
+        path = os.path.join(folder, name)
+        try:
+            tree = ast.parse(open(path).read(), path)
+        except (IOError, SyntaxError), e:
+            log.error("Parse %s failed: %s" % (path, e))
+            continue
+
+        if [node for node in tree.body
+                if isinstance(node, ast.ClassDef) and is_cache_plugin_node(node)]:
+            paths.append(path)
+
+    return paths
+
+
+def get_home_plugins(names=None):
+    '''Load the bundled janitor cache plugins which clean the cruft in the
+    homes, they are loaded even if they aren't active for the current user'''
+    if JANITOR_DIR not in sys.path:
+        sys.path.insert(0, JANITOR_DIR)
+
+    plugins = []
+
+    for path in get_cache_plugin_files():
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            module = __import__(module_name)
+        except Exception, e:
+            log.error("Import %s failed: %s" % (path, e))
+            continue
+
+        for name, plugin in inspect.getmembers(module, inspect.isclass):
+            if not issubclass(plugin, JanitorCachePlugin) or \
+                    plugin.__module__ != module_name or \
+                    not plugin.get_title() or \
+                    plugin.get_category() == 'system':
+                continue
+            if names and plugin.get_name() not in names:
+                continue
+            plugins.append(plugin)
+
+    plugins.sort(key=lambda plugin: plugin.get_name())
+
+    return plugins
+
+
+def is_in_home(path, home, allow_link=False):
+    '''Return True if the path is in the home, and none of the folders on
+    the way from the home to it is a symlink, which the user of the home
+    could point anywhere. If allow_link is True, the path itself may be a
+    symlink, the deleter removes it without following it'''
+    if not path or os.pardir in path.split(os.sep):
+        return False
+
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(home))
+    if relative == os.curdir or relative.split(os.sep)[0] == os.pardir:
+        return False
+
+    parts = relative.split(os.sep)
+    current = home
+    for index, part in enumerate(parts):
+        current = os.path.join(current, part)
+        if os.path.islink(current) and not (allow_link and index == len(parts) - 1):
+            return False
+
+    if allow_link:
+        real_path = os.path.join(os.path.realpath(os.path.dirname(current)),
+                                 os.path.basename(current))
+    else:
+        real_path = os.path.realpath(current)
+
+    return real_path.startswith(os.path.join(os.path.realpath(home), ''))
+
+
+def get_home_owner(home):
+    try:
+        return os.lstat(home).st_uid
+    except OSError:
+        return None
+
+
+class BatchJanitor(object):
+    '''Scan and clean the janitor cache plugins for many homes without the
+    UI, the homes are handled by a pool of threads.
+
+    Only the cruft bigger than min_size (in bytes) and older than min_age (in
+    days) is selected. Like the min_age of the plugins, the age is taken from
+    the newest atime or mtime of everything in the cruft. If dry_run is True,
+    the selected cruft is only reported.
+
+    The plugins and the cruft must stay in the home without any symlink on
+    the way. If it runs as root, every home owned by another user is
+    scanned and cleaned by a helper process with the privileges of the
+    owner, so a user can't make it delete what the user can't.
+
+    If a Background is given, all the homes are scanned and cleaned in its
+    background mode and share its delete budget.
+    '''
+
+    def __init__(self, plugins, min_size=0, min_age=0, dry_run=False,
+                 jobs=DEFAULT_JOBS, background=None):
+        self.plugins = plugins
+        self.min_size = min_size
+        self.min_age = min_age
+        self.dry_run = dry_run
+        self.jobs = max(1, jobs)
+        self.background = background
+
+    def run(self, homes):
+        '''Return the report as a dict: the totals of all the homes, and the
+        totals of every user and plugin in "users"'''
+        pool = ThreadPool(self.jobs)
+        try:
+            results = pool.map(self.run_home, homes)
+        finally:
+            pool.close()
+            pool.join()
+
+        report = {'dry_run': self.dry_run, 'count': 0, 'size': 0, 'users': {}}
+
+        for (user, home), result in zip(homes, results):
+            if user in report['users']:
+                user = home
+            report['users'][user] = result
+            report['count'] += result['count']
+            report['size'] += result['size']
+
+        return report
+
+    def run_home(self, user_and_home):
+        user, home = user_and_home
+        uid = get_home_owner(home)
+
+        if os.geteuid() == 0 and uid and uid != os.geteuid():
+            return self.run_home_as(user, home, uid)
+
+        return self.scan_home(user, home)
+
+    def run_home_as(self, user, home, uid):
+        '''Scan and clean the home in a helper process as the user uid'''
+        result = {'home': home, 'count': 0, 'size': 0, 'plugins': {}}
+
+        try:
+            entry = pwd.getpwuid(uid)
+        except KeyError:
+            result['errors'] = ['The owner %d of the home has no account' % uid]
+            return result
+
+        if self.background:
+            # The homes are cleaned at the same time, they share the budget
+            delete_budget = self.background.delete_budget / self.jobs
+        else:
+            delete_budget = None
+
+        options = {'user': user,
+                   'home': home,
+                   'plugins': [plugin.get_name() for plugin in self.plugins],
+                   'min_size': self.min_size,
+                   'min_age': self.min_age,
+                   'dry_run': self.dry_run,
+                   'delete_budget': delete_budget}
+
+        # The config folder of the helper, so it doesn't write to the
+        # config folder of root or of the user
+        config_home = tempfile.mkdtemp(prefix='ubuntu-tweak-janitor-')
+        os.chown(config_home, uid, entry.pw_gid)
+
+        env = {'PATH': os.environ.get('PATH', os.defpath),
+               'HOME': home,
+               'USER': entry.pw_name,
+               'LOGNAME': entry.pw_name,
+               'XDG_CONFIG_HOME': config_home,
+               'PYTHONPATH': os.pathsep.join([SOURCE_ROOT] +
+                                             filter(None, [os.environ.get('PYTHONPATH')]))}
+
+        def drop_privileges():
+            os.initgroups(entry.pw_name, entry.pw_gid)
+            os.setgid(entry.pw_gid)
+            os.setuid(uid)
+
+        try:
+            process = subprocess.Popen([sys.executable, '-m', 'ubuntutweak.utils.janitorbatch',
+                                        json.dumps(options)],
+                                       cwd='/', env=env, close_fds=True,
+                                       preexec_fn=drop_privileges,
+                                       stdout=subprocess.PIPE)
+            output = process.communicate()[0]
+
+            if process.returncode != 0:
+                raise Exception('The helper of %s failed with %d' % (home, process.returncode))
+
+            return json.loads(output)
+        except Exception, e:
+            log.error(e)
+            result['errors'] = [str(e)]
+            return result
+        finally:
+            shutil.rmtree(config_home, ignore_errors=True)
+
+    def scan_home(self, user, home):
+        result = {'home': home, 'count': 0, 'size': 0, 'plugins': {}}
+        # The plugins of a home may find the same caches, they are counted
+        # and cleaned by the first one
+        session = ScanSession()
+
+        if self.background:
+            self.background.enter_thread()
+
+        log.info("Scan the cruft of %s in %s" % (user, home))
+
+        for plugin_class in self.plugins:
+            try:
+                plugin_result = self.run_plugin(self.get_plugin_class(plugin_class, home),
+                                                home, session)
+            except Exception, e:
+                log.error("%s failed for %s: %s" % (plugin_class.get_name(), home, e))
+                plugin_result = {'count': 0, 'size': 0, 'cruft': [], 'errors': [str(e)]}
+
+            if plugin_result:
+                result['plugins'][plugin_class.get_name()] = plugin_result
+                result['count'] += plugin_result['count']
+                result['size'] += plugin_result['size']
+
+        return result
+
+    def get_plugin_class(self, plugin_class, home):
+        '''Return the plugin bound to the home, with min_size and min_age
+        added to its selection rules'''
+        plugin_class = plugin_class.for_home(home)
+
+        if self.min_size > plugin_class.min_size or self.min_age > plugin_class.min_age:
+            plugin_class = type(plugin_class.__name__, (plugin_class,),
+                                {'min_size': max(self.min_size, plugin_class.min_size),
+                                 'min_age': max(self.min_age, plugin_class.min_age),
+                                 '__module__': plugin_class.__module__})
+
+        return plugin_class
+
+    def run_plugin(self, plugin_class, home, session=None):
+        if not plugin_class.is_active():
+            return None
+
+        if not is_in_home(plugin_class.get_path(), home):
+            raise Exception('%s is not in the home' % plugin_class.get_path())
+
+        plugin = plugin_class()
+        plugin.scan_session = session
+        plugin.background = self.background
+        found = []
+        cleaned = []
+        errors = []
+        throughputs = {}
+
+        def on_metrics(plugin, throughput):
+            throughputs[throughput.name] = throughput.to_dict()
+
+        plugin.metrics_callback = on_metrics
+
+        plugin.connect('find_object', lambda plugin, cruft, count: found.append(cruft))
+        plugin.connect('scan_error', lambda plugin, error: errors.append(str(error)))
+        plugin.get_cruft()
+
+        # The home may be changed while it is scanned
+        selected = []
+        for cruft in found:
+            if not is_in_home(cruft.get_path(), home, allow_link=True):
+                errors.append('%s is not in the home' % cruft.get_path())
+            elif cruft.is_reclaimable():
+                selected.append(cruft)
+
+        result = {'count': len(selected),
+                  'size': sum(cruft.get_size() for cruft in selected),
+                  'cruft': [{'path': cruft.get_path(), 'size': cruft.get_size()}
+                            for cruft in selected],
+                  'errors': errors,
+                  'throughput': throughputs}
+
+        if not self.dry_run and selected:
+            plugin.connect('object_cleaned', lambda plugin, cruft, count: cleaned.append(cruft))
+            plugin.connect('clean_error', lambda plugin, error: errors.append(str(error)))
+            plugin.clean_cruft(cruft_list=selected)
+
+            result['cleaned_count'] = len(cleaned)
+            result['cleaned_size'] = sum(cruft.get_size() for cruft in cleaned)
+
+        return result
+
+
+def main(argv):
+    '''The helper of run_home_as(), it scans and cleans one home and prints
+    the result as JSON'''
+    options = json.loads(argv[1])
+
+    if options['delete_budget'] is not None:
+        from ubuntutweak.utils.background import Background
+        background = Background(options['delete_budget'])
+    else:
+        background = None
+
+    janitor = BatchJanitor(get_home_plugins(options['plugins']),
+                           min_size=options['min_size'],
+                           min_age=options['min_age'],
+                           dry_run=options['dry_run'],
+                           background=background)
+    json.dump(janitor.scan_home(options['user'], options['home']), sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
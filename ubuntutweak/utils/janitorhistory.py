@@ -0,0 +1,166 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from ubuntutweak.common.consts import CONFIG_ROOT
+
+log = logging.getLogger('janitorhistory')
+
+HISTORY_VERSION = 1
+
+SCAN = 'scan'
+CLEAN = 'clean'
+
+
+class HistoryRecord(object):
+    __slots__ = ('time', 'plugin', 'action', 'count', 'size')
+
+    def __init__(self, time, plugin, action, count, size):
+        self.time = time
+        self.plugin = plugin
+        self.action = action
+        self.count = count
+        self.size = size
+
+
+class JanitorHistory(object):
+    '''The history of the janitor, every scan and clean is appended as a row
+    of (time, plugin name, action, count, size) in a SQLite database.
+
+    A scan row is what the plugin found, a clean row is what it removed. The
+    latest scans are a snapshot of the cruft which can be read without
+    walking the disk, and the scans after the last clean tell how fast the
+    cruft of a plugin grows. The rows older than max_age seconds are dropped
+    when the database is opened.
+    '''
+
+    max_age = 365 * 86400
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _get_connection(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            # The history isn't worth a fsync for every scan
+            connection.execute('PRAGMA synchronous = OFF')
+
+            if connection.execute('PRAGMA user_version').fetchone()[0] != HISTORY_VERSION:
+                connection.execute('DROP TABLE IF EXISTS history')
+                connection.execute('CREATE TABLE history (time REAL, plugin TEXT, action TEXT, '
+                                   'count INTEGER, size INTEGER)')
+                connection.execute('CREATE INDEX history_plugin ON history (plugin, action, time)')
+                connection.execute('PRAGMA user_version = %d' % HISTORY_VERSION)
+
+            connection.execute('DELETE FROM history WHERE time < ?', (time.time() - self.max_age,))
+            connection.commit()
+            self._connection = connection
+
+        return self._connection
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            try:
+                return self._get_connection().execute(sql, args).fetchall()
+            except sqlite3.Error, e:
+                log.error("Query history failed: %s" % e)
+                return []
+
+    def _query(self, sql, args=()):
+        return [HistoryRecord(*row) for row in self._execute(sql, args)]
+
+    def add(self, action, plugin, count, size, timestamp=None):
+        '''Append a scan or clean of the plugin, plugin is its name'''
+        self.add_records([HistoryRecord(timestamp or time.time(), plugin, action, count, size)])
+
+    def add_records(self, records):
+        with self._lock:
+            try:
+                connection = self._get_connection()
+                connection.executemany('INSERT INTO history VALUES (?, ?, ?, ?, ?)',
+                                       [(record.time, record.plugin, record.action,
+                                         record.count, record.size) for record in records])
+                connection.commit()
+            except sqlite3.Error, e:
+                log.error("Add history failed: %s" % e)
+
+    def get_records(self, plugin, action=None, since=0):
+        '''Return the records of the plugin in time order'''
+        if action:
+            return self._query('SELECT * FROM history WHERE plugin = ? AND action = ? AND time >= ? '
+                               'ORDER BY time', (plugin, action, since))
+        else:
+            return self._query('SELECT * FROM history WHERE plugin = ? AND time >= ? '
+                               'ORDER BY time', (plugin, since))
+
+    def get_latest(self, plugin, action=SCAN):
+        records = self._query('SELECT * FROM history WHERE plugin = ? AND action = ? '
+                              'ORDER BY time DESC LIMIT 1', (plugin, action))
+        return records and records[0] or None
+
+    def get_snapshot(self):
+        '''Return {plugin name: the latest scan record}, a scan older than the
+        last clean of its plugin is left out, as it isn't there any more'''
+        records = self._query('SELECT history.* FROM history, '
+                              '(SELECT plugin, MAX(time) AS time FROM history WHERE action = ? '
+                              'GROUP BY plugin) AS latest '
+                              'WHERE history.plugin = latest.plugin AND history.time = latest.time '
+                              'AND history.action = ?', (SCAN, SCAN))
+        cleans = dict(self._execute('SELECT plugin, MAX(time) FROM history '
+                                    'WHERE action = ? GROUP BY plugin', (CLEAN,)))
+
+        return dict((record.plugin, record) for record in records
+                    if record.time >= cleans.get(record.plugin, 0))
+
+    def get_growth_rate(self, plugin):
+        '''Return how many bytes the cruft of the plugin grows per day, from
+        the first and the last scan after its last clean, or None if there
+        aren't two of them'''
+        last_clean = self.get_latest(plugin, CLEAN)
+        scans = self.get_records(plugin, SCAN, last_clean and last_clean.time or 0)
+
+        if len(scans) < 2 or scans[-1].time <= scans[0].time:
+            return None
+
+        return (scans[-1].size - scans[0].size) * 86400.0 / (scans[-1].time - scans[0].time)
+
+    def get_growth_rates(self):
+        '''Return {plugin name: bytes per day} of the plugins which have a
+        growth rate'''
+        rates = {}
+
+        for plugin in self.get_snapshot():
+            rate = self.get_growth_rate(plugin)
+            if rate is not None:
+                rates[plugin] = rate
+
+        return rates
+
+    def get_days_until(self, plugin, size):
+        '''Return in how many days the cruft of the plugin grows to size, 0
+        if it is already there, or None if it doesn't grow'''
+        latest = self.get_latest(plugin)
+        if latest is None:
+            return None
+        if latest.size >= size:
+            return 0
+
+        rate = self.get_growth_rate(plugin)
+        if not rate or rate <= 0:
+            return None
+
+        days = (size - latest.size) / rate - (time.time() - latest.time) / 86400.0
+        return max(0, days)
+
+    def close(self):
+        with self._lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+
+janitor_history = JanitorHistory(os.path.join(CONFIG_ROOT, 'janitor-history.db'))
@@ -0,0 +1,467 @@
+import os
+import glob
+import time
+import fnmatch
+import logging
+import threading
+
+from gi.repository import GObject, Gio
+
+from ubuntutweak.utils import filesizeformat
+from ubuntutweak.utils.diskusage import DiskUsage
+from ubuntutweak.utils.deletion import Deleter
+from ubuntutweak.utils.scanindex import scan_index
+
+log = logging.getLogger('Janitor')
+
+class CruftObject(object):
+    # A scan may find a huge number of cruft, so they don't have a __dict__.
+    # reclaimable is False if the cruft doesn't match the selection rules of
+    # the plugin, owner is the name of the plugin which has counted it, if it
+    # isn't the plugin which found it
+    __slots__ = ('name', 'path', 'size', 'reclaimable', 'owner')
+
+    def __init__(self, name, path=None, size=0):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.reclaimable = True
+        self.owner = None
+
+    def __str__(self):
+        return self.get_name()
+
+    def get_name(self):
+        return self.name
+
+    def get_size(self):
+        return int(self.size)
+
+    def get_size_display(self):
+        return ''
+
+    def get_icon(self):
+        return None
+
+    def is_reclaimable(self):
+        return self.reclaimable
+
+
+class PackageObject(CruftObject):
+    __slots__ = ('package_name',)
+
+    def __init__(self, name, package_name, size):
+        CruftObject.__init__(self, name, size=size)
+        self.package_name = package_name
+
+    def get_size_display(self):
+        return filesizeformat(self.size)
+
+    def get_icon(self):
+        from ubuntutweak.utils import icon
+        return icon.get_shared_from_name('deb')
+
+    def get_package_name(self):
+        return self.package_name
+
+
+class CacheObject(CruftObject):
+    __slots__ = ('_is_dir',)
+
+    def __init__(self, name, path, size, is_dir=None):
+        CruftObject.__init__(self, name, path, size)
+        self._is_dir = is_dir
+
+    def get_path(self):
+        return self.path
+
+    def get_size_display(self):
+        return filesizeformat(self.size)
+
+    def get_icon(self):
+        from ubuntutweak.utils import icon
+        return icon.guess_from_name(self.path, self.is_dir())
+
+    def is_dir(self):
+        if self._is_dir is None:
+            self._is_dir = os.path.isdir(self.path)
+        return self._is_dir
+
+
+class JanitorPlugin(GObject.GObject):
+    __title__ = ''
+    __category__ = ''
+    __utmodule__ = ''
+    __desktop__ = ''
+    __distro__ = ''
+    __utactive__ = True
+    __user_extension__ = False
+    # The plugins in the same scan group will never be scanned at the same
+    # time, e.g. the plugins which share the apt cache
+    __scan_group__ = ''
+
+    scan_finished = GObject.property(type=bool, default=False)
+    clean_finished = GObject.property(type=bool, default=False)
+    error = GObject.property(type=str, default='')
+
+    __gsignals__ = {
+        'find_object': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_PYOBJECT, GObject.TYPE_INT)),
+        'scan_finished': (GObject.SignalFlags.RUN_FIRST, None,
+                          (GObject.TYPE_BOOLEAN,
+                           GObject.TYPE_INT,
+                           GObject.TYPE_LONG)),
+        'object_cleaned': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_PYOBJECT, GObject.TYPE_INT)),
+        'clean_progress': (GObject.SignalFlags.RUN_FIRST, None,
+                           (GObject.TYPE_LONG,
+                            GObject.TYPE_LONG)),
+        'all_cleaned': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_BOOLEAN,)),
+        'scan_cancelled': (GObject.SignalFlags.RUN_FIRST, None,
+                           (GObject.TYPE_INT,
+                            GObject.TYPE_LONG)),
+        'scan_error': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_STRING,)),
+        'clean_error': (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_STRING,)),
+    }
+
+    def __init__(self):
+        GObject.GObject.__init__(self)
+        self.cancellable = Gio.Cancellable()
+
+    @classmethod
+    def is_active(cls):
+        return cls.__utactive__
+
+    @classmethod
+    def get_name(cls):
+        return cls.__name__
+
+    @classmethod
+    def get_title(cls):
+        return cls.__title__
+
+    @classmethod
+    def get_category(cls):
+        return cls.__category__
+
+    @classmethod
+    def is_user_extension(cls):
+        return cls.__user_extension__
+
+    @classmethod
+    def get_scan_group(cls):
+        return cls.__scan_group__
+
+    @classmethod
+    def get_pixbuf(cls):
+        #TODO
+        return None
+
+    def cancel(self):
+        '''Ask the running scan or clean task to stop, it can be called from
+        any thread'''
+        # The plugins of the users may not call JanitorPlugin.__init__
+        cancellable = getattr(self, 'cancellable', None)
+        if cancellable:
+            cancellable.cancel()
+
+    def is_cancelled(self):
+        '''Check it between the entries in get_cruft and clean_cruft. A
+        cancelled scan emits "scan_cancelled" with the count and size found so
+        far, a cancelled clean emits "all_cleaned" with False'''
+        cancellable = getattr(self, 'cancellable', None)
+        return bool(cancellable and cancellable.is_cancelled())
+
+    def reset_cancellable(self):
+        '''Called before a new task is started'''
+        self.cancellable = Gio.Cancellable()
+
+    def get_cruft(self):
+        return ()
+
+    def get_summary(self, count, size):
+        return self.get_title()
+
+    def clean_cruft(self, parent=None, cruft_list=[]):
+        '''Clean all the cruft, you must emit the "cleaned" signal to tell the
+        main thread your task is finished
+
+        :param parent: the toplevel window, use for transient
+        :param cruft_list: a list contains all the cruft objects to be clean
+        :param rescan_handler: the handler to rescan the result, must be called
+            after the clean task is done
+        '''
+        pass
+
+class JanitorCachePlugin(JanitorPlugin):
+    root_path = ''
+    pattern = '*'
+    targets = []
+    # The home which "~" means, empty for the home of the current user
+    home_dir = ''
+    # The ScanSession shared with the other plugins, so the overlapping trees
+    # are only counted once
+    scan_session = None
+    # The Background shared with the other plugins if the janitor runs in
+    # the background mode
+    background = None
+    # Called with the plugin and the Throughput of every scan and clean
+    metrics_callback = None
+
+    # The selection rules, only the cruft which matches all of them is
+    # reclaimable. The age is in days since the newest atime or mtime of
+    # everything in the cruft, the globs match the name of the cruft, and the
+    # newest keep_newest cruft is always kept.
+    min_age = 0
+    age_by = 'atime'
+    min_size = 0
+    keep_newest = 0
+    include = ()
+    exclude = ()
+
+    def __str__(self):
+        try:
+            return self.__module__.split('.')[-1]
+        except Exception, e:
+            return "%s Plugin" % self.__title__
+
+    @classmethod
+    def is_active(cls):
+        return cls.__utactive__ and os.path.exists(cls.get_path())
+
+    def get_cruft(self):
+        if self.pattern == '*':
+            if self.targets:
+                paths = []
+
+                for target in self.targets:
+                    new_root_path = os.path.join(self.get_path(), target)
+
+                    if os.path.exists(new_root_path):
+                        paths.append(new_root_path)
+
+                self.emit_cruft(paths)
+            else:
+                self.get_cruft_by_path()
+        else:
+            self.get_cruft_by_glob()
+
+    def clean_cruft(self, cruft_list=[], parent=None):
+        total_size = sum(cruft.get_size() for cruft in cruft_list)
+        cleaned = []
+        failed = []
+
+        def on_progress(size):
+            self.emit('clean_progress', size, total_size)
+
+        def on_finished(index, size, errors):
+            cruft = cruft_list[index]
+
+            if errors:
+                failed.append(cruft)
+            else:
+                log.debug('Cleaned...%s' % cruft.get_name())
+                cleaned.append(cruft)
+                self.emit('object_cleaned', cruft, len(cleaned))
+
+        self.get_deleter(on_progress, on_finished).delete([cruft.get_path() for cruft in cruft_list])
+
+        for cruft in cruft_list:
+            self.invalidate_cruft(cruft)
+        scan_index.save()
+
+        if failed:
+            self.emit('clean_error', failed[0].get_name())
+
+        self.emit('all_cleaned', not self.is_cancelled())
+
+    @classmethod
+    def has_selection_rules(cls):
+        return bool(cls.min_age or cls.min_size or cls.keep_newest or
+                    cls.include or cls.exclude)
+
+    def get_disk_usage(self, usage_callback=None):
+        # Reading a file, or rewriting it in place, doesn't change its
+        # directory, so the ages in the index may be outdated
+        if self.min_age or self.keep_newest:
+            index = None
+        else:
+            index = scan_index
+
+        return DiskUsage(index=index, cancellable=getattr(self, 'cancellable', None),
+                         session=self.scan_session, owner=self.get_name(),
+                         background=self.background,
+                         metrics_callback=self.report_throughput,
+                         usage_callback=usage_callback)
+
+    def get_deleter(self, progress_callback=None, finished_callback=None):
+        return Deleter(progress_callback=progress_callback,
+                       finished_callback=finished_callback,
+                       cancellable=getattr(self, 'cancellable', None),
+                       background=self.background,
+                       metrics_callback=self.report_throughput)
+
+    def report_throughput(self, throughput):
+        log.info("%s %s" % (self, throughput))
+
+        if self.metrics_callback:
+            self.metrics_callback(self, throughput)
+
+    def invalidate_cruft(self, cruft):
+        '''Call it when the cruft has been cleaned, so the next scan won't
+        trust the outdated records of the scan index'''
+        scan_index.invalidate(cruft.get_path())
+
+    def on_done(self, widget):
+        widget.destroy()
+
+    def get_cruft_by_glob(self):
+        cruft_list = glob.glob('%s/%s' % (self.get_path(), self.pattern))
+        cruft_list.sort()
+
+        self.emit_cruft(cruft_list)
+
+    def emit_cruft(self, paths):
+        '''Measure the paths in one walk, apply the selection rules and emit
+        them as CacheObject in their order, each one as soon as its size is
+        known. A cancelled scan still emits the ones which were measured.
+
+        With keep_newest they have to be ranked, so they are only emitted
+        when the walk is done, and a cancelled scan emits them as not
+        reclaimable'''
+        # The plugins which keep the newest cruft can only select it when
+        # all of it is measured
+        ranked = bool(self.keep_newest)
+        crufts = [None] * len(paths)
+        # The next cruft to emit, the count and size of the emitted ones
+        state = {'next': 0, 'count': 0, 'size': 0}
+        lock = threading.Lock()
+
+        def emit_found(cruft):
+            state['count'] += 1
+            state['size'] += cruft.get_size()
+            self.emit('find_object', cruft, state['count'])
+
+        def on_usage(index, usage):
+            cruft = self.get_cache_object(paths[index], usage)
+            if not ranked:
+                self.select_cruft([cruft], [usage])
+
+            with lock:
+                crufts[index] = cruft
+                if ranked:
+                    return
+
+                while state['next'] < len(crufts) and crufts[state['next']]:
+                    emit_found(crufts[state['next']])
+                    state['next'] += 1
+
+        usages = self.get_disk_usage(on_usage).get_usages(paths)
+        cancelled = self.is_cancelled()
+
+        with lock:
+            if ranked and not cancelled:
+                self.select_cruft(crufts, usages)
+
+            for cruft in crufts[state['next']:]:
+                if cruft:
+                    if ranked and cancelled:
+                        cruft.reclaimable = False
+                    emit_found(cruft)
+
+            if cancelled:
+                self.emit('scan_cancelled', state['count'], state['size'])
+            else:
+                self.emit('scan_finished', True, state['count'], state['size'])
+
+    def get_cache_object(self, path, usage):
+        cruft = CacheObject(os.path.basename(path), path, usage.size, usage.is_dir)
+
+        if usage.owner:
+            cruft.owner = usage.owner
+            cruft.reclaimable = False
+
+        return cruft
+
+    def select_cruft(self, crufts, usages):
+        '''Mark the cruft which doesn't match the selection rules as not
+        reclaimable'''
+        if not self.has_selection_rules():
+            return
+
+        now = time.time()
+        used_times = []
+
+        for cruft, usage in zip(crufts, usages):
+            if self.age_by == 'atime':
+                used_time = max(usage.atime, usage.mtime)
+            else:
+                used_time = usage.mtime
+            used_times.append(used_time)
+
+            name = cruft.get_name()
+
+            if [pattern for pattern in self.exclude if fnmatch.fnmatch(name, pattern)]:
+                cruft.reclaimable = False
+            elif self.include and \
+                    not [pattern for pattern in self.include if fnmatch.fnmatch(name, pattern)]:
+                cruft.reclaimable = False
+            elif cruft.get_size() < self.min_size:
+                cruft.reclaimable = False
+            elif now - used_time < self.min_age * 86400:
+                cruft.reclaimable = False
+
+        if self.keep_newest:
+            newest = sorted(zip(used_times, range(len(crufts))), reverse=True)
+            for used_time, index in newest[:self.keep_newest]:
+                crufts[index].reclaimable = False
+
+    @classmethod
+    def get_path(cls):
+        if cls.root_path.startswith('~'):
+            return cls.expand_path(cls.root_path)
+        else:
+            return cls.root_path
+
+    @classmethod
+    def expand_path(cls, path):
+        if cls.home_dir and (path == '~' or path.startswith('~/')):
+            return cls.home_dir + path[1:]
+        else:
+            return os.path.expanduser(path)
+
+    @classmethod
+    def for_home(cls, home_dir):
+        '''Return a subclass of the plugin which finds the cruft in the
+        home_dir instead of the home of the current user'''
+        return type(cls.__name__, (cls,), {'home_dir': home_dir,
+                                           '__module__': cls.__module__})
+
+    def get_cruft_by_path(self, root_path=None):
+        if root_path is None:
+            root_path = self.get_path()
+
+        try:
+            dirs = []
+            files = []
+
+            for name in os.listdir(root_path):
+                if os.path.isdir(os.path.join(root_path, name)):
+                    dirs.append(name)
+                else:
+                    files.append(name)
+
+            dirs.sort()
+            files.sort()
+
+            to_deleted = dirs + files
+            paths = [os.path.join(root_path, path) for path in to_deleted]
+
+            self.emit_cruft(paths)
+        except Exception, e:
+            log.error(e)
+            self.emit('scan_error', e)
+
+    def get_summary(self, count):
+        if count:
+            return '[%d] %s' % (count, self.__title__)
+        else:
+            return '%s (%s)' % (self.__title__, _('No cache to be cleaned'))
@@ -0,0 +1,105 @@
+import os
+import marshal
+import logging
+import threading
+
+from ubuntutweak.common.consts import CONFIG_ROOT
+
+log = logging.getLogger('moduleindex')
+
+INDEX_VERSION = 3
+
+
+def get_locale_key():
+    '''Return the locale the titles are translated to, in the order gettext
+    looks for it'''
+    for name in ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG'):
+        value = os.environ.get(name)
+        if value:
+            return value.replace(os.sep, '_')
+    return 'C'
+
+
+class ModuleIndex(object):
+    '''The on-disk index of the module files found by ModuleLoader.
+
+    Every file is recorded with its mtime, its size and the records of the
+    module classes in it, a record is a tuple made by ModuleInfo. While the
+    mtime and size of the file are the same, the records can be used instead
+    of importing it. A file which fails to be imported is recorded without
+    records, it is known but must be imported to show the error.
+
+    The titles are translated when the module is imported, so there is an
+    index for every locale.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._files = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _get_files(self):
+        if self._files is None:
+            self._files = {}
+
+            if os.path.exists(self.path):
+                try:
+                    version, files = marshal.load(open(self.path, 'rb'))
+                    if version == INDEX_VERSION:
+                        self._files = files
+                except Exception, e:
+                    log.warning("Load module index failed: %s" % e)
+
+        return self._files
+
+    def lookup(self, path, st):
+        '''Return the records of the file if it isn't changed since it was
+        recorded, or None'''
+        with self._lock:
+            entry = self._get_files().get(path)
+
+        if entry and entry[0] == st.st_mtime and entry[1] == st.st_size:
+            return entry[2]
+
+    def is_known(self, path, st):
+        '''Return True if the file is recorded and isn't changed, even if it
+        has no records'''
+        with self._lock:
+            entry = self._get_files().get(path)
+
+        return bool(entry) and entry[0] == st.st_mtime and entry[1] == st.st_size
+
+    def update(self, path, st, records):
+        '''Record the file, records is None if it fails to be imported'''
+        with self._lock:
+            self._get_files()[path] = (st.st_mtime, st.st_size,
+                                       records is not None and tuple(records) or None)
+            self._dirty = True
+
+    def invalidate(self, path):
+        with self._lock:
+            if self._get_files().pop(path, None):
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+
+            # The removed modules are dropped when it is saved
+            for path in [path for path in self._files if not os.path.exists(path)]:
+                del self._files[path]
+
+            try:
+                temp_path = self.path + '.tmp'
+                f = open(temp_path, 'wb')
+                marshal.dump((INDEX_VERSION, self._files), f)
+                f.close()
+                os.rename(temp_path, self.path)
+                self._dirty = False
+            except Exception, e:
+                log.error("Save module index failed: %s" % e)
+
+
+module_index = ModuleIndex(os.path.join(CONFIG_ROOT, 'module-%s.index' % get_locale_key()))
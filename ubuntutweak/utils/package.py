@@ -1,7 +1,5 @@
 import logging
 
-import apt
-import apt_pkg
 import aptdaemon.client
 import aptdaemon.errors
 
@@ -14,6 +12,7 @@ from defer import inline_callbacks, return_value
 
 from ubuntutweak.gui.gtk import post_ui, unset_busy
 from ubuntutweak.common.debug import log_func
+from ubuntutweak.utils.aptcache import cache_manager
 
 log = logging.getLogger('package')
 
@@ -170,8 +169,6 @@ class AptWorker(object):
             return self.cache
 
     @classmethod
-    def update_apt_cache(self, init=False):
-        '''if init is true, force to update, or it will update only once'''
-        if init or not getattr(self, 'cache'):
-            apt_pkg.init()
-            self.cache = apt.Cache()
+    def update_apt_cache(self):
+        '''The cache is shared and only reopened if the package states changed'''
+        self.cache = cache_manager.get_cache()
@@ -0,0 +1,111 @@
+import os
+import time
+import marshal
+import logging
+import threading
+
+from ubuntutweak.common.consts import CONFIG_ROOT
+
+log = logging.getLogger('scanindex')
+
+INDEX_VERSION = 3
+
+
+class ScanIndex(object):
+    '''The on-disk index of the directories walked by DiskUsage.
+
+    Every directory is recorded with its inode, its mtime, the size of the
+    files directly inside it, the hard linked files, the names of its sub
+    directories and the newest mtime of its files. While the inode and mtime
+    of a directory are the same, no entry has been added, removed or renamed
+    in it, so the record can be used instead of listing the directory again.
+
+    Files rewritten in place don't touch the mtime of their directory, so
+    their size and mtime in the record may be outdated. Call invalidate() for
+    the paths you changed yourself, the changes of the others are found when
+    the record expires after max_age seconds.
+
+    The records of the removed trees are dropped when it is saved.
+    '''
+
+    max_age = 86400
+
+    def __init__(self, path):
+        self.path = path
+        self._records = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _get_records(self):
+        if self._records is None:
+            self._records = {}
+
+            if os.path.exists(self.path):
+                try:
+                    version, records = marshal.load(open(self.path, 'rb'))
+                    if version == INDEX_VERSION:
+                        self._records = records
+                except Exception, e:
+                    log.warning("Load scan index failed: %s" % e)
+
+        return self._records
+
+    def lookup(self, path, st):
+        '''Return (files_size, links, subdirs, files_mtime) if the directory
+        isn't changed since it was recorded, or None'''
+        with self._lock:
+            record = self._get_records().get(path)
+
+        if record and record[0] == st.st_ino and record[1] == st.st_mtime and \
+                time.time() - record[6] < self.max_age:
+            return record[2:6]
+
+    def update(self, path, st, files_size, links, subdirs, files_mtime=0):
+        with self._lock:
+            records = self._get_records()
+
+            if path in records:
+                for name in set(records[path][4]) - set(subdirs):
+                    self._invalidate(os.path.join(path, name))
+
+            records[path] = (st.st_ino, st.st_mtime, files_size, links, subdirs,
+                             files_mtime, time.time())
+            self._dirty = True
+
+    def invalidate(self, path):
+        '''Drop the records of the path and everything under it'''
+        with self._lock:
+            self._invalidate(path)
+
+    def _invalidate(self, path):
+        records = self._get_records()
+        prefix = os.path.join(path, '')
+
+        for key in [key for key in records if key == path or key.startswith(prefix)]:
+            del records[key]
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+
+            # Only the top directories are checked, the removed sub
+            # directories are dropped by update() of their parents
+            for path in [path for path in self._records
+                         if os.path.dirname(path) not in self._records]:
+                if path in self._records and not os.path.isdir(path):
+                    self._invalidate(path)
+
+            try:
+                temp_path = self.path + '.tmp'
+                f = open(temp_path, 'wb')
+                marshal.dump((INDEX_VERSION, self._records), f)
+                f.close()
+                os.rename(temp_path, self.path)
+                self._dirty = False
+            except Exception, e:
+                log.error("Save scan index failed: %s" % e)
+
+
+scan_index = ScanIndex(os.path.join(CONFIG_ROOT, 'janitor-scan.index'))
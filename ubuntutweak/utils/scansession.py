@@ -0,0 +1,134 @@
+import os
+import logging
+import threading
+
+log = logging.getLogger('scansession')
+
+
+def get_key(st):
+    return st.st_dev, st.st_ino
+
+
+class ScanSession(object):
+    '''Which plugin owns the directories and files found in one scan.
+
+    The plugins may point at the same trees, e.g. a symlinked cache dir, or
+    a profile which is also under ~/.cache. Every directory and file is keyed
+    by its (st_dev, st_ino), so the symlinks and the other names of it are the
+    same key. The first owner which claims a key gets all the bytes under it,
+    and the others skip it, so the sizes of all the plugins add up without
+    counting a byte twice.
+
+    Only the directories, the hard linked files and the roots are claimed,
+    the plain files belong to the owner of their directory.
+    '''
+
+    def __init__(self):
+        self._owners = {}
+        self._claims = {}
+        self._sizes = {}
+        # The directories which have a root file claimed by its own owner,
+        # they must be listed instead of being taken from the scan index
+        self._root_parents = set()
+        self._lock = threading.Lock()
+
+    def claim(self, key, owner):
+        '''Claim the key for the owner, return False if it is owned by
+        another one'''
+        with self._lock:
+            return self._claim(key, owner)
+
+    def _claim(self, key, owner):
+        current = self._owners.setdefault(key, owner)
+        if current == owner:
+            self._claims.setdefault(owner, set()).add(key)
+            return True
+        return False
+
+    def claim_root(self, path, st, owner):
+        '''Claim a root passed to DiskUsage and return its owner, it is
+        another one if the root or any directory above its real path is
+        owned by it'''
+        ancestors = []
+        parent = os.path.realpath(os.path.dirname(path))
+
+        while True:
+            try:
+                ancestors.append(get_key(os.stat(parent)))
+            except OSError, e:
+                log.debug("stat failed: %s" % e)
+            if parent == os.path.dirname(parent):
+                break
+            parent = os.path.dirname(parent)
+
+        with self._lock:
+            for key in ancestors:
+                if self._owners.get(key, owner) != owner:
+                    log.debug("%s is in the tree of %s" % (path, self._owners[key]))
+                    return self._owners[key]
+
+            if not self._claim(get_key(st), owner):
+                log.debug("%s is owned by %s" % (path, self._owners[get_key(st)]))
+                return self._owners[get_key(st)]
+
+            if ancestors:
+                self._root_parents.add(ancestors[0])
+
+            return owner
+
+    def get_owner(self, key):
+        return self._owners.get(key)
+
+    def is_owned_by_other(self, key, owner):
+        return self._owners.get(key, owner) != owner
+
+    def has_root_files(self, key):
+        return key in self._root_parents
+
+    def add_size(self, owner, size):
+        with self._lock:
+            self._sizes[owner] = self._sizes.get(owner, 0) + size
+
+    def get_size(self, owner):
+        return self._sizes.get(owner, 0)
+
+    def get_total_size(self):
+        '''Return the bytes found by all the owners, none is counted twice'''
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def release(self, owner):
+        '''Forget what the owner has claimed, call it before it scans
+        again. What the others skipped for it isn't counted by them'''
+        with self._lock:
+            for key in self._claims.pop(owner, ()):
+                del self._owners[key]
+            self._sizes.pop(owner, None)
+
+
+def filter_nested_paths(paths):
+    '''Return the indexes of the paths which aren't the same as or inside
+    another one of the paths. Deleting only them removes everything, and
+    nothing is deleted twice'''
+    # A symlink is removed by itself, so only the directories above it are
+    # resolved
+    locations = [os.path.join(os.path.realpath(os.path.dirname(path)), os.path.basename(path))
+                 for path in paths]
+    kept = []
+    seen = set()
+
+    # The shorter ones come first, so a parent is always seen before the
+    # paths inside it
+    for index in sorted(range(len(paths)), key=lambda index: len(locations[index])):
+        location = locations[index]
+        parent = location
+
+        while parent not in seen:
+            next_parent = os.path.dirname(parent)
+            if next_parent == parent:
+                kept.append(index)
+                seen.add(location)
+                break
+            parent = next_parent
+
+    return sorted(kept)
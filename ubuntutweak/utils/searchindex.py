@@ -0,0 +1,246 @@
+import os
+import re
+import glob
+import bisect
+import marshal
+import gettext
+import logging
+
+from ubuntutweak.common.consts import PACKAGE, CONFIG_ROOT
+from ubuntutweak.utils.moduleindex import get_locale_key
+
+log = logging.getLogger('searchindex')
+
+INDEX_VERSION = 1
+
+LOCALE_DIR = '/usr/share/locale'
+
+# How much a match in every field counts
+NAME_WEIGHT = 3.0
+TITLE_WEIGHT = 4.0
+KEYWORD_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+# A match in the translation of a field counts this much of the field
+TRANSLATION_WEIGHT = 0.5
+
+# How much the kinds of token match count
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.9
+SUBSTRING_MATCH = 0.7
+FUZZY_MATCH = 0.6
+# The least dice coefficient of the trigrams for a fuzzy match
+FUZZY_THRESHOLD = 0.45
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def to_unicode(text):
+    if isinstance(text, unicode):
+        return text
+    return str(text).decode('utf-8', 'replace')
+
+
+def get_tokens(text):
+    return TOKEN_RE.findall(to_unicode(text).lower())
+
+
+def get_trigrams(token):
+    token = u'$%s$' % token
+    return set(token[i:i + 3] for i in range(len(token) - 2))
+
+
+def get_catalog_paths(localedir=LOCALE_DIR, domain=PACKAGE):
+    return sorted(glob.glob(os.path.join(localedir, '*', 'LC_MESSAGES', '%s.mo' % domain)))
+
+
+class Translations(object):
+    '''All the translations of the strings in the gettext catalogs'''
+
+    def __init__(self, paths):
+        self._catalogs = []
+        # The translated string: its msgid
+        self._msgids = {}
+
+        for path in paths:
+            try:
+                catalog = gettext.GNUTranslations(open(path, 'rb'))._catalog
+            except Exception, e:
+                log.warning("Load %s failed: %s" % (path, e))
+                continue
+
+            self._catalogs.append(catalog)
+            for msgid, msgstr in catalog.iteritems():
+                # The header and the plural forms aren't module strings
+                if msgid and isinstance(msgid, basestring):
+                    self._msgids.setdefault(msgstr, msgid)
+
+    def get_translations(self, text):
+        '''Return the other translations of the text, it may be the msgid or
+        any of its translations'''
+        text = to_unicode(text)
+        msgid = self._msgids.get(text, text)
+        translations = set([msgid])
+
+        for catalog in self._catalogs:
+            if msgid in catalog:
+                translations.add(catalog[msgid])
+
+        translations.discard(text)
+        return translations
+
+
+class SearchIndex(object):
+    '''An inverted index of the searchable strings of the modules.
+
+    Every document is a key and the (text, weight) of its fields. The text
+    is split into tokens, a token posts the documents with the highest
+    weight it has in them, and the trigrams of the tokens post the tokens,
+    so a query token finds the tokens which it is, starts, is in or is like
+    with a typo. The translations of the fields in all the installed
+    catalogs are indexed too, the user may search in any language.
+
+    It is built once for the same documents and catalogs, and kept on the
+    disk.
+    '''
+
+    def __init__(self, path, localedir=LOCALE_DIR):
+        self.path = path
+        self.localedir = localedir
+        self._keys = []
+        # token: {document: weight}
+        self._postings = {}
+        # trigram: [token]
+        self._trigrams = {}
+        # The sorted tokens for the prefix matches
+        self._tokens = []
+
+    def build(self, documents):
+        '''documents: [(key, [(text, weight)])]'''
+        catalog_paths = get_catalog_paths(self.localedir)
+        signature = (documents, [(path, os.path.getmtime(path)) for path in catalog_paths])
+
+        if self._load(signature):
+            return
+
+        log.debug("Build the search index of %d documents" % len(documents))
+        translations = Translations(catalog_paths)
+        self._keys = []
+        self._postings = {}
+
+        for document, (key, fields) in enumerate(documents):
+            self._keys.append(key)
+
+            for text, weight in fields:
+                if not text:
+                    continue
+                self._add_text(document, text, weight)
+                for translation in translations.get_translations(text):
+                    self._add_text(document, translation, weight * TRANSLATION_WEIGHT)
+
+        self._tokens = sorted(self._postings)
+        trigrams = {}
+        for token in self._tokens:
+            for trigram in get_trigrams(token):
+                trigrams.setdefault(trigram, []).append(token)
+        self._trigrams = trigrams
+
+        self._save(signature)
+
+    def _add_text(self, document, text, weight):
+        for token in get_tokens(text):
+            posting = self._postings.setdefault(token, {})
+            if posting.get(document, 0) < weight:
+                posting[document] = weight
+
+    def _load(self, signature):
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            data = marshal.load(open(self.path, 'rb'))
+            if data[0] != INDEX_VERSION or data[1] != signature:
+                return False
+            self._keys, self._postings, self._trigrams, self._tokens = data[2:]
+        except Exception, e:
+            log.warning("Load search index failed: %s" % e)
+            return False
+
+        return True
+
+    def _save(self, signature):
+        try:
+            temp_path = self.path + '.tmp'
+            f = open(temp_path, 'wb')
+            marshal.dump((INDEX_VERSION, signature, self._keys, self._postings,
+                          self._trigrams, self._tokens), f)
+            f.close()
+            os.rename(temp_path, self.path)
+        except Exception, e:
+            log.error("Save search index failed: %s" % e)
+
+    def _match_token(self, query):
+        '''Return {token: how much it matches the query token}'''
+        matches = {}
+
+        if query in self._postings:
+            matches[query] = EXACT_MATCH
+
+        index = bisect.bisect_left(self._tokens, query)
+        while index < len(self._tokens) and self._tokens[index].startswith(query):
+            matches.setdefault(self._tokens[index], PREFIX_MATCH)
+            index += 1
+
+        if matches:
+            return matches
+
+        # The token isn't the start of any token, so look for it inside the
+        # tokens and for the tokens like it
+        query_trigrams = get_trigrams(query)
+        counts = {}
+        for trigram in query_trigrams:
+            for token in self._trigrams.get(trigram, ()):
+                counts[token] = counts.get(token, 0) + 1
+
+        for token, count in counts.iteritems():
+            if query in token:
+                matches[token] = SUBSTRING_MATCH
+            else:
+                # A token has as many trigrams as characters, with the $
+                dice = 2.0 * count / (len(query_trigrams) + len(token))
+                if dice >= FUZZY_THRESHOLD:
+                    matches[token] = FUZZY_MATCH * dice
+
+        return matches
+
+    def search(self, text):
+        '''Return the keys of the documents which match all the tokens of
+        the text, the best ones first'''
+        scores = None
+
+        for query in set(get_tokens(text)):
+            query_scores = {}
+
+            for token, match in self._match_token(query).iteritems():
+                for document, weight in self._postings[token].iteritems():
+                    score = match * weight
+                    if query_scores.get(document, 0) < score:
+                        query_scores[document] = score
+
+            if scores is None:
+                scores = query_scores
+            else:
+                scores = dict((document, score + query_scores[document])
+                              for document, score in scores.iteritems()
+                              if document in query_scores)
+
+            if not scores:
+                return []
+
+        if not scores:
+            return []
+
+        documents = sorted(scores, key=lambda document: (-scores[document], self._keys[document]))
+        return [self._keys[document] for document in documents]
+
+
+search_index = SearchIndex(os.path.join(CONFIG_ROOT, 'module-search-%s.index' % get_locale_key()))